@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+benchmark.py
+
+Times the pallets against the fake arcpy and forklift in `benchmarks/fakes` using synthetic data so that
+orchestration changes can be compared on a machine without ArcGIS.
+
+Usage:
+    python benchmarks/benchmark.py                                  Runs every suite at every size
+    python benchmarks/benchmark.py maintenance --sizes 10 1000      Runs one suite at some sizes
+    python benchmarks/benchmark.py --latency 0                      Measures the python overhead only
+Suites:
+    maintenance     Sgid10Pallet.ship with the datasets spread across the 23 owners. Runs twice to show the warm cache.
+    locators        LocatorsPallet.process with both locators dirty. The size is the locator size in KB.
+    incremental     LocatorsPallet.process with size address points and road segments. Runs a full rebuild and then a delta
+                    after one percent of the address points are edited.
+    copier          Copies a file of size KB to 4 local destination folders one at a time and with the fan out copier.
+    ogm             OGMPallet.prepare_packaging with the size as the number of wells. Runs again after one percent of the
+                    wells are edited.
+    paths           Builds the paths of size wells with 300 down hole stations, a third of them repeated, with the old
+                    list membership dedupe and with ogmsupport.paths.
+    downholes       Reads size down hole stations into the old nested dictionaries and into ogmsupport.points and builds
+                    their paths. Reports the peak python memory of each. Try --sizes 500000.
+'''
+
+import argparse
+import logging
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import types
+from os import makedirs
+from os.path import abspath
+from os.path import dirname
+from os.path import join
+from time import perf_counter
+
+BENCHMARKS = dirname(abspath(__file__))
+WAREHOUSE = dirname(BENCHMARKS)
+
+sys.path.insert(0, join(BENCHMARKS, 'fakes'))
+sys.path.append(WAREHOUSE)
+
+import arcpy  # noqa: E402
+import forklift.core  # noqa: E402
+import forklift.models  # noqa: E402
+
+SIZES = [10, 1000, 10000]
+
+SGID_OWNERS = [
+    'Biosciense', 'Boundaries', 'Cadastre', 'Climate', 'Demographics', 'Economy', 'Elevation', 'Energy', 'Environment', 'Farming',
+    'Geoscience', 'Health', 'History', 'Indices', 'Location', 'Planning', 'Political', 'Raster', 'Recreation', 'Society',
+    'Transportation', 'Utilities', 'Water'
+]
+
+
+def import_pallet(folder, module):
+    path = join(WAREHOUSE, folder)
+    if path not in sys.path:
+        sys.path.append(path)
+
+    return __import__(module)
+
+
+def new_forklift(working_folder):
+    '''points the fake forklift at empty garage and staging rack folders
+    '''
+    arcpy.reset()
+
+    forklift.models.GARAGE = join(working_folder, 'garage')
+    forklift.models.STAGING_RACK = join(working_folder, 'staging')
+    arcpy.env.scratchGDB = join(working_folder, 'scratch.gdb')
+
+    for folder in [forklift.models.GARAGE, forklift.models.STAGING_RACK, arcpy.env.scratchGDB]:
+        makedirs(folder, exist_ok=True)
+
+
+def synthetic_catalog(garage, size):
+    '''registers the SGID10 admin and owner workspaces with `size` datasets spread between the owners
+    '''
+    arcpy.add_workspace(join(garage, 'SGID10', 'SGID_sde@SGID10@sgid.agrc.utah.gov.sde'), states=size, versions=3)
+
+    for index, owner in enumerate(SGID_OWNERS):
+        path = join(garage, 'SGID10', 'SGID_{}@SGID10@sgid.agrc.utah.gov.sde'.format(owner))
+        user = owner.lower()
+        count = size // len(SGID_OWNERS) + (1 if index < size % len(SGID_OWNERS) else 0)
+
+        children = []
+        feature_dataset = ('SGID10.{}.Dataset'.format(user), 'FeatureDataset', [])
+        for number in range(count):
+            name = 'SGID10.{}.Layer{}'.format(user, number)
+            data_type = 'Table' if number % 5 == 0 else 'FeatureClass'
+
+            if number % 10 == 9:
+                feature_dataset[2].append((name, data_type))
+            else:
+                children.append((name, data_type))
+
+            arcpy.add_table(join(path, name), ['NAME'], [{'NAME': number}] * (number % 50), data_type)
+
+        if feature_dataset[2]:
+            children.append(feature_dataset)
+
+        arcpy.add_workspace(path, user=user, children=children)
+
+
+def bench_maintenance(size, working_folder):
+    new_forklift(working_folder)
+    synthetic_catalog(forklift.models.GARAGE, size)
+
+    sgid10pallet = import_pallet(join('database_maintenance', 'SGID10'), 'sgid10pallet')
+
+    pallet = sgid10pallet.Sgid10Pallet()
+    pallet.build('Production')
+
+    results = []
+    for run in ['cold', 'warm']:
+        start = perf_counter()
+        pallet.ship()
+        results.append(('maintenance ' + run, size, perf_counter() - start))
+
+    return results
+
+
+def new_locators(working_folder, incremental=False):
+    '''points the locator secrets at empty folders and returns the LocatorsPallet module
+    '''
+    locators = join(working_folder, 'locators')
+    destinations = [join(working_folder, 'destination_{}'.format(number)) for number in range(3)]
+    for folder in [locators] + destinations:
+        makedirs(folder, exist_ok=True)
+
+    #: the pallet module keeps a reference to the secrets module so it is reused between sizes
+    secrets = sys.modules.setdefault('locatorsupport.secrets', types.ModuleType('locatorsupport.secrets'))
+    secrets.configuration = {
+        'Benchmark': {
+            'path_to_roadgrinder': join(working_folder, 'RoadGrinder.gdb'),
+            'path_to_locators': locators,
+            'copy_destinations': destinations,
+            'username': None,
+            'password': None,
+            'host': None,
+            'incremental': incremental,
+            'warm_up': True
+        }
+    }
+
+    return import_pallet('mapserv', 'LocatorsPallet')
+
+
+def bench_locators(size, working_folder):
+    new_forklift(working_folder)
+    arcpy.geocoding.LOCATOR_BYTES = size * 1024
+
+    LocatorsPallet = new_locators(working_folder)
+
+    pallet = LocatorsPallet.LocatorsPallet()
+    pallet.build('Benchmark')
+    pallet.create_locators()
+
+    for crate in pallet.get_crates():
+        crate.result = (forklift.models.Crate.UPDATED, None)
+
+    start = perf_counter()
+    pallet.process()
+
+    return [('locators', size, perf_counter() - start)]
+
+
+def synthetic_reference_data(locators, size):
+    '''registers the locator crate tables with `size` address points and road segments and a tenth as many alternate names
+    '''
+    hash_field = forklift.core.hash_field
+
+    for primary, alternate, join_field, shape_type in [('AddressPoints', 'AtlNamesAddrPnts', 'UTAddPtID', 'Point'),
+                                                       ('GeocodeRoads', 'AtlNamesRoads', 'GLOBALID_SGID', 'Polyline')]:
+        rows = [{hash_field: '{}{:031d}'.format(primary[0], number), join_field: number, 'SHAPE': (number, number)} for number in range(size)]
+        arcpy.add_table(join(locators, primary), [hash_field, join_field], rows, shape_type=shape_type)
+
+        rows = [{hash_field: '{}{:031d}'.format(alternate[0], number), join_field: number * 10} for number in range(size // 10)]
+        arcpy.add_table(join(locators, alternate), [hash_field, join_field], rows, 'Table')
+
+
+def bench_incremental(size, working_folder):
+    new_forklift(working_folder)
+    arcpy.geocoding.LOCATOR_BYTES = 1024 * 1024
+
+    LocatorsPallet = new_locators(working_folder, incremental=True)
+
+    pallet = LocatorsPallet.LocatorsPallet()
+    pallet.build('Benchmark')
+    synthetic_reference_data(pallet.locators, size)
+    pallet.create_locators()
+
+    for crate in pallet.get_crates():
+        crate.result = (forklift.models.Crate.UPDATED, None)
+
+    results = []
+    for run in ['full', 'delta']:
+        start = perf_counter()
+        pallet.process()
+        results.append(('incremental ' + run, size, perf_counter() - start))
+
+        #: edit one percent of the address points
+        for row in arcpy.get_table(join(pallet.locators, 'AddressPoints')).rows[::100]:
+            row[forklift.core.hash_field] = 'edited' + row[forklift.core.hash_field][6:]
+
+    return results
+
+
+def bench_copier(size, working_folder):
+    sys.path.append(join(WAREHOUSE, 'mapserv'))
+    from locatorsupport.copier import fan_out
+
+    source = join(working_folder, 'AddressPoints_AddressSystem.lox')
+    with open(source, 'wb') as data:
+        data.write(random.Random(size).getrandbits(8 * 1024 * size).to_bytes(1024 * size, 'little'))
+
+    destinations = []
+    for number in range(4):
+        folder = join(working_folder, 'destination_{}'.format(number))
+        makedirs(folder)
+        destinations.append(join(folder, 'AddressPoints_AddressSystem.lox'))
+
+    start = perf_counter()
+    for destination in destinations:
+        shutil.copyfile(source, destination)
+    sequential = perf_counter() - start
+
+    start = perf_counter()
+    transfers = fan_out(source, destinations)
+    fanned_out = perf_counter() - start
+
+    failed = [transfer.destination for transfer in transfers if transfer.error is not None]
+    if failed:
+        raise Exception('fan out failed for {}'.format(', '.join(failed)))
+
+    return [('copier sequential', size, sequential), ('copier fan out', size, fanned_out)]
+
+
+def synthetic_wells(size, indian_country):
+    '''registers the DOGM views, the SGID destinations and the indian country polygons for `size` wells
+    '''
+    garage = forklift.models.GARAGE
+    random.seed(size)
+
+    surface_fields = ['API', 'WellName', 'CoordsSurf_E', 'CoordsSurf_N', 'UTMZone']
+    downhole_fields = ['API', 'ConstructNumber', 'CoordsBH_E', 'CoordsBH_N', 'UTMZone']
+
+    surface = []
+    downhole = []
+    for number in range(size):
+        api = '43{:08d}'.format(number)
+        zone = 11 if number % 10 == 0 else 12
+        if zone == 11:
+            x, y = random.uniform(740000, 770000), random.uniform(4100000, 4650000)
+        else:
+            x, y = random.uniform(230000, 670000), random.uniform(4100000, 4650000)
+
+        surface.append({'API': api, 'WellName': 'well {}'.format(number), 'CoordsSurf_E': x, 'CoordsSurf_N': y, 'UTMZone': zone})
+
+        for construct in range(number % 3):
+            for station in range(5):
+                downhole.append({'API': api, 'ConstructNumber': construct, 'CoordsBH_E': x + station * 10, 'CoordsBH_N': y - station * 10,
+                                 'UTMZone': zone})
+
+    dogm = join(garage, 'UTRBDMSNET.sde')
+    sgid = join(garage, 'SGID10_Energy.sde')
+    arcpy.add_table(join(dogm, 'UTRBDMSNET.dbo.viewAGRC_WellData_Surf'), surface_fields, surface, 'Table')
+    arcpy.add_table(join(dogm, 'UTRBDMSNET.dbo.viewAGRC_WellData_DownHole'), downhole_fields, downhole, 'Table')
+    arcpy.add_table(join(sgid, 'SGID10.ENERGY.OilGasWells'), surface_fields + ['Jurisdiction'])
+    arcpy.add_table(join(sgid, 'SGID10.ENERGY.OilGasWells_DownHoles'), downhole_fields)
+    arcpy.add_table(join(sgid, 'SGID10.ENERGY.OilGasWells_Paths'), ['API', 'ConstructNumber'], shape_type='Polyline')
+
+    reservations = []
+    for left in range(300000, 600000, 60000):
+        ring = [(left, 4300000), (left + 20000, 4300000), (left + 20000, 4400000), (left, 4400000), (left, 4300000)]
+        reservations.append({'SHAPE': arcpy.Polygon([arcpy.Point(*point) for point in ring])})
+    arcpy.add_table(indian_country, ['NAME'], reservations)
+
+
+def bench_ogm(size, working_folder):
+    new_forklift(working_folder)
+
+    secrets = sys.modules.setdefault('sgid_secrets', types.ModuleType('sgid_secrets'))
+    secrets.DEQSERVER = 'deqserver'
+
+    OGMPallet = import_pallet('sgid', 'OGMPallet')
+
+    synthetic_wells(size, r'C:\MapData\deqreferencedata.gdb\Total_IC_and_ReservationTribalLand')
+
+    pallet = OGMPallet.OGMPallet()
+    pallet.build('Dev')
+
+    start = perf_counter()
+    pallet.prepare_packaging()
+    first = perf_counter() - start
+
+    #: the next night only a few wells have changed
+    for row in arcpy.get_table(join(forklift.models.GARAGE, 'UTRBDMSNET.sde', 'UTRBDMSNET.dbo.viewAGRC_WellData_Surf')).rows[::100]:
+        row['WellName'] += ' edited'
+
+    start = perf_counter()
+    pallet.prepare_packaging()
+
+    return [('ogm', size, first), ('ogm next night', size, perf_counter() - start)]
+
+
+def bench_paths(size, working_folder):
+    sys.path.append(join(WAREHOUSE, 'sgid'))
+    from ogmsupport.paths import build_paths
+
+    generator = random.Random(size)
+    surface_points = {}
+    downhole_points = {}
+    for number in range(size):
+        x, y = generator.uniform(230000, 670000), generator.uniform(4100000, 4650000)
+        surface_points[number] = (x, y)
+
+        stations = [(x + station * 10.0, y - station * 10.0) for station in range(200)]
+        downhole_points[number] = {0: stations + stations[::2]}
+
+    start = perf_counter()
+    quadratic = []
+    for api in downhole_points:
+        for construct in downhole_points[api]:
+            points = [surface_points[api]] + downhole_points[api][construct]
+
+            unique_points = []
+            [unique_points.append(point) for point in points if point not in unique_points]
+
+            quadratic.append(unique_points)
+    membership = perf_counter() - start
+
+    start = perf_counter()
+    linear = list(build_paths(surface_points, (((api, construct), points) for api, constructs in downhole_points.items()
+                                               for construct, points in constructs.items())))
+    keyed = perf_counter() - start
+
+    if [len(points) * 2 for points in quadratic] != [len(coordinates) for api, construct, coordinates in linear]:
+        raise Exception('the dedupes disagree')
+
+    return [('paths membership', size, membership), ('paths keyed', size, keyed)]
+
+
+def synthetic_stations(size):
+    '''yields `size` down hole rows of (api, construct, x, y) in the order the view returns them with five stations to a
+    construct
+    '''
+    generator = random.Random(size)
+
+    for number in range(size // 5):
+        api = '43{:08d}'.format(number // 2)
+        x, y = generator.uniform(230000, 670000), generator.uniform(4100000, 4650000)
+
+        for station in range(5):
+            yield api, number % 2, x + station * 10.0, y - station * 10.0
+
+
+def bench_downholes(size, working_folder):
+    sys.path.append(join(WAREHOUSE, 'sgid'))
+    from ogmsupport.paths import build_paths
+    from ogmsupport.points import Points
+
+    def nested():
+        surface_points = {}
+        downhole_points = {}
+        for api, construct, x, y in synthetic_stations(size):
+            surface_points.setdefault(api, (x, y))
+            downhole_points.setdefault(api, {}).setdefault(construct, []).append((x, y))
+
+        stations = (((api, construct), points) for api, constructs in downhole_points.items() for construct, points in constructs.items())
+
+        return sum(1 for path in build_paths(surface_points, stations))
+
+    def flat():
+        surface_points = Points()
+        downhole_points = Points()
+        for api, construct, x, y in synthetic_stations(size):
+            if api not in surface_points.ids:
+                surface_points.add(api, x, y)
+            downhole_points.add((api, construct), x, y)
+
+        return sum(1 for path in build_paths(surface_points, downhole_points.groups()))
+
+    results = []
+    counts = []
+    for name, extract in [('downholes nested', nested), ('downholes flat', flat)]:
+        start = perf_counter()
+        counts.append(extract())
+        seconds = perf_counter() - start
+
+        #: tracemalloc only counts python allocations but unlike the rss its peak can be reset between variants. It
+        #: slows down every allocation so it is measured in a second run.
+        tracemalloc.start()
+        extract()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append((name, size, seconds, peak))
+
+    if set(counts) != set([size // 5]):
+        raise Exception('expected {} paths but built {}'.format(size // 5, counts))
+
+    return results
+
+
+SUITES = {
+    'maintenance': bench_maintenance,
+    'locators': bench_locators,
+    'incremental': bench_incremental,
+    'copier': bench_copier,
+    'ogm': bench_ogm,
+    'paths': bench_paths,
+    'downholes': bench_downholes
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time the pallets against the fake arcpy')
+    parser.add_argument('suites', nargs='*', default=sorted(SUITES), help=' '.join(sorted(SUITES)))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--latency', type=float, default=arcpy.SCALE, help='multiplies every fake arcpy latency')
+    args = parser.parse_args()
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error('unknown suites: {}'.format(', '.join(sorted(unknown))))
+
+    arcpy.SCALE = args.latency
+    logging.basicConfig(format='%(levelname)s %(asctime)s %(message)s', datefmt='%H:%M:%S', level=logging.WARNING)
+
+    print('{:<20} {:>8} {:>10} {:>10}'.format('suite', 'size', 'seconds', 'peak MB'))
+    for suite in args.suites:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as working_folder:
+                for result in SUITES[suite](size, working_folder):
+                    #: suites that measure memory add the peak bytes
+                    name, measured_size, seconds = result[:3]
+                    peak = '{:.1f}'.format(result[3] / 1024 / 1024) if len(result) > 3 else ''
+
+                    print('{:<20} {:>8} {:>10.3f} {:>10}'.format(name, measured_size, seconds, peak))
+
+
+if __name__ == '__main__':
+    #: the maintenance workers inherit the fake catalog from this process
+    multiprocessing.set_start_method('fork')
+
+    main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+arcpy
+
+An in memory stand in for the parts of arcpy that the pallets use. It is only for the benchmarks.
+
+Workspaces and tables are registered with `add_workspace` and `add_table`. Every call sleeps for the
+latency in `LATENCY` times `SCALE` so orchestration changes can be measured on a machine without ArcGIS.
+
+Tables in a .gdb folder that exists on disk are also pickled into it after each edit, like a file geodatabase, so
+the edits of worker processes are seen by their parent.
+'''
+
+import os
+import pickle
+import time
+from collections import namedtuple
+
+#: seconds that each call takes. per_* entries are multiplied by the number of things the call touches
+LATENCY = {
+    'Compress': 0.05,
+    'AnalyzeDatasets': 0.01,
+    'AnalyzeDatasets.per_dataset': 0.0005,
+    'List': 0.002,
+    'Describe': 0.002,
+    'Describe.per_child': 0.00001,
+    'GetCount': 0.0005,
+    'SQL': 0.0002,
+    'Cursor': 0.001,
+    'Cursor.per_row': 0.000002,
+    'Project': 0.00002,
+    'Tool': 0.005,
+    'Tool.per_row': 0.000001,
+    'RebuildAddressLocator': 0.1,
+    'RebuildAddressLocator.per_row': 0.00002,
+    'CreateAddressLocator': 0.1,
+    'CreateAddressLocator.per_row': 0.00002,
+}
+
+SCALE = float(os.environ.get('FAKE_ARCPY_LATENCY', '1'))
+
+#: workspace path -> Workspace
+WORKSPACES = {}
+
+#: table path -> Table
+TABLES = {}
+
+#: the number of times each call was made
+CALLS = {}
+
+Field = namedtuple('Field', ['name', 'type'])
+
+
+class ExecuteError(Exception):
+    pass
+
+
+def sleep(name, count=0):
+    CALLS[name] = CALLS.get(name, 0) + 1
+
+    seconds = LATENCY.get(name, 0) + LATENCY.get(name + '.per_' + _unit(name), 0) * count
+    if seconds > 0:
+        time.sleep(seconds * SCALE)
+
+
+def _unit(name):
+    units = {'AnalyzeDatasets': 'dataset', 'Describe': 'child', 'Cursor': 'row', 'Tool': 'row', 'RebuildAddressLocator': 'row', 'CreateAddressLocator': 'row'}
+
+    return units.get(name, '')
+
+
+def normalize(path):
+    return os.path.normcase(os.path.normpath(str(path)))
+
+
+class Workspace(object):
+    '''a geodatabase connection
+
+    user: the connected user
+    children: a list of (name, data type) tuples. Feature datasets are (name, 'FeatureDataset', [children])
+    states, versions, delta_rows: what the sde tables report
+    '''
+
+    def __init__(self, path, user='sde', children=None, states=1, versions=1, delta_rows=0):
+        self.path = path
+        self.user = user
+        self.children = children or []
+        self.states = states
+        self.versions = versions
+        self.delta_rows = delta_rows
+
+
+class Table(object):
+    '''a table or feature class. rows is a list of dictionaries keyed by field name. SHAPE holds the geometry.
+    '''
+
+    def __init__(self, path, fields, rows=None, data_type='FeatureClass', shape_type='Point'):
+        self.path = path
+        self.fields = list(fields)
+        self.rows = rows if rows is not None else []
+        self.data_type = data_type
+        self.shape_type = shape_type
+        self.last_oid = 0
+        #: the modified time of the file geodatabase copy that this was loaded from or saved to
+        self.saved = None
+
+        for row in self.rows:
+            row.setdefault('OBJECTID', self.new_oid())
+
+    def new_oid(self):
+        self.last_oid += 1
+
+        return self.last_oid
+
+
+def reset():
+    WORKSPACES.clear()
+    TABLES.clear()
+    CALLS.clear()
+
+
+def add_workspace(path, **kwargs):
+    workspace = Workspace(path, **kwargs)
+    WORKSPACES[normalize(path)] = workspace
+
+    return workspace
+
+
+def add_table(path, fields, rows=None, data_type='FeatureClass', shape_type='Point'):
+    table = Table(path, fields, rows, data_type, shape_type)
+    TABLES[normalize(path)] = table
+    save(table)
+
+    return table
+
+
+def _get_file(path):
+    '''returns the pickle of a table in a file geodatabase folder that exists on disk or None
+    '''
+    folder, name = os.path.split(str(path))
+
+    if not folder.lower().endswith('.gdb') or not os.path.isdir(folder):
+        return None
+
+    return os.path.join(folder, name + '.table')
+
+
+def save(table):
+    '''writes a table in a file geodatabase to disk
+    '''
+    path = _get_file(table.path)
+    if path is None:
+        return
+
+    with open(path + '.partial', 'wb') as data:
+        pickle.dump(table, data)
+
+    os.replace(path + '.partial', path)
+    table.saved = os.stat(path).st_mtime_ns
+
+
+def get_table(path):
+    if isinstance(path, Layer):
+        return path.table
+
+    key = normalize(path)
+    table = TABLES.get(key)
+
+    #: another process may have edited the file geodatabase copy
+    table_file = _get_file(path)
+    if table_file is not None and os.path.exists(table_file):
+        saved = os.stat(table_file).st_mtime_ns
+
+        if table is None or table.saved != saved:
+            with open(table_file, 'rb') as data:
+                table = TABLES[key] = pickle.load(data)
+
+            table.saved = saved
+
+    if table is None:
+        raise ExecuteError('ERROR 000732: Dataset {} does not exist or is not supported'.format(path))
+
+    return table
+
+
+class Env(object):
+    def __init__(self):
+        self.workspace = None
+        self.scratchGDB = os.path.join(os.environ.get('TMP', '/tmp'), 'scratch.gdb')
+        self.overwriteOutput = False
+
+
+env = Env()
+
+
+class SpatialReference(object):
+    def __init__(self, factory_code=None):
+        self.factoryCode = factory_code
+
+    def __eq__(self, other):
+        return isinstance(other, SpatialReference) and other.factoryCode == self.factoryCode
+
+
+class Point(object):
+    def __init__(self, X=None, Y=None):
+        self.X = X
+        self.Y = Y
+
+
+class Array(list):
+    pass
+
+
+class PointGeometry(object):
+    def __init__(self, point, spatial_reference=None):
+        self.firstPoint = point
+        self.spatialReference = spatial_reference
+
+    @property
+    def x(self):
+        return self.firstPoint.X
+
+    @property
+    def y(self):
+        return self.firstPoint.Y
+
+    def projectAs(self, spatial_reference):
+        from arcpy import _projection
+
+        sleep('Project')
+        x, y = _projection.reproject(self.firstPoint.X, self.firstPoint.Y, self.spatialReference.factoryCode, spatial_reference.factoryCode)
+
+        return PointGeometry(Point(x, y), spatial_reference)
+
+
+class Polyline(object):
+    def __init__(self, array, spatial_reference=None):
+        self.points = list(array)
+        self.spatialReference = spatial_reference
+        self.pointCount = len(self.points)
+        self.firstPoint = self.points[0] if self.points else None
+        self.lastPoint = self.points[-1] if self.points else None
+
+
+class Polygon(object):
+    def __init__(self, array, spatial_reference=None):
+        self.points = list(array)
+        self.spatialReference = spatial_reference
+
+    @property
+    def extent(self):
+        xs = [point.X for point in self.points]
+        ys = [point.Y for point in self.points]
+
+        return Extent(min(xs), min(ys), max(xs), max(ys))
+
+    def __iter__(self):
+        return iter([Array(self.points)])
+
+    def contains(self, geometry):
+        return _point_in_ring(geometry.firstPoint.X, geometry.firstPoint.Y, [(point.X, point.Y) for point in self.points])
+
+
+Extent = namedtuple('Extent', ['XMin', 'YMin', 'XMax', 'YMax'])
+
+
+def _point_in_ring(x, y, ring):
+    inside = False
+    j = len(ring) - 1
+
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+
+        j = i
+
+    return inside
+
+
+class _Describe(object):
+    pass
+
+
+class _DescribeWorkspace(_Describe):
+    '''describing a workspace is quick. Its children are described when they are first read.
+    '''
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+
+    @property
+    def children(self):
+        sleep('Describe', sum(1 + len(child[2]) if len(child) > 2 else 1 for child in self.workspace.children))
+
+        return [_describe_child(*child) for child in self.workspace.children]
+
+
+def _describe_child(name, data_type, children=None):
+    description = _Describe()
+    description.name = name
+    description.dataType = data_type
+    description.children = [_describe_child(*child) for child in children or []]
+
+    return description
+
+
+def Describe(path):
+    key = normalize(path)
+
+    if key in WORKSPACES:
+        workspace = WORKSPACES[key]
+        sleep('Describe')
+
+        description = _DescribeWorkspace(workspace)
+        description.dataType = 'Workspace'
+        description.connectionProperties = _Describe()
+        description.connectionProperties.user = workspace.user
+        description.fullPropsRetrieved = True
+        description.workspaceFactoryProgID = 'esriDataSourcesGDB.SdeWorkspaceFactory.1'
+
+        return description
+
+    table = get_table(path)
+    sleep('Describe')
+
+    description = _Describe()
+    description.dataType = table.data_type
+    description.name = os.path.basename(table.path)
+    description.fields = [Field(name, 'String') for name in table.fields]
+    description.shapeType = table.shape_type
+    description.spatialReference = SpatialReference(26912)
+
+    return description
+
+
+def Exists(path):
+    key = normalize(path)
+
+    table_file = _get_file(path)
+
+    return key in WORKSPACES or key in TABLES or (table_file is not None and os.path.exists(table_file))
+
+
+def _children(workspace_path):
+    key = normalize(workspace_path)
+
+    if key in WORKSPACES:
+        return WORKSPACES[key].children
+
+    parent, dataset = os.path.split(key)
+    for child in WORKSPACES.get(parent, Workspace(parent)).children:
+        if normalize(child[0]) == normalize(dataset) and len(child) > 2:
+            return child[2]
+
+    return []
+
+
+def _list(data_types):
+    sleep('List')
+
+    return [child[0] for child in _children(env.workspace) if child[1] in data_types]
+
+
+def ListTables(wild_card=None, table_type=None):
+    return _list(['Table'])
+
+
+def ListFeatureClasses(wild_card=None, feature_type=None, feature_dataset=None):
+    return _list(['FeatureClass'])
+
+
+def ListRasters(wild_card=None, raster_type=None):
+    return _list(['RasterDataset'])
+
+
+def ListDatasets(wild_card=None, feature_type=None):
+    if feature_type == 'Feature':
+        return _list(['FeatureDataset'])
+
+    return _list(['FeatureDataset', 'Topology', 'GeometricNetwork'])
+
+
+class Result(list):
+    def getOutput(self, index):
+        return self[index]
+
+
+def GetCount_management(path):
+    sleep('GetCount')
+
+    return Result([str(len(get_table(path).rows))])
+
+
+def Compress_management(workspace):
+    sleep('Compress')
+
+    WORKSPACES[normalize(workspace)].states = 1
+
+
+def AnalyzeDatasets_management(workspace, include_system='NO_SYSTEM', in_datasets=None, *args):
+    sleep('AnalyzeDatasets', len(in_datasets or []))
+
+    names = set()
+    for child in _children(workspace):
+        names.add(child[0])
+        names.update(grandchild[0] for grandchild in (child[2] if len(child) > 2 else []))
+
+    missing = [dataset for dataset in in_datasets or [] if dataset not in names]
+    if missing:
+        raise ExecuteError('ERROR 000732: Input Datasets: Dataset {} does not exist or is not supported'.format(';'.join(missing)))
+
+
+class ArcSDESQLExecute(object):
+    '''answers the handful of queries that the maintenance code makes about the sde tables
+    '''
+
+    def __init__(self, workspace):
+        key = normalize(workspace)
+        if key not in WORKSPACES:
+            raise ExecuteError('Failed to connect to {}'.format(workspace))
+
+        self.workspace = WORKSPACES[key]
+
+    def execute(self, sql):
+        sleep('SQL')
+
+        if 'SDE_states' in sql:
+            return self.workspace.states
+        if 'SDE_versions' in sql:
+            return self.workspace.versions
+        if 'SDE_state_lineages' in sql:
+            return self.workspace.states
+        if 'SDE_table_registry' in sql:
+            raise ExecuteError('table registry is not faked')
+
+        raise ExecuteError('unsupported query: {}'.format(sql))
+
+
+from arcpy import da  # noqa: E402
+from arcpy import geocoding  # noqa: E402
+from arcpy import management  # noqa: E402
+from arcpy.management import Layer  # noqa: E402
+
+CreateFileGDB_management = management.CreateFileGDB
+CreateTable_management = management.CreateTable
+TruncateTable_management = management.TruncateTable
+Append_management = management.Append
+MakeFeatureLayer_management = management.MakeFeatureLayer
+SelectLayerByLocation_management = management.SelectLayerByLocation
+SelectLayerByAttribute_management = management.SelectLayerByAttribute
+CalculateField_management = management.CalculateField
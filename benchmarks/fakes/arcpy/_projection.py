@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+_projection.py
+
+NAD83 UTM zone 11 and 12 projections for the fake projectAs. The formulas are the transverse mercator
+series from Snyder, Map Projections - A Working Manual (USGS PP 1395) on the GRS 1980 ellipsoid.
+'''
+
+from math import cos
+from math import degrees
+from math import radians
+from math import sin
+from math import sqrt
+from math import tan
+
+A = 6378137.0
+F = 1 / 298.257222101
+E2 = 2 * F - F * F
+EP2 = E2 / (1 - E2)
+K0 = 0.9996
+FALSE_EASTING = 500000.0
+
+#: factory code -> central meridian
+ZONES = {26911: -117.0, 26912: -111.0}
+
+
+def _meridian_arc(phi):
+    e4 = E2 * E2
+    e6 = e4 * E2
+
+    return A * ((1 - E2 / 4 - 3 * e4 / 64 - 5 * e6 / 256) * phi - (3 * E2 / 8 + 3 * e4 / 32 + 45 * e6 / 1024) * sin(2 * phi) +
+                (15 * e4 / 256 + 45 * e6 / 1024) * sin(4 * phi) - (35 * e6 / 3072) * sin(6 * phi))
+
+
+def to_geographic(x, y, central_meridian):
+    e4 = E2 * E2
+    e6 = e4 * E2
+    e1 = (1 - sqrt(1 - E2)) / (1 + sqrt(1 - E2))
+
+    mu = (y / K0) / (A * (1 - E2 / 4 - 3 * e4 / 64 - 5 * e6 / 256))
+    phi1 = (mu + (3 * e1 / 2 - 27 * e1**3 / 32) * sin(2 * mu) + (21 * e1**2 / 16 - 55 * e1**4 / 32) * sin(4 * mu) +
+            (151 * e1**3 / 96) * sin(6 * mu) + (1097 * e1**4 / 512) * sin(8 * mu))
+
+    c1 = EP2 * cos(phi1)**2
+    t1 = tan(phi1)**2
+    n1 = A / sqrt(1 - E2 * sin(phi1)**2)
+    r1 = A * (1 - E2) / (1 - E2 * sin(phi1)**2)**1.5
+    d = (x - FALSE_EASTING) / (n1 * K0)
+
+    phi = phi1 - (n1 * tan(phi1) / r1) * (d**2 / 2 - (5 + 3 * t1 + 10 * c1 - 4 * c1**2 - 9 * EP2) * d**4 / 24 +
+                                          (61 + 90 * t1 + 298 * c1 + 45 * t1**2 - 252 * EP2 - 3 * c1**2) * d**6 / 720)
+    lam = (d - (1 + 2 * t1 + c1) * d**3 / 6 + (5 - 2 * c1 + 28 * t1 - 3 * c1**2 + 8 * EP2 + 24 * t1**2) * d**5 / 120) / cos(phi1)
+
+    return degrees(lam) + central_meridian, degrees(phi)
+
+
+def to_projected(longitude, latitude, central_meridian):
+    phi = radians(latitude)
+    n = A / sqrt(1 - E2 * sin(phi)**2)
+    t = tan(phi)**2
+    c = EP2 * cos(phi)**2
+    a = radians(longitude - central_meridian) * cos(phi)
+
+    x = K0 * n * (a + (1 - t + c) * a**3 / 6 + (5 - 18 * t + t**2 + 72 * c - 58 * EP2) * a**5 / 120) + FALSE_EASTING
+    y = K0 * (_meridian_arc(phi) + n * tan(phi) * (a**2 / 2 + (5 - t + 9 * c + 4 * c**2) * a**4 / 24 +
+                                                  (61 - 58 * t + t**2 + 600 * c - 330 * EP2) * a**6 / 720))
+
+    return x, y
+
+
+def reproject(x, y, from_code, to_code):
+    if from_code == to_code:
+        return x, y
+
+    longitude, latitude = to_geographic(x, y, ZONES[from_code])
+
+    return to_projected(longitude, latitude, ZONES[to_code])
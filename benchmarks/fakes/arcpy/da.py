@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+da.py
+
+Fake data access cursors over the in memory tables
+'''
+
+import re
+from os.path import join
+
+import arcpy
+
+SHAPE = 'SHAPE'
+NOT_NULL = re.compile(r'^\s*(\w+)\s+IS\s+NOT\s+NULL\s*$', re.I)
+EQUALS = re.compile(r'''^\s*(\w+)\s*=\s*'?([^']*)'?\s*$''')
+
+
+def _where(where_clause):
+    '''returns a predicate for the tiny subset of sql that the pallets use
+    '''
+    if not where_clause:
+        return lambda row: True
+
+    tests = []
+    for condition in re.split(r'\s+AND\s+', where_clause, flags=re.I):
+        not_null = NOT_NULL.match(condition)
+        equals = EQUALS.match(condition)
+
+        if not_null:
+            tests.append(lambda row, field=not_null.group(1): row.get(field) is not None)
+        elif equals:
+            tests.append(lambda row, field=equals.group(1), value=equals.group(2): str(row.get(field)) == value)
+        else:
+            raise arcpy.ExecuteError('unsupported where clause: {}'.format(where_clause))
+
+    return lambda row: all(test(row) for test in tests)
+
+
+def _order(sql_clause):
+    if not sql_clause or not sql_clause[1]:
+        return None
+
+    match = re.match(r'^\s*ORDER\s+BY\s+(.+)$', sql_clause[1], re.I)
+    if not match:
+        return None
+
+    return [field.strip() for field in match.group(1).split(',')]
+
+
+def _read(row, field):
+    if field == 'SHAPE@XY':
+        shape = row.get(SHAPE)
+        if isinstance(shape, arcpy.PointGeometry):
+            return (shape.x, shape.y)
+
+        return shape
+    if field == 'SHAPE@':
+        shape = row.get(SHAPE)
+        if isinstance(shape, tuple):
+            return arcpy.PointGeometry(arcpy.Point(*shape))
+
+        return shape
+    if field == 'SHAPE@WKT':
+        shape = row.get(SHAPE)
+        if shape is None:
+            return None
+        if isinstance(shape, tuple):
+            return 'POINT ({} {})'.format(*shape)
+
+        return 'MULTILINESTRING (({}))'.format(', '.join('{} {}'.format(point.X, point.Y) for point in shape.points))
+    if field in ['OID@', 'OBJECTID']:
+        return row.get('OBJECTID')
+
+    return row.get(field)
+
+
+def _write(row, field, value):
+    if field == 'SHAPE@XY':
+        row[SHAPE] = value
+    elif field == 'SHAPE@':
+        if isinstance(value, arcpy.PointGeometry):
+            value = (value.x, value.y)
+
+        row[SHAPE] = value
+    else:
+        row[field] = value
+
+
+class _Cursor(object):
+    def __init__(self, in_table, field_names):
+        self.table = arcpy.get_table(in_table)
+        self.fields = list(field_names)
+
+        arcpy.sleep('Cursor')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class SearchCursor(_Cursor):
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False, sql_clause=None):
+        super(SearchCursor, self).__init__(in_table, field_names)
+
+        test = _where(where_clause)
+        self.rows = [row for row in self.table.rows if test(row)]
+
+        order = _order(sql_clause)
+        if order:
+            self.rows.sort(key=lambda row: tuple(row.get(field) for field in order))
+
+        arcpy.sleep('Cursor', len(self.rows))
+
+    def __iter__(self):
+        for row in self.rows:
+            yield tuple(_read(row, field) for field in self.fields)
+
+
+class InsertCursor(_Cursor):
+    def __exit__(self, exc_type, exc_value, traceback):
+        arcpy.save(self.table)
+
+        return False
+
+    def insertRow(self, values):
+        row = {}
+        for field, value in zip(self.fields, values):
+            _write(row, field, value)
+
+        row['OBJECTID'] = self.table.new_oid()
+        self.table.rows.append(row)
+
+        return row['OBJECTID']
+
+
+class UpdateCursor(SearchCursor):
+    def __exit__(self, exc_type, exc_value, traceback):
+        arcpy.save(self.table)
+
+        return False
+
+    def __iter__(self):
+        for row in list(self.rows):
+            self.current = row
+
+            yield [_read(row, field) for field in self.fields]
+
+    def updateRow(self, values):
+        for field, value in zip(self.fields, values):
+            _write(self.current, field, value)
+
+    def deleteRow(self):
+        self.table.rows.remove(self.current)
+
+
+class Editor(object):
+    def __init__(self, workspace, multiuser_mode=True):
+        self.workspace = workspace
+
+    def __enter__(self):
+        arcpy.sleep('Tool')
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        arcpy.sleep('Tool')
+
+        return False
+
+
+def Walk(top, topdown=True, onerror=None, followlinks=False, datatype=None, type=None):
+    '''yields (folder, feature datasets, names) for the workspace and each of its feature datasets
+    '''
+    arcpy.sleep('List')
+
+    data_types = None if datatype in [None, 'Any'] else set([datatype] if isinstance(datatype, str) else datatype)
+
+    def names(children):
+        return [child[0] for child in children if child[1] != 'FeatureDataset' and (data_types is None or child[1] in data_types)]
+
+    children = arcpy.WORKSPACES[arcpy.normalize(top)].children
+    feature_datasets = [child for child in children if child[1] == 'FeatureDataset']
+
+    yield top, [child[0] for child in feature_datasets], names(children)
+
+    for feature_dataset in feature_datasets:
+        yield join(top, feature_dataset[0]), [], names(feature_dataset[2])
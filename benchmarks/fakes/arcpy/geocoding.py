@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+geocoding.py
+
+Fake locator tools that write locator files of `LOCATOR_BYTES` to disk. They take longer the more rows there are in
+the reference data. The reference data is kept in the .loc so a rebuild can find it.
+'''
+
+import os
+import re
+
+import arcpy
+
+LOCATOR_BYTES = 1024 * 1024
+
+LOC = '''[Locator]
+Name = fake
+ReferenceData = {}
+'''
+
+LOC_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<locator_properties><locator><ref_data><data_source><workspace_properties><path>fake</path></workspace_properties></data_source></ref_data></locator></locator_properties>
+'''
+
+
+def _write_lox(locator):
+    with open(locator + '.lox', 'wb') as lox:
+        lox.write(os.urandom(LOCATOR_BYTES))
+
+
+def _count_rows(reference_data):
+    rows = 0
+
+    for table in re.findall(r"([^;]+?) '[^']+'", reference_data or ''):
+        key = arcpy.normalize(table.strip())
+        if key in arcpy.TABLES:
+            rows += len(arcpy.TABLES[key].rows)
+
+    return rows
+
+
+def CreateAddressLocator(in_address_locator_style=None, in_reference_data=None, in_field_map=None, out_address_locator=None, *args, **kwargs):
+    arcpy.sleep('CreateAddressLocator', _count_rows(in_reference_data))
+
+    with open(out_address_locator + '.loc', 'w') as loc:
+        loc.write(LOC.format(in_reference_data or ''))
+
+    with open(out_address_locator + '.loc.xml', 'w') as loc_xml:
+        loc_xml.write(LOC_XML)
+
+    _write_lox(out_address_locator)
+
+
+def RebuildAddressLocator(in_address_locator):
+    reference_data = ''
+    with open(in_address_locator + '.loc') as loc:
+        for line in loc:
+            if line.startswith('ReferenceData = '):
+                reference_data = line[len('ReferenceData = '):].strip()
+
+    arcpy.sleep('RebuildAddressLocator', _count_rows(reference_data))
+
+    _write_lox(in_address_locator)
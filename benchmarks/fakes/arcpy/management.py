@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+management.py
+
+Fake data management tools over the in memory tables
+'''
+
+import ast
+from os import makedirs
+from os.path import join
+
+import arcpy
+
+
+class Layer(object):
+    '''a feature layer with a selection. An empty selection means every row
+    '''
+
+    def __init__(self, table):
+        self.table = table
+        self.selection = None
+
+    def selected(self):
+        if self.selection is None:
+            return self.table.rows
+
+        return [row for row in self.table.rows if id(row) in self.selection]
+
+
+LAYERS = {}
+
+
+def _layer(layer):
+    if isinstance(layer, Layer):
+        return layer
+
+    return LAYERS[layer]
+
+
+def TruncateTable(in_table):
+    table = arcpy.get_table(in_table)
+    arcpy.sleep('Tool', len(table.rows))
+
+    del table.rows[:]
+    arcpy.save(table)
+
+
+def DeleteRows(in_rows):
+    TruncateTable(in_rows)
+
+
+def Append(inputs, target, schema_type='TEST', *args, **kwargs):
+    source = arcpy.get_table(inputs)
+    destination = arcpy.get_table(target)
+    arcpy.sleep('Tool', len(source.rows))
+
+    fields = set(destination.fields) | set([arcpy.da.SHAPE])
+    for row in source.rows:
+        copy = {field: value for field, value in row.items() if field in fields}
+        copy['OBJECTID'] = destination.new_oid()
+        destination.rows.append(copy)
+
+    arcpy.save(destination)
+
+
+def CreateFileGDB(out_folder_path, out_name, *args, **kwargs):
+    arcpy.sleep('Tool')
+
+    makedirs(join(out_folder_path, out_name), exist_ok=True)
+
+
+def CreateFeatureclass(out_path, out_name, geometry_type=None, template=None, *args, **kwargs):
+    arcpy.sleep('Tool')
+
+    fields = arcpy.get_table(template).fields if template else []
+    shape_type = arcpy.get_table(template).shape_type if template else 'Point'
+
+    return arcpy.add_table(join(out_path, out_name), fields, shape_type=geometry_type.title() if geometry_type else shape_type)
+
+
+def CreateTable(out_path, out_name, template=None, *args, **kwargs):
+    arcpy.sleep('Tool')
+
+    fields = arcpy.get_table(template).fields if template else []
+
+    return arcpy.add_table(join(out_path, out_name), fields, data_type='Table')
+
+
+def AddField(in_table, field_name, field_type, *args, **kwargs):
+    arcpy.sleep('Tool')
+
+    arcpy.get_table(in_table).fields.append(field_name)
+
+
+def MakeFeatureLayer(in_features, out_layer=None, *args, **kwargs):
+    table = arcpy.get_table(in_features)
+    arcpy.sleep('Tool')
+
+    layer = Layer(table)
+    if out_layer:
+        LAYERS[out_layer] = layer
+
+    return layer
+
+
+def CalculateField(in_table, field, expression, expression_type=None, *args, **kwargs):
+    if isinstance(in_table, Layer) or in_table in LAYERS:
+        rows = _layer(in_table).selected()
+    else:
+        rows = arcpy.get_table(in_table).rows
+
+    arcpy.sleep('Tool', len(rows))
+
+    value = ast.literal_eval(expression)
+    for row in rows:
+        row[field] = value
+
+
+def SelectLayerByLocation(in_layer, overlap_type='INTERSECT', select_features=None, *args, **kwargs):
+    layer = _layer(in_layer)
+    polygons = [row[arcpy.da.SHAPE] for row in arcpy.get_table(select_features).rows]
+
+    arcpy.sleep('Tool', len(layer.table.rows) * max(len(polygons), 1))
+
+    layer.selection = set()
+    for row in layer.table.rows:
+        shape = row.get(arcpy.da.SHAPE)
+        if shape is None:
+            continue
+
+        point = arcpy.PointGeometry(arcpy.Point(*shape))
+        if any(polygon.contains(point) for polygon in polygons):
+            layer.selection.add(id(row))
+
+    return layer
+
+
+def SelectLayerByAttribute(in_layer_or_view, selection_type='NEW_SELECTION', *args, **kwargs):
+    layer = _layer(in_layer_or_view)
+    arcpy.sleep('Tool')
+
+    if selection_type == 'SWITCH_SELECTION':
+        selected = layer.selection or set()
+        layer.selection = set(id(row) for row in layer.table.rows if id(row) not in selected)
+    elif selection_type == 'CLEAR_SELECTION':
+        layer.selection = None
+
+    return layer
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+arcgis.py
+
+Fake forklift LightSwitch that records the service outages
+'''
+
+import time
+
+#: seconds that stopping or starting a service takes
+LATENCY = 0.01
+
+#: (service, state, perf_counter) for every change
+HISTORY = []
+
+
+class LightSwitch(object):
+    def set_credentials(self, username=None, password=None, host=None):
+        self.host = host
+
+    def ensure(self, what, services):
+        time.sleep(LATENCY)
+
+        for service in services:
+            HISTORY.append((service, what, time.perf_counter()))
+
+        return (True, [])
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+core.py
+
+Fake forklift core constants
+'''
+
+hash_field = 'FORKLIFT_HASH'
+hash_field_length = 32
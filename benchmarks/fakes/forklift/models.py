@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+models.py
+
+Fake forklift Pallet and Crate for the benchmarks. GARAGE and STAGING_RACK are set by the benchmark.
+'''
+
+import logging
+from os.path import join
+
+GARAGE = None
+STAGING_RACK = None
+
+
+class Crate(object):
+    NO_CHANGES = 'No changes found.'
+    CREATED = 'Created table successfully.'
+    UPDATED = 'Data updated successfully.'
+    WARNING = 'Warning generated during update.'
+    ERROR = 'Error generated during update.'
+    UNHANDLED_EXCEPTION = 'Unhandled exception during update.'
+    INVALID_DATA = 'Data is invalid.'
+
+    def __init__(self, source_name, source_workspace, destination_workspace, destination_name=None):
+        self.source_name = source_name
+        self.source_workspace = source_workspace
+        self.destination_workspace = destination_workspace
+        self.destination_name = destination_name or source_name
+        self.source = join(source_workspace, source_name)
+        self.destination = join(destination_workspace, self.destination_name)
+        self.result = (Crate.NO_CHANGES, None)
+
+
+class Pallet(object):
+    def __init__(self, arg=None):
+        self.garage = GARAGE
+        self.staging_rack = STAGING_RACK
+        self.log = logging.getLogger('forklift')
+        self.success = (True, None)
+        self.arcgis_services = []
+        self.copy_data = []
+        self.destination_coordinate_system = None
+        self._crates = []
+        self.emails = []
+
+    def build(self, configuration='Production'):
+        pass
+
+    def is_ready_to_ship(self):
+        return True
+
+    def ship(self):
+        pass
+
+    def process(self):
+        pass
+
+    def prepare_packaging(self):
+        pass
+
+    def get_crates(self):
+        return self._crates
+
+    def add_crate(self, crate_info, workspace_info=None):
+        if isinstance(crate_info, str):
+            crate_info = (crate_info, workspace_info['source_workspace'], workspace_info['destination_workspace'])
+
+        self._crates.append(Crate(*crate_info))
+
+    def add_crates(self, crate_infos, workspace_info=None):
+        for crate_info in crate_infos:
+            self.add_crate(crate_info, workspace_info)
+
+    def send_email(self, to, subject, body):
+        self.emails.append((to, subject, body))
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+seat.py
+
+Fake forklift seat helpers
+'''
+
+
+def format_time(seconds):
+    if seconds < 60:
+        return '{:.2f} seconds'.format(seconds)
+
+    return '{:.2f} minutes'.format(seconds / 60)
@@ -10,15 +10,27 @@ It exports the data into an FGDB so that forklift can read it. The UDSH SQL data
 '''
 
 
+import sys
 from forklift.models import Pallet
+from os.path import abspath
+from os.path import dirname
 from os.path import join
 import arcpy
 import history_secrets as secrets
 
+sys.path.append(dirname(dirname(dirname(abspath(__file__)))))
+
+from palletsupport.reference import ReferenceCache  # noqa: E402
+
 
 class HistoricalSitesPallet(Pallet):
     def build(self, config):
-        self.udsh = r'\\{}\c$\Scheduled\LocalScripts\DataPickup\UDSHSpatial_New.gdb'.format(secrets.UDSH_MACHINE)
+        self.remote_udsh = r'\\{}\c$\Scheduled\LocalScripts\DataPickup\UDSHSpatial_New.gdb'.format(secrets.UDSH_MACHINE)
+
+        #: the crates read a local mirror so an unreachable share doesn't fail the build. It is brought up to date for the
+        #: next lift in prepare_packaging and only copied again when the export changed.
+        self.cache = ReferenceCache(join(self.staging_rack, 'reference'))
+        self.udsh = self.cache.locate(self.remote_udsh)
         self.udsh_stage = join(self.staging_rack, 'UDSHSpatial_New.gdb')
         self.sgid = join(self.garage, 'SGID_History@SGID10.sde')
 
@@ -43,3 +55,10 @@ class HistoricalSitesPallet(Pallet):
         arcpy.CalculateField_management(archSitesFL, field, '"Site(s) Present"', 'PYTHON')
         arcpy.SelectLayerByAttribute_management(archSitesFL, 'SWITCH_SELECTION')
         arcpy.CalculateField_management(archSitesFL, field, '"Site Presence Unknown"', 'PYTHON')
+
+    def prepare_packaging(self):
+        self.cache.get(self.remote_udsh)
+
+        self.log.info('reference cache: %i hits, %i misses, %i bytes copied, %i stale', *self.cache.get_stats())
+        for error in self.cache.errors:
+            self.log.warning('using the last copy of %s', error)
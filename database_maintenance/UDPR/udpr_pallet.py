@@ -6,53 +6,34 @@ udpr.py
 Database maintenance for the UDPR database
 '''
 
-import arcpy
+import sys
 from forklift.models import Pallet
+from os.path import abspath
+from os.path import dirname
 from os.path import join
 from traceback import format_exc
 
+sys.path.append(dirname(dirname(dirname(abspath(__file__)))))
 
-class UdprPallet(Pallet):
-    def ship(self):
-        try:
-            # Run commands as user SDE to compress and analyze database and system tableps
-            sdeconnection = join(self.garage, 'UDPR', 'DNR_sde@UDPR@itdb104sp.dts.utah.gov.sde')
-            arcpy.Compress_management(sdeconnection)
-            self.log.info('Compress Complete')
-            arcpy.AnalyzeDatasets_management(sdeconnection, 'SYSTEM')
-            self.log.info('Analyze System Tables Complete')
-
-            userconnections = [join(self.garage, 'UDPR', 'DNR_OHV@UDPR@itdb104sp.dts.utah.gov.sde'),
-                               join(self.garage, 'UDPR', 'DNR_susanz@UDPR@itdb104sp.dts.utah.gov.sde')]
-
-            for con in userconnections:
-                # set workspace
-                # the user in this workspace must be the owner of the data to analyze.
-                workspace = con
+from palletsupport.maintenance import Maintenance  # noqa: E402
 
-                # set the workspace environment
-                arcpy.env.workspace = workspace
 
-                # NOTE: Analyze Datasets can accept a Python list of datasets.
-
-                # Get a list of all the datasets the user has access to.
-                # First, get all the stand alone tables, feature classes and rasters.
-                dataList = arcpy.ListTables() + arcpy.ListFeatureClasses() + arcpy.ListRasters()
-
-                # Next, for feature datasets get all of the datasets and featureclasses
-                # from the list and add them to the master list.
-                for dataset in arcpy.ListDatasets('', 'Feature'):
-                    arcpy.env.workspace = join(workspace, dataset)
-                    dataList += arcpy.ListFeatureClasses() + arcpy.ListDatasets()
+class UdprPallet(Pallet):
 
-                    # reset the workspace
-                    arcpy.env.workspace = workspace
+    def is_ready_to_ship(self):
+        return self.maintenance.is_ready_to_ship(self)
 
-                    # Execute analyze datasets
-                    # Note: to use the 'SYSTEM' option the workspace user must be an administrator.
-                    arcpy.AnalyzeDatasets_management(workspace, 'NO_SYSTEM', dataList, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
-                    self.log.info('Analyze Complete')
+    def build(self, configuration=None):
+        #: the admin user compresses and analyzes the system tables
+        #: the owners must be the owner of the data they analyze
+        self.maintenance = Maintenance(join(self.garage, 'UDPR', 'DNR_sde@UDPR@itdb104sp.dts.utah.gov.sde'), [
+            join(self.garage, 'UDPR', 'DNR_OHV@UDPR@itdb104sp.dts.utah.gov.sde'),
+            join(self.garage, 'UDPR', 'DNR_susanz@UDPR@itdb104sp.dts.utah.gov.sde')
+        ], store=join(self.staging_rack, 'maintenance.sqlite'))
 
+    def ship(self):
+        try:
+            self.maintenance.run(self.log)
         except Exception:
             self.send_email('michaelfoulger@utah.gov', 'Error with {}'.format(__file__), format_exc())
             raise
@@ -6,57 +6,33 @@ uemp.py
 A module that contains a template for database maintenance pallets
 '''
 
-import arcpy
+import sys
 from forklift.models import Pallet
+from os.path import abspath
+from os.path import dirname
 from os.path import join
 from traceback import format_exc
 
+sys.path.append(dirname(dirname(dirname(abspath(__file__)))))
 
-class UempPallet(Pallet):
-
-    def ship(self):
-        try:
-            #: Run commands as user SDE to compress and analyze database and system tables
-            sdeconnection = join(self.garage, 'UEMP', 'sde@UEMP@itdb104sp.dts.utah.gov.sde')
-
-            arcpy.Compress_management(sdeconnection)
-            self.log.info('Compress Complete')
-
-            arcpy.AnalyzeDatasets_management(sdeconnection, 'SYSTEM')
-            self.log.info('Analyze System Tables Complete')
-
-            userconnections = [join(self.garage, 'UEMP', 'uempadmin@UEMP@uemp.agrc.utah.gov.sde')]
+from palletsupport.maintenance import Maintenance  # noqa: E402
 
-            for con in userconnections:
-                # set workspace
-                # the user in this workspace must be the owner of the data to analyze.
-                workspace = con
 
-                # set the workspace environment
-                arcpy.env.workspace = workspace
-
-                # NOTE: Analyze Datasets can accept a Python list of datasets.
-
-                # Get a list of all the datasets the user has access to.
-                # First, get all the stand alone tables, feature classes and rasters.
-                dataList = arcpy.ListTables() + arcpy.ListFeatureClasses() + arcpy.ListRasters()
-
-                # Next, for feature datasets get all of the datasets and featureclasses
-                # from the list and add them to the master list.
-                for dataset in arcpy.ListDatasets('', 'Feature'):
-                    arcpy.env.workspace = join(workspace, dataset)
-                    dataList += arcpy.ListFeatureClasses() + arcpy.ListDatasets()
+class UempPallet(Pallet):
 
-                # reset the workspace
-                arcpy.env.workspace = workspace
+    def is_ready_to_ship(self):
+        return self.maintenance.is_ready_to_ship(self)
 
-                # Execute analyze datasets
-                # Note: to use the 'SYSTEM' option the workspace user must be an administrator.
-                if len(dataList) > 0:
-                    arcpy.AnalyzeDatasets_management(workspace, 'NO_SYSTEM', dataList, 'ANALYZE_BASE', 'ANALYZE_DELTA',
-                                                     'ANALYZE_ARCHIVE')
-                    self.log.info('Analyze Complete')
+    def build(self, configuration=None):
+        #: the admin user compresses and analyzes the system tables
+        #: the owners must be the owner of the data they analyze
+        self.maintenance = Maintenance(join(self.garage, 'UEMP', 'sde@UEMP@itdb104sp.dts.utah.gov.sde'), [
+            join(self.garage, 'UEMP', 'uempadmin@UEMP@uemp.agrc.utah.gov.sde')
+        ], store=join(self.staging_rack, 'maintenance.sqlite'))
 
+    def ship(self):
+        try:
+            self.maintenance.run(self.log)
         except Exception:
             self.send_email('michaelfoulger@utah.gov', 'Error with {}'.format(__file__), format_exc())
             raise
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+LocatorsBenchmark.py
+A script that replays a sample of addresses through a locator for each variant of its template and reports the
+throughput, latency and match rate so the template properties can be tuned with numbers.
+
+The sample is a csv with street and zone columns. The locator is a scratch copy of a locator in the `Dev`
+path_to_locators so the live locator is not changed. `--fake` uses a deterministic geocoder that does not need arcgis.
+
+Usage:
+    python LocatorsBenchmark.py <sample.csv> <locator>                  Replays the sample through <locator>
+    python LocatorsBenchmark.py <sample.csv> <locator> --workers 4      Geocodes 4 addresses at a time
+    python LocatorsBenchmark.py --fake --synthetic 1000                 Replays 1000 made up addresses offline
+    python LocatorsBenchmark.py --fake --variant "MaxCandidates = 5"    Compares the template to one variant
+Arguments:
+    locator         AddressPoints_AddressSystem or Roads_AddressSystem_STREET
+'''
+
+import argparse
+import locatorsupport.templates as template
+from locatorsupport.geocoding import FakeGeocoder
+from locatorsupport.geocoding import compare
+from locatorsupport.geocoding import read_sample
+from locatorsupport.geocoding import synthetic_sample
+
+#: the template of each locator
+STYLES = {'AddressPoints_AddressSystem': template.us_single_house_addresses, 'Roads_AddressSystem_STREET': template.us_dual_range_addresses}
+
+#: the properties that are tuned. The empty variant is the template as it is.
+VARIANTS = [
+    'SearchTimeout = 2',
+    'MaxCandidates = 5',
+    'MaxCandidates = 25',
+    'SpellingSensitivity = 60',
+    'SpellingSensitivity = 100',
+    'NumThreads = 1',
+    'NumThreads = 4',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='replay addresses through a locator for each template variant')
+    parser.add_argument('sample', nargs='?', help='a csv with street and zone columns')
+    parser.add_argument('locator', nargs='?', default='Roads_AddressSystem_STREET', choices=sorted(STYLES))
+    parser.add_argument('--profile', default=template.BASELINE, choices=sorted(template.PROFILES))
+    parser.add_argument('--variant', action='append', help='a .loc property to compare eg: "MaxCandidates = 5". Repeat for more.')
+    parser.add_argument('--workers', type=int, default=1, help='the number of addresses geocoded at a time')
+    parser.add_argument('--limit', type=int, help='the most addresses to read from the sample')
+    parser.add_argument('--fake', action='store_true', help='use the deterministic fake geocoder')
+    parser.add_argument('--latency', type=float, default=0.001, help='the seconds an average fake geocode takes')
+    parser.add_argument('--synthetic', type=int, help='replay this many made up addresses instead of a sample')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        addresses = synthetic_sample(args.synthetic)
+    elif args.sample:
+        addresses = read_sample(args.sample, args.limit)
+    else:
+        parser.error('a sample or --synthetic is required')
+
+    if args.fake:
+        geocoder = FakeGeocoder(args.latency)
+    else:
+        import locatorsupport.secrets as secrets
+        from locatorsupport.geocoding import ArcpyGeocoder
+
+        geocoder = ArcpyGeocoder(secrets.configuration['Dev']['path_to_locators'], args.locator)
+
+    rendered = template.render(STYLES[args.locator], args.profile)
+    variants = [('template', '')] + [(variant, variant) for variant in args.variant or VARIANTS]
+
+    try:
+        reports = compare(geocoder, addresses, rendered, variants, args.workers)
+    finally:
+        geocoder.close()
+
+    print('{:<28} {:>9} {:>10} {:>9} {:>9} {:>9} {:>8} {:>8}'.format('variant', 'addresses', 'per second', 'p50 ms', 'p95 ms', 'p99 ms',
+                                                                     'matched', 'delta'))
+    for report in reports:
+        print('{:<28} {:>9} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>8.1%} {:>+8.1%}'.format(
+            report.variant, report.addresses, report.throughput, report.p50 * 1000, report.p95 * 1000, report.p99 * 1000, report.match_rate,
+            report.match_delta))
+
+
+if __name__ == '__main__':
+    main()
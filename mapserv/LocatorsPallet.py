@@ -9,27 +9,104 @@ Pre-requisites
     - The `secrets.py` file has been populated from the template file
     - The locators in `self.services` have been created
     - The locators are published to arcgis server
+    - For incremental rebuilds, `incremental` is True in the secrets and a `<locator>_Composite` composite locator that
+      searches `<locator>_Delta` before `<locator>` is published as `Geolocators/<locator>_Composite`. The delta is
+      created empty by the first full rebuild and swapped in with it.
 
 Creating the locators
     - Make sure your `Dev` secrets are populated as that configuration will be used
     - In arcgis pro python execute `LocatorsPallet.py`'''
 
-import arcpy
 import locatorsupport.templates as template
 import locatorsupport.secrets as secrets
 import sys
+from datetime import datetime
 from forklift.arcgis import LightSwitch
 from forklift.models import Crate
 from forklift.models import Pallet
 from forklift.seat import format_time
-from glob import iglob
-from os import mkdir
+from locatorsupport.config import patch_loc
+from locatorsupport.config import patch_loc_xml
+from locatorsupport.copier import get_throughput
+from locatorsupport.deploy import discard
+from locatorsupport.deploy import save_manifests
+from locatorsupport.deploy import stage
+from locatorsupport.deploy import swap
+from locatorsupport.geocoding import ServiceGeocoder
+from locatorsupport.geocoding import read_sample
+from locatorsupport.geocoding import synthetic_sample
+from locatorsupport.changes import FULL
+from locatorsupport.changes import ChangeStore
+from locatorsupport.changes import choose_rebuild
+from locatorsupport.changes import get_changes
+from locatorsupport.changes import get_ratio
+from locatorsupport.changes import read_hashes
+from locatorsupport.rebuild import COMPOSITE_SUFFIX
+from locatorsupport.rebuild import DELTA_SUFFIX
+from locatorsupport.rebuild import REBUILDING
+from locatorsupport.rebuild import Definition
+from locatorsupport.rebuild import build_delta
+from locatorsupport.rebuild import create_locator
+from locatorsupport.rebuild import rebuild
+from locatorsupport.rebuild import run_all
+from locatorsupport.warmup import cache_files
+from locatorsupport.warmup import measure
+from os.path import abspath
+from os.path import dirname
 from os.path import join
-from os.path import split
-from shutil import copyfile
 from shutil import rmtree
-from time import clock
-from xml.etree import ElementTree
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from palletsupport.metrics import Metrics  # noqa: E402
+
+ADDRESS_POINT_FIELDS = ''.join([
+    "'Primary Table:Point Address ID' AddressPoints:OBJECTID VISIBLE NONE;'Primary Table:Street ID' <None> VISIBLE NONE;",
+    "'*Primary Table:House Number' AddressPoints:AddNum VISIBLE NONE;'Primary Table:Side' <None> VISIBLE NONE;",
+    "'Primary Table:Full Street Name' <None> VISIBLE NONE;'Primary Table:Prefix Direction' AddressPoints:PrefixDir VISIBLE NONE;",
+    "'Primary Table:Prefix Type' <None> VISIBLE NONE;'*Primary Table:Street Name' AddressPoints:STREETNAME VISIBLE NONE;",
+    "'Primary Table:Suffix Type' AddressPoints:STREETTYPE VISIBLE NONE;'Primary Table:Suffix Direction' AddressPoints:SUFFIXDIR VISIBLE NONE;",
+    "'Primary Table:City or Place' AddressPoints:AddSystem VISIBLE NONE;'Primary Table:County' <None> VISIBLE NONE;",
+    "'Primary Table:State' <None> VISIBLE NONE;'Primary Table:State Abbreviation' <None> VISIBLE NONE;'Primary Table:ZIP Code' <None> VISIBLE NONE;",
+    "'Primary Table:Country Code' <None> VISIBLE NONE;'Primary Table:3-Digit Language Code' <None> VISIBLE NONE;",
+    "'Primary Table:2-Digit Language Code' <None> VISIBLE NONE;'Primary Table:Admin Language Code' <None> VISIBLE NONE;",
+    "'Primary Table:Block ID' <None> VISIBLE NONE;'Primary Table:Street Rank' <None> VISIBLE NONE;'Primary Table:Display X' <None> VISIBLE NONE;",
+    "'Primary Table:Display Y' <None> VISIBLE NONE;'Primary Table:Min X value for extent' <None> VISIBLE NONE;",
+    "'Primary Table:Max X value for extent' <None> VISIBLE NONE;'Primary Table:Min Y value for extent' <None> VISIBLE NONE;",
+    "'Primary Table:Max Y value for extent' <None> VISIBLE NONE;'Primary Table:Additional Field' <None> VISIBLE NONE;",
+    "'*Primary Table:Altname JoinID' AddressPoints:UTAddPtID VISIBLE NONE;'Primary Table:City Altname JoinID' <None> VISIBLE NONE;",
+    "'*Alternate Name Table:JoinID' AtlNamesAddrPnts:UTAddPtID VISIBLE NONE;'Alternate Name Table:Full Street Name' <None> VISIBLE NONE;",
+    "'Alternate Name Table:Prefix Direction' AtlNamesAddrPnts:PrefixDir VISIBLE NONE;'Alternate Name Table:Prefix Type' <None> VISIBLE NONE;",
+    "'Alternate Name Table:Street Name' AtlNamesAddrPnts:STREETNAME VISIBLE NONE;",
+    "'Alternate Name Table:Suffix Type' AtlNamesAddrPnts:STREETTYPE VISIBLE NONE;",
+    "'Alternate Name Table:Suffix Direction' AtlNamesAddrPnts:SUFFIXDIR VISIBLE NONE"
+])
+
+STREET_FIELDS = ''.join([
+    "'Primary Table:Feature ID' GeocodeRoads:OBJECTID VISIBLE NONE;'*Primary Table:From Left' GeocodeRoads:FROMADDR_L VISIBLE NONE;",
+    "'*Primary Table:To Left' GeocodeRoads:TOADDR_L VISIBLE NONE;'*Primary Table:From Right' GeocodeRoads:FROMADDR_R VISIBLE NONE;",
+    "'*Primary Table:To Right' GeocodeRoads:TOADDR_R VISIBLE NONE;'Primary Table:Left Parity' <None> VISIBLE NONE;",
+    "'Primary Table:Right Parity' <None> VISIBLE NONE;'Primary Table:Full Street Name' <None> VISIBLE NONE;",
+    "'Primary Table:Prefix Direction' GeocodeRoads:PREDIR VISIBLE NONE;'Primary Table:Prefix Type' <None> VISIBLE NONE;",
+    "'*Primary Table:Street Name' GeocodeRoads:NAME VISIBLE NONE;'Primary Table:Suffix Type' GeocodeRoads:POSTTYPE VISIBLE NONE;",
+    "'Primary Table:Suffix Direction' GeocodeRoads:POSTDIR VISIBLE NONE;", "'Primary Table:Left City or Place' GeocodeRoads:ADDRSYS_L VISIBLE NONE;",
+    "'Primary Table:Right City or Place' GeocodeRoads:ADDRSYS_R VISIBLE NONE;'Primary Table:Left County' <None> VISIBLE NONE;",
+    "'Primary Table:Right County' <None> VISIBLE NONE;'Primary Table:Left State' <None> VISIBLE NONE;'Primary Table:Right State' <None> VISIBLE NONE;",
+    "'Primary Table:Left State Abbreviation' <None> VISIBLE NONE;'Primary Table:Right State Abbreviation' <None> VISIBLE NONE;",
+    "'Primary Table:Left ZIP Code' <None> VISIBLE NONE;'Primary Table:Right ZIP Code' <None> VISIBLE NONE;'Primary Table:Country Code' <None> VISIBLE NONE;",
+    "'Primary Table:3-Digit Language Code' <None> VISIBLE NONE;'Primary Table:2-Digit Language Code' <None> VISIBLE NONE;",
+    "'Primary Table:Admin Language Code' <None> VISIBLE NONE;'Primary Table:Left Block ID' <None> VISIBLE NONE;",
+    "'Primary Table:Right Block ID' <None> VISIBLE NONE;'Primary Table:Left Street ID' <None> VISIBLE NONE;",
+    "'Primary Table:Right Street ID' <None> VISIBLE NONE;'Primary Table:Street Rank' <None> VISIBLE NONE;",
+    "'Primary Table:Min X value for extent' <None> VISIBLE NONE;'Primary Table:Max X value for extent' <None> VISIBLE NONE;",
+    "'Primary Table:Min Y value for extent' <None> VISIBLE NONE;'Primary Table:Max Y value for extent' <None> VISIBLE NONE;",
+    "'Primary Table:Left Additional Field' <None> VISIBLE NONE;'Primary Table:Right Additional Field' <None> VISIBLE NONE;",
+    "'*Primary Table:Altname JoinID' GeocodeRoads:GLOBALID_SGID VISIBLE NONE;'Primary Table:City Altname JoinID' <None> VISIBLE NONE;",
+    "'*Alternate Name Table:JoinID' AtlNamesRoads:GLOBALID_SGID VISIBLE NONE;'Alternate Name Table:Full Street Name' <None> VISIBLE NONE;",
+    "'Alternate Name Table:Prefix Direction' AtlNamesRoads:PREDIR VISIBLE NONE;'Alternate Name Table:Prefix Type' <None> VISIBLE NONE;",
+    "'Alternate Name Table:Street Name' AtlNamesRoads:NAME VISIBLE NONE;'Alternate Name Table:Suffix Type' AtlNamesRoads:POSTTYPE VISIBLE NONE;",
+    "'Alternate Name Table:Suffix Direction' AtlNamesRoads:POSTDIR VISIBLE NONE"
+])
 
 
 class LocatorsPallet(Pallet):
@@ -39,6 +116,18 @@ class LocatorsPallet(Pallet):
 
         self.destination_coordinate_system = 26912
 
+        #: a locator whose reference data changed by less than this fraction of its rows is updated with a delta locator
+        self.change_ratio = 0.05
+
+        #: the day of the week that the delta locators are folded into a full rebuild
+        self.compaction_day = 'Sunday'
+
+        #: the templates.PROFILES entry that sizes the threads, memory and caches of the locators
+        self.profile = template.BASELINE
+
+        #: the number of addresses geocoded through each restarted service when warm up is on and there is no sample
+        self.warm_up_count = 50
+
     def build(self, config='Production'):
         #: not to be confused with arcgis_services
         #: this pallet handles the stopping and starting outside of the forklift routine
@@ -47,8 +136,20 @@ class LocatorsPallet(Pallet):
             'Roads_AddressSystem_STREET': ('Geolocators/Roads_AddressSystem_STREET', 'GeocodeServer')
         }
 
+        #: the composite of each locator's delta and full locator that is published when incremental rebuilds are on
+        self.composite_services = {locator: (service + COMPOSITE_SUFFIX, server_type) for locator, (service, server_type) in self.services.items()}
+
         self.secrets = secrets.configuration[config]
         self.configuration = config
+        self.incremental = self.secrets.get('incremental', False)
+        self.profile = self.secrets.get('profile') or self.profile
+        self.geocode_machine = self.secrets.get('geocode_machine')
+
+        if self.profile != template.BASELINE and not self.geocode_machine:
+            raise ValueError('the {} profile is sized for the GeocodeServer machines. Add their geocode_machine to the secrets.'.format(
+                self.profile))
+        self.warm_up = self.secrets.get('warm_up', False)
+        self.change_store = join(self.staging_rack, 'locators.sqlite')
         self.output_location = self.secrets['path_to_locators'].replace('\\', '/')
 
         self.locators = join(self.staging_rack, 'locators.gdb')
@@ -58,6 +159,15 @@ class LocatorsPallet(Pallet):
         self.add_crate('AddressPoints', {'source_workspace': self.sgid, 'destination_workspace': self.locators})
         self.add_crates(['AtlNamesAddrPnts', 'AtlNamesRoads', 'GeocodeRoads'], {'source_workspace': self.road_grinder, 'destination_workspace': self.locators})
 
+        self.definitions = {
+            'AddressPoints_AddressSystem': Definition('US Address - Single House', 'AddressPoints', 'AtlNamesAddrPnts', 'UTAddPtID',
+                                                      ADDRESS_POINT_FIELDS, template.us_single_house_addresses),
+            'Roads_AddressSystem_STREET': Definition('US Address - Dual Ranges', 'GeocodeRoads', 'AtlNamesRoads', 'GLOBALID_SGID', STREET_FIELDS,
+                                                     template.us_dual_range_addresses)
+        }
+
+        self.metrics = Metrics('LocatorsPallet', join(self.staging_rack, 'metrics'))
+
     def process(self):
         centerline_locators = ['Roads_AddressSystem_STREET']
         address_point_locators = ['AddressPoints_AddressSystem']
@@ -83,167 +193,260 @@ class LocatorsPallet(Pallet):
             extraSwitch = LightSwitch()
             extraSwitch.set_credentials(username=self.secrets['username'], password=self.secrets['password'], host=self.secrets['host'])
 
+        path_to_locators = self.secrets['path_to_locators']
+        jobs = {}
+        deployments = {}
+        snapshots = {}
+        rebuilt = {}
+        failures = []
+
         for locator in dirty_locators:
-            #: copy current locator
-            rebuild_path = join(self.secrets['path_to_locators'], 'rebuilding')
+            kind, reason = FULL, 'incremental rebuilds are off'
+
+            if self.incremental:
+                with self.metrics.step('find changes {}'.format(locator)):
+                    kind, reason, changes, snapshots[locator] = self.plan_rebuild(locator)
 
-            self.copy_locator_to(self.secrets['path_to_locators'], locator, rebuild_path)
-            locator_path = join(rebuild_path, locator)
+            self.log.info('%s rebuild of %s because %s', kind, locator, reason)
 
-            #: rebuild locator
-            self.rebuild_locator(locator_path)
+            #: a delta only changes the composite locator. a full rebuild changes both and empties the delta in the same swap
+            #: so the rows of the last delta don't override the fresher full locator.
+            if kind == FULL:
+                jobs[locator] = (rebuild, (path_to_locators, locator))
+                names = [locator]
+                services = [self.services[locator]]
 
-            self.log.debug('stopping %s', locator)
-            switch.ensure('off', [self.services[locator]])
-            if extraSwitch:
-                extraSwitch.ensure('off', [self.services[locator]])
+                if self.incremental:
+                    jobs[locator + DELTA_SUFFIX] = (build_delta, (path_to_locators, locator, self.definitions[locator], self.locators, None))
+                    names.append(locator + DELTA_SUFFIX)
+                    services.append(self.composite_services[locator])
 
-            self.copy_locator_to(rebuild_path, locator, self.secrets['path_to_locators'])
+                deployments[locator] = (kind, names, services)
+            else:
+                jobs[locator + DELTA_SUFFIX] = (build_delta, (path_to_locators, locator, self.definitions[locator], self.locators, changes))
+                deployments[locator] = (kind, [locator + DELTA_SUFFIX], [self.composite_services[locator]])
 
-            for location in self.secrets['copy_destinations']:
-                self.copy_locator_to(rebuild_path, locator, location)
+        #: the locator each job belongs to
+        owners = {name: locator for locator, (kind, names, services) in deployments.items() for name in names}
 
-            self.log.debug('starting %s', locator)
-            switch.ensure('on', [self.services[locator]])
-            if extraSwitch:
-                extraSwitch.ensure('on', [self.services[locator]])
+        try:
+            #: the rebuilds don't touch the services so they all run at the same time
+            self.log.info('rebuilding %s', ','.join(jobs))
+            with self.metrics.step('rebuild locators'):
+                for name, future in run_all(jobs):
+                    try:
+                        rebuild_path, seconds, detail = future.result()
+                    except Exception as e:
+                        self.log.error('error rebuilding %s: %s', name, e)
+                        failures.append('{}: {}'.format(name, e))
+
+                        continue
+
+                    locator = owners[name]
+                    if name.endswith(DELTA_SUFFIX):
+                        self.update_locator_properties(join(rebuild_path, name), self.definitions[locator].options)
+                        self.log.info('built %s from %i rows in %s', name, detail, format_time(seconds))
+                    else:
+                        self.log.info('rebuilt %s in %s', name, format_time(seconds))
+                        self.log.debug('%s was copied to %s with a %s', name, rebuild_path, detail)
+
+                    self.metrics.record('rebuild {}'.format(name), seconds)
+                    rebuilt[name] = rebuild_path
+
+            #: one locator's services are stopped at a time and only for as long as it takes to rename the staged files
+            for locator, (kind, names, services) in deployments.items():
+                missing = [name for name in names if name not in rebuilt]
+                if missing:
+                    if len(missing) < len(names):
+                        self.log.error('%s was not swapped in because %s failed', locator, ','.join(missing))
+
+                    continue
+
+                self.deploy([(name, rebuilt[name]) for name in names], services, [switch] + ([extraSwitch] if extraSwitch else []))
+
+                if self.incremental and kind == FULL:
+                    with ChangeStore(self.change_store) as store:
+                        for table, hashes in snapshots[locator].items():
+                            store.save_hashes(locator, table, hashes)
+
+                        store.save_full(locator, datetime.now())
+        finally:
+            self.metrics.write()
 
             #: delete rebuilding
             try:
-                rmtree(rebuild_path)
+                rmtree(join(path_to_locators, REBUILDING))
+            except FileNotFoundError:
+                pass
             except OSError as e:
                 self.log.error('error removing temp locator folder: %s', e, exc_info=True)
 
-    def rebuild_locator(self, locator):
-        self.log.debug('rebuilding %s', locator)
+        if failures:
+            raise Exception('Rebuild failed for {}'.format('; '.join(failures)))
 
-        #: rebuild in temp location
-        arcpy.geocoding.RebuildAddressLocator(locator)
+    def plan_rebuild(self, locator):
+        '''compares the hashes of the reference data rows with the last full rebuild of the locator
 
-    def copy_locator_to(self, file_path, locator, to_folder):
-        location = join(file_path, locator)
-        self.log.debug('copying %s to %s', location, to_folder)
-        #: iterator glob for .lox .loc .loc.xml
-        for filename in iglob(location + '.lo*'):
-            base_folder, locator_with_extension = split(filename)
+        returns a tuple of changes.FULL or changes.DELTA, the reason, a dictionary of table name to Changes and a dictionary of
+        table name to the current hashes
+        '''
+        definition = self.definitions[locator]
+        current = {}
+        changes = {}
 
-            try:
-                mkdir(to_folder)
-            except FileExistsError:
-                pass
+        with ChangeStore(self.change_store) as store:
+            for table in [definition.primary, definition.alternate]:
+                current[table] = read_hashes(join(self.locators, table), definition.join_field)
+                changes[table] = get_changes(store.get_hashes(locator, table), current[table])
 
-            output = join(to_folder, locator_with_extension)
+            last_full = store.get_last_full(locator)
 
-            copyfile(filename, output)
+        ratio = get_ratio(list(changes.values()))
+        kind, reason = choose_rebuild(ratio, self.change_ratio, last_full, self.compaction_day)
+
+        return kind, reason, changes, current
+
+    def deploy(self, parts, services, switches):
+        '''stages the rebuilt locators next to each destination and swaps them all in with the services stopped
+
+        parts: a list of (locator name, rebuild folder) eg: a full rebuild and its empty delta
+        '''
+        path_to_locators = self.secrets['path_to_locators']
+        destinations = [path_to_locators] + self.secrets['copy_destinations']
+        label = ','.join(name for name, rebuild_path in parts)
+        stagings = []
 
-    def create_locators(self):
-        #: address points
-        fields = [
-            "'Primary Table:Point Address ID' AddressPoints:OBJECTID VISIBLE NONE;'Primary Table:Street ID' <None> VISIBLE NONE;",
-            "'*Primary Table:House Number' AddressPoints:AddNum VISIBLE NONE;'Primary Table:Side' <None> VISIBLE NONE;",
-            "'Primary Table:Full Street Name' <None> VISIBLE NONE;'Primary Table:Prefix Direction' AddressPoints:PrefixDir VISIBLE NONE;",
-            "'Primary Table:Prefix Type' <None> VISIBLE NONE;'*Primary Table:Street Name' AddressPoints:STREETNAME VISIBLE NONE;",
-            "'Primary Table:Suffix Type' AddressPoints:STREETTYPE VISIBLE NONE;'Primary Table:Suffix Direction' AddressPoints:SUFFIXDIR VISIBLE NONE;",
-            "'Primary Table:City or Place' AddressPoints:AddSystem VISIBLE NONE;'Primary Table:County' <None> VISIBLE NONE;",
-            "'Primary Table:State' <None> VISIBLE NONE;'Primary Table:State Abbreviation' <None> VISIBLE NONE;'Primary Table:ZIP Code' <None> VISIBLE NONE;",
-            "'Primary Table:Country Code' <None> VISIBLE NONE;'Primary Table:3-Digit Language Code' <None> VISIBLE NONE;",
-            "'Primary Table:2-Digit Language Code' <None> VISIBLE NONE;'Primary Table:Admin Language Code' <None> VISIBLE NONE;",
-            "'Primary Table:Block ID' <None> VISIBLE NONE;'Primary Table:Street Rank' <None> VISIBLE NONE;'Primary Table:Display X' <None> VISIBLE NONE;",
-            "'Primary Table:Display Y' <None> VISIBLE NONE;'Primary Table:Min X value for extent' <None> VISIBLE NONE;",
-            "'Primary Table:Max X value for extent' <None> VISIBLE NONE;'Primary Table:Min Y value for extent' <None> VISIBLE NONE;",
-            "'Primary Table:Max Y value for extent' <None> VISIBLE NONE;'Primary Table:Additional Field' <None> VISIBLE NONE;",
-            "'*Primary Table:Altname JoinID' AddressPoints:UTAddPtID VISIBLE NONE;'Primary Table:City Altname JoinID' <None> VISIBLE NONE;",
-            "'*Alternate Name Table:JoinID' AtlNamesAddrPnts:UTAddPtID VISIBLE NONE;'Alternate Name Table:Full Street Name' <None> VISIBLE NONE;",
-            "'Alternate Name Table:Prefix Direction' AtlNamesAddrPnts:PrefixDir VISIBLE NONE;'Alternate Name Table:Prefix Type' <None> VISIBLE NONE;",
-            "'Alternate Name Table:Street Name' AtlNamesAddrPnts:STREETNAME VISIBLE NONE;",
-            "'Alternate Name Table:Suffix Type' AtlNamesAddrPnts:STREETTYPE VISIBLE NONE;",
-            "'Alternate Name Table:Suffix Direction' AtlNamesAddrPnts:SUFFIXDIR VISIBLE NONE"
-        ]
-
-        start_seconds = clock()
-        process_seconds = clock()
-        self.log.info('creating the %s locator', 'address point')
-        try:
-            output_location = join(self.output_location, 'AddressPoints_AddressSystem')
-            arcpy.geocoding.CreateAddressLocator(
-                in_address_locator_style='US Address - Single House',
-                in_reference_data='{0}/{1};{0}/{2}'.format(self.locators, "AtlNamesAddrPnts 'Alternate Name Table'", "AddressPoints 'Primary Table'"),
-                in_field_map=''.join(fields),
-                out_address_locator=output_location,
-                config_keyword='',
-                enable_suggestions='DISABLED')
-
-            self.update_locator_properties(output_location, template.us_single_house_addresses)
-        except Exception as e:
-            self.log.error(e)
-
-        self.log.info('finished %s', format_time(clock() - process_seconds))
-        process_seconds = clock()
-
-        #: streets
-        fields = [
-            "'Primary Table:Feature ID' GeocodeRoads:OBJECTID VISIBLE NONE;'*Primary Table:From Left' GeocodeRoads:FROMADDR_L VISIBLE NONE;",
-            "'*Primary Table:To Left' GeocodeRoads:TOADDR_L VISIBLE NONE;'*Primary Table:From Right' GeocodeRoads:FROMADDR_R VISIBLE NONE;",
-            "'*Primary Table:To Right' GeocodeRoads:TOADDR_R VISIBLE NONE;'Primary Table:Left Parity' <None> VISIBLE NONE;",
-            "'Primary Table:Right Parity' <None> VISIBLE NONE;'Primary Table:Full Street Name' <None> VISIBLE NONE;",
-            "'Primary Table:Prefix Direction' GeocodeRoads:PREDIR VISIBLE NONE;'Primary Table:Prefix Type' <None> VISIBLE NONE;",
-            "'*Primary Table:Street Name' GeocodeRoads:NAME VISIBLE NONE;'Primary Table:Suffix Type' GeocodeRoads:POSTTYPE VISIBLE NONE;",
-            "'Primary Table:Suffix Direction' GeocodeRoads:POSTDIR VISIBLE NONE;", "'Primary Table:Left City or Place' GeocodeRoads:ADDRSYS_L VISIBLE NONE;",
-            "'Primary Table:Right City or Place' GeocodeRoads:ADDRSYS_R VISIBLE NONE;'Primary Table:Left County' <None> VISIBLE NONE;",
-            "'Primary Table:Right County' <None> VISIBLE NONE;'Primary Table:Left State' <None> VISIBLE NONE;'Primary Table:Right State' <None> VISIBLE NONE;",
-            "'Primary Table:Left State Abbreviation' <None> VISIBLE NONE;'Primary Table:Right State Abbreviation' <None> VISIBLE NONE;",
-            "'Primary Table:Left ZIP Code' <None> VISIBLE NONE;'Primary Table:Right ZIP Code' <None> VISIBLE NONE;'Primary Table:Country Code' <None> VISIBLE NONE;",
-            "'Primary Table:3-Digit Language Code' <None> VISIBLE NONE;'Primary Table:2-Digit Language Code' <None> VISIBLE NONE;",
-            "'Primary Table:Admin Language Code' <None> VISIBLE NONE;'Primary Table:Left Block ID' <None> VISIBLE NONE;",
-            "'Primary Table:Right Block ID' <None> VISIBLE NONE;'Primary Table:Left Street ID' <None> VISIBLE NONE;",
-            "'Primary Table:Right Street ID' <None> VISIBLE NONE;'Primary Table:Street Rank' <None> VISIBLE NONE;",
-            "'Primary Table:Min X value for extent' <None> VISIBLE NONE;'Primary Table:Max X value for extent' <None> VISIBLE NONE;",
-            "'Primary Table:Min Y value for extent' <None> VISIBLE NONE;'Primary Table:Max Y value for extent' <None> VISIBLE NONE;",
-            "'Primary Table:Left Additional Field' <None> VISIBLE NONE;'Primary Table:Right Additional Field' <None> VISIBLE NONE;",
-            "'*Primary Table:Altname JoinID' GeocodeRoads:GLOBALID_SGID VISIBLE NONE;'Primary Table:City Altname JoinID' <None> VISIBLE NONE;",
-            "'*Alternate Name Table:JoinID' AtlNamesRoads:GLOBALID_SGID VISIBLE NONE;'Alternate Name Table:Full Street Name' <None> VISIBLE NONE;",
-            "'Alternate Name Table:Prefix Direction' AtlNamesRoads:PREDIR VISIBLE NONE;'Alternate Name Table:Prefix Type' <None> VISIBLE NONE;",
-            "'Alternate Name Table:Street Name' AtlNamesRoads:NAME VISIBLE NONE;'Alternate Name Table:Suffix Type' AtlNamesRoads:POSTTYPE VISIBLE NONE;",
-            "'Alternate Name Table:Suffix Direction' AtlNamesRoads:POSTDIR VISIBLE NONE"
-        ]
-
-        self.log.info('creating the %s locator', 'streets')
         try:
-            output_location = join(self.output_location, 'Roads_AddressSystem_STREET')
-            arcpy.geocoding.CreateAddressLocator(
-                in_address_locator_style='US Address - Dual Ranges',
-                in_reference_data='{0}/{1};{0}/{2}'.format(self.locators, "GeocodeRoads 'Primary Table'", "AtlNamesRoads 'Alternate Name Table'"),
-                in_field_map=''.join(fields),
-                out_address_locator=output_location,
-                config_keyword='',
-                enable_suggestions='DISABLED')
+            for name, rebuild_path in parts:
+                self.log.debug('staging %s in %s', name, ','.join(destinations))
+                with self.metrics.step('stage {}'.format(name)):
+                    staging = stage(rebuild_path, name, destinations)
+
+                stagings.append((name, staging))
+
+                for transfer in staging.transfers:
+                    self.log.debug('staged %s in %.1f seconds at %.1f MB/s after %i attempts', transfer.destination, transfer.seconds,
+                                   get_throughput(transfer), transfer.attempts)
+
+                for folder, strategy in staging.strategies.items():
+                    self.log.info('%s was staged in %s with a %s', name, folder, strategy)
+
+                self.log.info('%s: %i files staged, %i unchanged files skipped', name, len(staging.staged), len(staging.skipped))
+
+            staged = [files for name, staging in stagings for files in staging.staged]
+            if not staged:
+                return
 
-            self.update_locator_properties(output_location, template.us_dual_range_addresses)
-        except Exception as e:
-            self.log.error(e)
+            with self.metrics.step('outage {}'.format(label)):
+                self.log.debug('stopping %s', label)
+                for switch in switches:
+                    switch.ensure('off', services)
 
-        self.log.info('finished %s', format_time(clock() - process_seconds))
-        process_seconds = clock()
+                try:
+                    swap(staged)
+                finally:
+                    self.log.debug('starting %s', label)
+                    for switch in switches:
+                        switch.ensure('on', services)
+        finally:
+            for name, staging in stagings:
+                discard(staging.staged)
 
-        self.log.info('finished %s', format_time(clock() - process_seconds))
-        self.log.info('done %s', format_time(clock() - start_seconds))
+        for name, staging in stagings:
+            save_manifests(staging, name, destinations)
 
-    def update_locator_properties(self, locator_path, options_to_append):
-        with open(locator_path + '.loc', 'a') as f:
-            f.write(options_to_append)
+        self.log.info('%s was offline for %.3f seconds', label, self.metrics.get_seconds('outage {}'.format(label)))
 
-        self.update_locator_xml(locator_path)
+        if self.warm_up:
+            try:
+                self.warm([name for name, staging in stagings if staging.staged], services, destinations)
+            except Exception as e:
+                self.log.warning('error warming up %s: %s', label, e, exc_info=True)
+
+    def warm(self, names, services, destinations):
+        '''geocodes a batch of addresses through each restarted service to measure the cold latency, reads the new locator
+        files into the page cache of each destination and geocodes the batch again to measure the warm latency
+        '''
+        sample = self.secrets.get('warm_up_sample')
+        addresses = None
+        geocoders = []
+
+        for service, server_type in services:
+            geocoder = self.get_warm_up_geocoder(service)
+            if geocoder is not None:
+                geocoders.append((service, geocoder))
+
+        if geocoders:
+            addresses = read_sample(sample, self.warm_up_count) if sample else synthetic_sample(self.warm_up_count)
+
+        try:
+            #: the cold pass goes first so the .lox isn't already in the page cache
+            colds = {service: measure(geocoder, addresses, 'cold') for service, geocoder in geocoders}
+
+            for name in names:
+                with self.metrics.step('page cache {}'.format(name)) as step:
+                    reads = cache_files(destinations, name)
+                    step.rows = sum(read.bytes for read in reads)
 
-    def update_locator_xml(self, locator_path):
-        locator_path += '.loc.xml'
+                for read in reads:
+                    if read.error is not None:
+                        self.log.warning('could not read %s into the page cache: %s', read.path, read.error)
 
-        tree = ElementTree.parse(locator_path)
-        root = tree.getroot()
+                self.log.info('read %.1f MB of %s into the page cache in %s', step.rows / 1024 / 1024, name, format_time(step.wall_seconds))
 
-        for data_path in root.findall('./locator/ref_data/data_source/workspace_properties/path'):
-            data_path.text = self.locators
+            for service, geocoder in geocoders:
+                warm = measure(geocoder, addresses, 'warm', baseline=colds[service])
 
-        tree.write(locator_path)
+                for report in [colds[service], warm]:
+                    self.metrics.record('geocode {} {}'.format(report.variant, service), report.seconds, report.addresses)
+                    self.log.info('%s %s latency p50 %.0f ms, p95 %.0f ms, p99 %.0f ms, %.1f%% matched', service, report.variant,
+                                  report.p50 * 1000, report.p95 * 1000, report.p99 * 1000, report.match_rate * 100)
+        finally:
+            for service, geocoder in geocoders:
+                geocoder.close()
+
+    def get_warm_up_geocoder(self, service):
+        '''returns the geocoding.Geocoder that warms up `service` or None to only warm the page cache
+        '''
+        if not self.secrets.get('geocode_url'):
+            return None
+
+        return ServiceGeocoder(self.secrets['geocode_url'], service)
+
+    def create_locators(self):
+        for locator, definition in self.definitions.items():
+            self.log.info('creating the %s locator', locator)
+            with self.metrics.step('create {}'.format(locator)) as step:
+                try:
+                    output_location = join(self.output_location, locator)
+                    create_locator(definition, self.locators, output_location)
+
+                    self.update_locator_properties(output_location, definition.options)
+                except Exception as e:
+                    self.log.error(e)
+
+            self.log.info('finished %s', format_time(step.wall_seconds))
+
+        self.log.info('done %s', format_time(sum(step.wall_seconds for step in self.metrics.steps)))
+
+        self.metrics.write()
+
+    def update_locator_properties(self, locator_path, style):
+        '''patches the style template and the performance profile into the .loc and points the .loc.xml at the reference data.
+        Only the properties that are different are changed and the files are only written when something changed.
+        '''
+        machine = None
+        if self.profile != template.BASELINE:
+            machine = template.get_machine(self.geocode_machine, self.locators)
+            self.log.debug('rendering the %s profile for %i cores, %s bytes of memory and %i bytes of reference data', self.profile,
+                           machine.cores, machine.memory, machine.reference_bytes)
+
+        changes = patch_loc(locator_path, template.render(style, self.profile, machine))
+        if changes:
+            self.log.debug('updated %s in %s.loc', ', '.join(changes), locator_path)
+
+        if patch_loc_xml(locator_path, self.locators):
+            self.log.debug('pointed %s.loc.xml at %s', locator_path, self.locators)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+changes.py
+
+A module that works out which reference data rows changed since a locator was last fully rebuilt.
+
+Forklift stores a hash of every row in the hash field of the crate destinations. The hashes of the rows that
+went into the last full rebuild are kept in a sqlite store so the rows that were added, changed or removed
+since then can be found without comparing the data itself. A changed row shows up as its new hash being added
+and its old hash being removed.
+'''
+
+import arcpy
+import sqlite3
+from collections import namedtuple
+from datetime import datetime
+from datetime import timedelta
+from forklift.core import hash_field
+
+FULL = 'full'
+DELTA = 'delta'
+
+#: added: a set of the hashes that are new since the full rebuild
+#: removed: a set of the hashes that are gone since the full rebuild
+#: join_ids: a set of the join field values of the added and removed rows
+#: base: the number of rows in the full rebuild
+Changes = namedtuple('Changes', ['added', 'removed', 'join_ids', 'base'])
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS hashes (
+        locator TEXT NOT NULL,
+        source TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        join_id TEXT,
+        PRIMARY KEY (locator, source, hash)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS builds (
+        locator TEXT PRIMARY KEY,
+        built TEXT NOT NULL
+    )''',
+]
+
+
+class ChangeStore(object):
+    '''the hashes of the rows in each locator's last full rebuild
+
+    path: the sqlite file
+    '''
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, timeout=60)
+
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get_hashes(self, locator, source):
+        '''returns a dictionary of hash to join id for the rows of `source` in the last full rebuild of `locator`
+        '''
+        rows = self.connection.execute('SELECT hash, join_id FROM hashes WHERE locator = ? AND source = ?', (locator, source))
+
+        return dict(rows)
+
+    def save_hashes(self, locator, source, hashes):
+        with self.connection:
+            self.connection.execute('DELETE FROM hashes WHERE locator = ? AND source = ?', (locator, source))
+            self.connection.executemany('INSERT INTO hashes (locator, source, hash, join_id) VALUES (?, ?, ?, ?)',
+                                        ((locator, source, row_hash, join_id) for row_hash, join_id in hashes.items()))
+
+    def get_last_full(self, locator):
+        '''returns the datetime of the last full rebuild of `locator` or None
+        '''
+        row = self.connection.execute('SELECT built FROM builds WHERE locator = ?', (locator, )).fetchone()
+
+        if row is None:
+            return None
+
+        return datetime.strptime(row[0], '%Y-%m-%dT%H:%M:%S')
+
+    def save_full(self, locator, built):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO builds (locator, built) VALUES (?, ?)', (locator, built.strftime('%Y-%m-%dT%H:%M:%S')))
+
+
+def read_hashes(table, join_field):
+    '''returns a dictionary of hash to join id for every row in the table
+    '''
+    with arcpy.da.SearchCursor(table, [hash_field, join_field]) as cursor:
+        return {row_hash: None if join_id is None else str(join_id) for row_hash, join_id in cursor}
+
+
+def get_changes(base, current):
+    '''returns the Changes between two dictionaries of hash to join id
+    '''
+    added = set(current) - set(base)
+    removed = set(base) - set(current)
+    join_ids = set(current[row_hash] for row_hash in added) | set(base[row_hash] for row_hash in removed)
+    join_ids.discard(None)
+
+    return Changes(added, removed, join_ids, len(base))
+
+
+def get_ratio(changes):
+    '''returns the fraction of the rows in the full rebuild that have changed across a list of Changes
+    '''
+    base = sum(change.base for change in changes)
+    changed = sum(len(change.added) + len(change.removed) for change in changes)
+
+    if base == 0:
+        return float('inf') if changed else 0
+
+    return changed / base
+
+
+def choose_rebuild(ratio, threshold, last_full, compaction_day, now=None):
+    '''returns a tuple of FULL or DELTA and the reason
+
+    ratio: the fraction of rows that have changed since the last full rebuild
+    threshold: the largest ratio that is still rebuilt as a delta
+    last_full: the datetime of the last full rebuild or None
+    compaction_day: the name of the day of the week the deltas are folded into a full rebuild eg: Sunday
+    '''
+    if now is None:
+        now = datetime.now()
+
+    if last_full is None:
+        return FULL, 'there is no full rebuild to build a delta from'
+
+    if ratio > threshold:
+        return FULL, '{:.2%} of the rows changed which is more than {:.2%}'.format(ratio, threshold)
+
+    if now.strftime('%A') == compaction_day and now - last_full > timedelta(days=1):
+        return FULL, 'it is the {} compaction'.format(compaction_day)
+
+    if now - last_full > timedelta(days=7):
+        return FULL, 'the last full rebuild was more than a week ago'
+
+    return DELTA, '{:.2%} of the rows changed'.format(ratio)
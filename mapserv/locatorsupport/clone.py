@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+clone.py
+
+A module that copies locator files within a volume without copying their data when the filesystem allows it.
+
+A reflink is a copy on write clone (btrfs, xfs and other linux filesystems) so it is always safe. A hard link
+shares the file with the source so it is only used when the caller replaces the destination instead of
+writing to it. Everything else falls back to a streamed copy.
+'''
+
+import errno
+from locatorsupport.copier import copy
+from os import link
+from os import remove
+from os import stat
+from os.path import dirname
+from os.path import join
+
+try:
+    import fcntl
+except ImportError:
+    #: windows
+    fcntl = None
+
+REFLINK = 'reflink'
+HARDLINK = 'hardlink'
+COPY = 'copy'
+
+#: the strategies from the fastest to the slowest
+STRATEGIES = [REFLINK, HARDLINK, COPY]
+
+#: the linux FICLONE ioctl
+FICLONE = 0x40049409
+
+#: the errors that mean the filesystem can't do it rather than that something went wrong
+UNSUPPORTED = set([errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM, errno.ENOSYS])
+
+PROBE = '.clone-probe'
+
+
+def same_volume(source, folder):
+    '''returns True if the file and the folder are on the same volume
+    '''
+    try:
+        return stat(source).st_dev == stat(folder).st_dev
+    except OSError:
+        return False
+
+
+def reflink(source, destination):
+    '''clones the source to the destination. Raises OSError when the filesystem does not support it.
+    '''
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'reflinks are not supported on this platform')
+
+    with open(source, 'rb') as reader, open(destination, 'wb') as writer:
+        try:
+            fcntl.ioctl(writer.fileno(), FICLONE, reader.fileno())
+        except OSError:
+            writer.close()
+            remove(destination)
+
+            raise
+
+
+def detect(source, folder, allow_hardlink=False):
+    '''returns the fastest strategy that works for copying `source` into `folder`. It tries each one on a scratch file.
+    '''
+    if not same_volume(source, folder):
+        return COPY
+
+    probe = join(folder, PROBE)
+    strategies = [(REFLINK, reflink)]
+    if allow_hardlink:
+        strategies.append((HARDLINK, link))
+
+    for strategy, function in strategies:
+        try:
+            function(source, probe)
+        except OSError as error:
+            if error.errno not in UNSUPPORTED:
+                raise
+
+            continue
+        finally:
+            try:
+                remove(probe)
+            except OSError:
+                pass
+
+        return strategy
+
+    return COPY
+
+
+def get_weakest(strategies):
+    '''returns the slowest of the strategies or COPY when there are none
+    '''
+    return max(strategies, key=STRATEGIES.index, default=COPY)
+
+
+def clone(source, destination, strategy):
+    '''copies the source to the destination with the strategy from `detect`
+
+    returns the number of bytes that were copied. A reflink or hard link copies none.
+    '''
+    if strategy == REFLINK:
+        reflink(source, destination)
+
+        return 0
+
+    if strategy == HARDLINK:
+        try:
+            remove(destination)
+        except FileNotFoundError:
+            pass
+
+        link(source, destination)
+
+        return 0
+
+    written, seconds, error = copy(source, destination)
+    if error is not None:
+        raise error
+
+    return written
+
+
+class Cloner(object):
+    '''remembers the strategy for each destination folder so it is only detected once
+
+    allow_hardlink: the destinations are replaced rather than written to so they can share the source's data
+    '''
+
+    def __init__(self, allow_hardlink=False):
+        self.allow_hardlink = allow_hardlink
+        self.strategies = {}
+
+    def get_strategy(self, source, destination):
+        folder = dirname(destination)
+
+        if folder not in self.strategies:
+            self.strategies[folder] = detect(source, folder, self.allow_hardlink)
+
+        return self.strategies[folder]
+
+    def clone(self, source, destination):
+        '''returns a tuple of the strategy that was used and the number of bytes that were copied
+        '''
+        strategy = self.get_strategy(source, destination)
+
+        return strategy, clone(source, destination, strategy)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+config.py
+
+A module that patches the .loc properties and .loc.xml workspace paths of a locator in place.
+
+The .loc is read into an ordered map of key to values and only the keys whose values differ from the template
+are rewritten. Every other line is kept as it was. The tags of the .loc.xml are scanned to find the text of the
+workspace path elements and only that text is swapped so the comments, quoting and whitespace of the rest of the
+file are kept. Neither file is written unless its content changes so running it again is a no-op and the modified
+times that the manifests rely on stay put.
+'''
+
+import re
+from collections import OrderedDict
+from collections import namedtuple
+from os import replace
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import unescape
+
+#: the elements of the .loc.xml that hold the reference data workspace
+WORKSPACE_PATH = ('locator', 'ref_data', 'data_source', 'workspace_properties', 'path')
+
+#: the markup of an xml document. Comments, cdata, processing instructions and declarations are matched before tags
+#: so a > inside of them or inside of a quoted attribute doesn't end a tag.
+MARKUP = re.compile(r'''<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<![^>]*>|<(/?)([^\s/>]+)(?:[^>"']|"[^"]*"|'[^']*')*?(/?)>''', re.DOTALL)
+
+#: key: the property name or None when the line isn't a property
+#: value: the property value or None when the line isn't a property
+#: text: the line as it is in the file with its line ending
+Line = namedtuple('Line', ['key', 'value', 'text'])
+
+
+def parse(text):
+    '''returns a list of Line for the .loc text. A key can repeat eg: BatchPresortInputs.
+    '''
+    lines = []
+
+    for text_line in text.splitlines(True):
+        key, separator, value = text_line.partition('=')
+
+        if separator and key.strip() and not key.lstrip().startswith(('[', '#', ';')):
+            lines.append(Line(key.strip(), value.strip(), text_line))
+        else:
+            lines.append(Line(None, None, text_line))
+
+    return lines
+
+
+def get_properties(text):
+    '''returns an ordered dictionary of .loc key to the list of its values
+    '''
+    properties = OrderedDict()
+
+    for line in parse(text):
+        if line.key is not None:
+            properties.setdefault(line.key, []).append(line.value)
+
+    return properties
+
+
+def diff(current, template):
+    '''returns an ordered dictionary of the keys in the `template` properties whose values are not the same in `current`
+    '''
+    return OrderedDict((key, values) for key, values in template.items() if current.get(key) != values)
+
+
+def get_newline(text):
+    if '\r\n' in text:
+        return '\r\n'
+
+    return '\n'
+
+
+def patch(text, template):
+    '''applies the `template` .loc text to the .loc `text`. All of the values of a changed key are replaced where the key
+    first appears. New keys are added at the end.
+
+    returns a tuple of the patched text and the ordered dictionary of changed keys to their new values
+    '''
+    lines = parse(text)
+    changes = diff(get_properties(text), get_properties(template))
+
+    if not changes:
+        return text, changes
+
+    newline = get_newline(text)
+    pending = OrderedDict(changes)
+    patched = []
+
+    for line in lines:
+        if line.key not in changes:
+            patched.append(line.text)
+        elif line.key in pending:
+            patched.extend('{} = {}{}'.format(line.key, value, newline) for value in pending.pop(line.key))
+
+    if patched and not patched[-1].endswith(('\n', '\r')):
+        patched.append(newline)
+
+    for key, values in pending.items():
+        patched.extend('{} = {}{}'.format(key, value, newline) for value in values)
+
+    return ''.join(patched), changes
+
+
+def write_if_changed(path, content, original):
+    '''writes the content to the path through a temporary file when it is not the same as the original
+
+    returns True if the file was written
+    '''
+    if content == original:
+        return False
+
+    with open(path + '.tmp', 'w', newline='') as temp:
+        temp.write(content)
+
+    replace(path + '.tmp', path)
+
+    return True
+
+
+def patch_loc(locator_path, template):
+    '''applies the `template` .loc text to the `locator_path` .loc
+
+    returns the ordered dictionary of changed keys to their new values. The file is only written when there are some.
+    '''
+    path = locator_path + '.loc'
+
+    with open(path, newline='') as loc:
+        original = loc.read()
+
+    patched, changes = patch(original, template)
+    write_if_changed(path, patched, original)
+
+    return changes
+
+
+def replace_workspace(text, workspace):
+    '''returns a tuple of the .loc.xml text with the text of every workspace path element replaced by `workspace` and the
+    number of them that were different
+    '''
+    elements = []
+    pieces = []
+    position = 0
+    path_start = None
+    changed = 0
+
+    for markup in MARKUP.finditer(text):
+        closing, name, empty = markup.groups()
+
+        if name is None or empty:
+            continue
+
+        if not closing:
+            elements.append(name)
+
+            if tuple(elements[-len(WORKSPACE_PATH):]) == WORKSPACE_PATH:
+                path_start = markup.end()
+
+            continue
+
+        if path_start is not None:
+            if unescape(text[path_start:markup.start()]) != workspace:
+                changed += 1
+
+            pieces.append(text[position:path_start])
+            pieces.append(escape(workspace))
+            position = markup.start()
+            path_start = None
+
+        elements.pop()
+
+    pieces.append(text[position:])
+
+    return ''.join(pieces), changed
+
+
+def patch_loc_xml(locator_path, workspace):
+    '''points the reference data of the `locator_path` .loc.xml at `workspace`
+
+    returns True if the file was written. It is left alone when every path is already `workspace`.
+    '''
+    path = locator_path + '.loc.xml'
+
+    with open(path, encoding='utf-8', newline='') as loc_xml:
+        original = loc_xml.read()
+
+    patched, changed = replace_workspace(original, workspace)
+    if not changed:
+        return False
+
+    with open(path + '.tmp', 'w', encoding='utf-8', newline='') as temp:
+        temp.write(patched)
+
+    replace(path + '.tmp', path)
+
+    return True
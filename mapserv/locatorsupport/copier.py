@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+copier.py
+
+A module that copies one file to many destinations while only reading it once.
+
+The source is read in large chunks and each chunk is handed to a writer thread per destination. A destination
+that fails is retried on its own with a streamed copy so one slow or flaky share does not fail the others.
+'''
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from os import remove
+from queue import Queue
+from time import perf_counter
+from time import sleep
+
+BUFFER_SIZE = 16 * 1024 * 1024
+
+#: the number of chunks a writer can fall behind the reader by. This bounds the memory to about BUFFER_SIZE * QUEUE_DEPTH
+QUEUE_DEPTH = 4
+
+#: source: the file that was copied
+#: destination: the file that was written
+#: bytes: the number of bytes written
+#: seconds: the seconds the last attempt took
+#: attempts: the number of times the destination was written
+#: error: the exception from the last attempt or None if the copy succeeded
+Transfer = namedtuple('Transfer', ['source', 'destination', 'bytes', 'seconds', 'attempts', 'error'])
+
+#: put on the queues when the source could not be read so the writers throw away what they have
+ABORT = None
+
+
+def get_throughput(transfer):
+    '''returns the megabytes per second of the transfer
+    '''
+    if not transfer.seconds:
+        return 0
+
+    return transfer.bytes / 1024 / 1024 / transfer.seconds
+
+
+def fan_out(source, destinations, buffer_size=BUFFER_SIZE, retries=2, retry_delay=1):
+    '''copies `source` to each of the `destinations` file paths
+
+    retries: the number of times a failed destination is copied again
+    retry_delay: the seconds to wait before each retry
+
+    returns a list of Transfer in the order of the destinations
+    '''
+    if not destinations:
+        return []
+
+    queues = [Queue(QUEUE_DEPTH) for destination in destinations]
+
+    with ThreadPoolExecutor(max_workers=len(destinations)) as executor:
+        futures = [executor.submit(_write, destination, chunks, buffer_size) for destination, chunks in zip(destinations, queues)]
+
+        finished = False
+        try:
+            with open(source, 'rb', buffering=0) as reader:
+                while not finished:
+                    chunk = reader.read(buffer_size)
+                    finished = not chunk
+
+                    for chunks in queues:
+                        chunks.put(chunk)
+        finally:
+            if not finished:
+                for chunks in queues:
+                    chunks.put(ABORT)
+
+    transfers = []
+    for destination, future in zip(destinations, futures):
+        written, seconds, error = future.result()
+        attempts = 1
+
+        while error is not None and attempts <= retries:
+            sleep(retry_delay)
+
+            written, seconds, error = copy(source, destination, buffer_size)
+            attempts += 1
+
+        transfers.append(Transfer(source, destination, written, seconds, attempts, error))
+
+    return transfers
+
+
+def copy(source, destination, buffer_size=BUFFER_SIZE):
+    '''a streamed copy of one file
+
+    returns a tuple of the bytes written, the seconds it took and the exception or None
+    '''
+    start = perf_counter()
+    written = 0
+
+    try:
+        with open(source, 'rb', buffering=0) as reader, open(destination, 'wb', buffering=0) as writer:
+            chunk = reader.read(buffer_size)
+            while chunk:
+                writer.write(chunk)
+                written += len(chunk)
+
+                chunk = reader.read(buffer_size)
+    except Exception as error:
+        _remove(destination)
+
+        return written, perf_counter() - start, error
+
+    return written, perf_counter() - start, None
+
+
+def _write(destination, chunks, buffer_size):
+    '''writes the chunks from the queue to the destination until an empty chunk. This runs in a thread.
+
+    it keeps taking chunks after an error so the reader never blocks on a full queue
+    '''
+    start = perf_counter()
+    written = 0
+    error = None
+    writer = None
+
+    try:
+        writer = open(destination, 'wb', buffering=0)
+    except Exception as ex:
+        error = ex
+
+    chunk = chunks.get()
+    while chunk:
+        if error is None:
+            try:
+                writer.write(chunk)
+                written += len(chunk)
+            except Exception as ex:
+                error = ex
+
+        chunk = chunks.get()
+
+    if writer is not None:
+        try:
+            writer.close()
+        except Exception as ex:
+            error = error or ex
+
+    if chunk is ABORT:
+        error = error or IOError('reading the source failed')
+
+    if error is not None:
+        _remove(destination)
+
+    return written, perf_counter() - start, error
+
+
+def _remove(path):
+    try:
+        remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+deploy.py
+
+A module that swaps rebuilt locators in with as little service downtime as possible.
+
+The rebuilt files are copied next to the live files with a `.new` suffix while the service is still
+running. Only the renames that swap them in need the service to be stopped. Files whose content hash
+matches the manifest of a destination are not copied there at all. Destinations on the same volume as
+the rebuilt files are reflinked or hard linked instead of copied.
+'''
+
+from collections import namedtuple
+from locatorsupport.clone import COPY
+from locatorsupport.clone import Cloner
+from locatorsupport.copier import Transfer
+from locatorsupport.copier import fan_out
+from locatorsupport.manifest import get_current_hashes
+from locatorsupport.manifest import record
+from locatorsupport.manifest import update_manifest
+from locatorsupport.rebuild import STAGED
+from locatorsupport.rebuild import get_locator_files
+from os import makedirs
+from os import remove
+from os import replace
+from os.path import basename
+from os.path import join
+from time import perf_counter
+
+#: staged: a list of (staged, live) file paths
+#: transfers: a list of copier.Transfer
+#: skipped: a list of live file paths that already had the same content
+#: hashes: a dictionary of file name to content hash of the files that were staged from
+#: strategies: a dictionary of destination folder to the clone strategy that was used for it
+Staging = namedtuple('Staging', ['staged', 'transfers', 'skipped', 'hashes', 'strategies'])
+
+
+def stage(file_path, locator, to_folders, **kwargs):
+    '''copies the `locator` files in `file_path` next to the live files in each of `to_folders` with the staged suffix.
+    Each file is read once and written to all of the folders that need it at the same time. kwargs are passed to copier.fan_out.
+
+    returns a Staging
+    '''
+    staged = []
+    transfers = []
+    skipped = []
+
+    #: the staged files are renamed over the live files so they can share data with the rebuilt files
+    cloner = Cloner(allow_hardlink=True)
+
+    try:
+        files = get_locator_files(file_path, locator)
+        hashes = {name: entry.hash for name, entry in update_manifest(file_path, locator, files).items()}
+        current = {}
+
+        for to_folder in to_folders:
+            makedirs(to_folder, exist_ok=True)
+            current[to_folder] = get_current_hashes(to_folder, locator)
+
+        for filename in files:
+            name = basename(filename)
+            live_files = []
+
+            for to_folder in to_folders:
+                live_file = join(to_folder, name)
+
+                if current[to_folder].get(name) == hashes[name]:
+                    skipped.append(live_file)
+                elif cloner.get_strategy(filename, live_file) != COPY:
+                    start = perf_counter()
+                    strategy, written = cloner.clone(filename, live_file + STAGED)
+
+                    transfers.append(Transfer(filename, live_file + STAGED, written, perf_counter() - start, 1, None))
+                    staged.append((live_file + STAGED, live_file))
+                else:
+                    live_files.append(live_file)
+
+            for live_file, transfer in zip(live_files, fan_out(filename, [live_file + STAGED for live_file in live_files], **kwargs)):
+                transfers.append(transfer)
+
+                if transfer.error is None:
+                    staged.append((transfer.destination, live_file))
+
+        failed = [transfer for transfer in transfers if transfer.error is not None]
+        if failed:
+            raise IOError('staging {} failed: {}'.format(locator, '; '.join('{}: {}'.format(transfer.destination, transfer.error)
+                                                                           for transfer in failed)))
+    except Exception:
+        discard(staged)
+
+        raise
+
+    return Staging(staged, transfers, skipped, hashes, cloner.strategies)
+
+
+def swap(staged):
+    '''renames the staged files over the live files. The service must be stopped.
+    '''
+    for staged_file, live_file in staged:
+        replace(staged_file, live_file)
+
+
+def save_manifests(staging, locator, to_folders):
+    '''records the content of the swapped in files in the manifest of each folder
+    '''
+    for to_folder in to_folders:
+        record(to_folder, locator, staging.hashes)
+
+
+def discard(staged):
+    '''removes staged files that were not swapped in
+    '''
+    for staged_file, live_file in staged:
+        try:
+            remove(staged_file)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+geocoding.py
+
+A module that replays a sample of addresses through a geocoder and measures how fast and how well it matches them.
+
+The geocoder is anything with the `Geocoder` methods. `ArcpyGeocoder` uses a copy of a locator on disk so its .loc can be
+changed for each variant of the template. `ServiceGeocoder` sends the addresses to a published GeocodeServer as it is.
+`FakeGeocoder` runs without arcgis and always gives the same answers.
+'''
+
+import csv
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from locatorsupport.config import get_properties
+from locatorsupport.config import patch
+from os.path import join
+from time import perf_counter
+from time import sleep
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+#: street: the street address eg: 123 S Main St
+#: zone: the city or zip code
+Address = namedtuple('Address', ['street', 'zone'])
+
+#: variant: the name of the template variant
+#: addresses: the number of addresses that were geocoded
+#: seconds: the wall seconds the replay took
+#: throughput: addresses per second
+#: p50, p95, p99: the latency percentiles in seconds
+#: match_rate: the fraction of the addresses that matched
+#: match_delta: the match rate minus the match rate of the first variant
+Report = namedtuple('Report', ['variant', 'addresses', 'seconds', 'throughput', 'p50', 'p95', 'p99', 'match_rate', 'match_delta'])
+
+
+class Geocoder(object):
+    '''the methods a geocoder needs to be replayed
+    '''
+
+    def configure(self, properties):
+        '''applies the .loc properties, a dictionary of key to a list of values, before a replay
+        '''
+        raise NotImplementedError
+
+    def geocode(self, street, zone):
+        '''returns the score of the best match or None when there is no match
+        '''
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ArcpyGeocoder(Geocoder):
+    '''geocodes with a scratch copy of `locator` in `path_to_locators`. The live locator is never changed.
+    '''
+
+    def __init__(self, path_to_locators, locator):
+        #: imported here so the fake geocoder runs without arcgis
+        import arcpy
+        from locatorsupport.rebuild import copy_locator
+
+        self.arcpy = arcpy
+        self.folder = tempfile.mkdtemp(prefix='geocoding')
+        self.path = join(self.folder, locator)
+        self.locator = None
+
+        copy_locator(path_to_locators, locator, self.folder)
+
+        with open(self.path + '.loc') as loc:
+            self.original = loc.read()
+
+    def configure(self, properties):
+        text = ''.join('{} = {}\n'.format(key, value) for key, values in properties.items() for value in values)
+
+        with open(self.path + '.loc', 'w') as loc:
+            loc.write(patch(self.original, text)[0])
+
+        self.locator = self.arcpy.geocoding.Locator(self.path)
+
+    def geocode(self, street, zone):
+        candidates = self.locator.geocode('{}, {}'.format(street, zone), False)
+
+        if not candidates:
+            return None
+
+        return max(candidate['Score'] for candidate in candidates)
+
+    def close(self):
+        self.locator = None
+
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+class ServiceGeocoder(Geocoder):
+    '''geocodes with the findAddressCandidates operation of a published GeocodeServer
+
+    services_url: the arcgis server rest services url eg: https://server/arcgis/rest/services
+    service: the folder and name of the service eg: Geolocators/Roads_AddressSystem_STREET
+    token: an arcgis server token when the service is secured
+    '''
+
+    def __init__(self, services_url, service, token=None, timeout=30):
+        self.url = '{}/{}/GeocodeServer/findAddressCandidates'.format(services_url.rstrip('/'), service)
+        self.token = token
+        self.timeout = timeout
+
+    def configure(self, properties):
+        #: the properties of a published locator can't change without publishing it again
+        pass
+
+    def geocode(self, street, zone):
+        parameters = {'SingleLine': '{}, {}'.format(street, zone), 'maxLocations': 1, 'outFields': '', 'f': 'json'}
+        if self.token:
+            parameters['token'] = self.token
+
+        with urlopen('{}?{}'.format(self.url, urlencode(parameters)), timeout=self.timeout) as response:
+            candidates = json.loads(response.read().decode('utf-8')).get('candidates')
+
+        if not candidates:
+            return None
+
+        return max(candidate['score'] for candidate in candidates)
+
+
+class FakeGeocoder(Geocoder):
+    '''a geocoder for offline runs. Each address gets a fixed difficulty from its hash and the properties change how long it
+    takes and whether it matches in the same direction they do for a real locator.
+
+    latency: the seconds an address of average difficulty takes with the template defaults
+    '''
+
+    def __init__(self, latency=0.001):
+        self.latency = latency
+        self.configure({})
+
+    def configure(self, properties):
+
+        def get(key, default):
+            return float(properties.get(key, [default])[-1])
+
+        self.candidates = get('MaxCandidates', 10)
+        self.timeout = get('SearchTimeout', 1)
+        self.spelling = get('SpellingSensitivity', 80)
+        self.minimum = get('MinimumMatchScore', 60)
+
+        #: 0 is one thread per core
+        threads = int(get('NumThreads', 0)) or os.cpu_count() or 1
+        self.gate = threading.BoundedSemaphore(threads)
+
+    def geocode(self, street, zone):
+        digest = blake2b('{}|{}'.format(street, zone).upper().encode('utf-8'), digest_size=8).digest()
+        difficulty = int.from_bytes(digest, 'big') / 2**64
+
+        #: looser spelling and more candidates search more of the index
+        cost = self.latency * (0.5 + difficulty) * (1 + self.candidates / 20) * (1 + (100 - self.spelling) / 100)
+
+        with self.gate:
+            sleep(min(cost, self.timeout))
+
+        if cost > self.timeout:
+            return None
+
+        score = 100 - 60 * difficulty * difficulty * self.spelling / 80 + min(self.candidates, 30) / 5
+
+        if score < self.minimum:
+            return None
+
+        return min(score, 100)
+
+
+def read_sample(path, limit=None):
+    '''returns a list of Address from a csv with street and zone columns
+    '''
+    addresses = []
+
+    with open(path, newline='') as sample:
+        for row in csv.DictReader(sample):
+            row = {key.strip().lower(): value for key, value in row.items() if key}
+            addresses.append(Address(row['street'], row['zone']))
+
+            if limit and len(addresses) == limit:
+                break
+
+    return addresses
+
+
+def synthetic_sample(size, seed=0):
+    '''returns a list of `size` made up Address for offline runs
+    '''
+    generator = random.Random(seed)
+    streets = ['Main St', 'State St', '400 S', '1300 E', 'Redwood Rd', 'Highland Dr', 'Center St', 'Canyon Rd']
+    zones = ['Salt Lake City', 'Provo', 'Ogden', 'St George', 'Logan', '84101', '84604', '84770']
+    directions = ['N', 'S', 'E', 'W', '']
+
+    return [
+        Address('{} {} {}'.format(generator.randint(1, 9999), generator.choice(directions), generator.choice(streets)).replace('  ', ' '),
+                generator.choice(zones)) for _ in range(size)
+    ]
+
+
+def replay(geocoder, addresses, workers=1):
+    '''geocodes every address. More than one worker geocodes that many addresses at a time.
+
+    returns a tuple of a list of (seconds, score) in the order of the addresses and the wall seconds
+    '''
+
+    def timed(address):
+        start = perf_counter()
+        score = geocoder.geocode(address.street, address.zone)
+
+        return perf_counter() - start, score
+
+    start = perf_counter()
+
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(timed, addresses))
+    else:
+        results = [timed(address) for address in addresses]
+
+    return results, perf_counter() - start
+
+
+def percentile(ordered, fraction):
+    '''returns the nearest rank percentile of a sorted list
+    '''
+    if not ordered:
+        return 0
+
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(variant, results, seconds, baseline=None):
+    '''returns the Report of a replay. baseline is the Report the match rate is compared to.
+    '''
+    latencies = sorted(latency for latency, score in results)
+    match_rate = sum(1 for latency, score in results if score is not None) / len(results) if results else 0
+
+    return Report(variant, len(results), seconds, len(results) / seconds if seconds else 0, percentile(latencies, 0.5),
+                  percentile(latencies, 0.95), percentile(latencies, 0.99), match_rate,
+                  match_rate - (baseline.match_rate if baseline else match_rate))
+
+
+def compare(geocoder, addresses, template, variants, workers=1):
+    '''replays the addresses once for each variant of the template
+
+    template: the rendered .loc properties the variants change
+    variants: a list of (name, .loc properties) that are merged into the template. The first is the baseline.
+
+    returns a list of Report
+    '''
+    reports = []
+
+    for name, changes in variants:
+        geocoder.configure(get_properties(patch(template, changes)[0]))
+
+        results, seconds = replay(geocoder, addresses, workers)
+        reports.append(summarize(name, results, seconds, reports[0] if reports else None))
+
+    return reports
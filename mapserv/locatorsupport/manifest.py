@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+manifest.py
+
+A module that keeps a manifest of the size, modified time and content hash of each locator file.
+
+The manifest is saved next to the locator files as `<locator>.manifest.json`. A file whose size and modified
+time still match its manifest entry keeps its hash without being read again, so comparing a destination to a
+rebuilt locator is mostly metadata checks.
+'''
+
+import json
+from collections import namedtuple
+from hashlib import blake2b
+from os import replace
+from os import stat
+from os.path import basename
+from os.path import join
+
+CHUNK_SIZE = 1024 * 1024
+
+Entry = namedtuple('Entry', ['size', 'mtime', 'hash'])
+
+
+def get_manifest_path(folder, locator):
+    return join(folder, '{}.manifest.json'.format(locator))
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    '''returns the blake2b hex digest of the file
+    '''
+    digest = blake2b(digest_size=16)
+
+    with open(path, 'rb') as data:
+        chunk = data.read(chunk_size)
+        while chunk:
+            digest.update(chunk)
+            chunk = data.read(chunk_size)
+
+    return digest.hexdigest()
+
+
+def read_manifest(folder, locator):
+    '''returns a dictionary of file name to Entry. It is empty when there is no manifest or it can't be read.
+    '''
+    try:
+        with open(get_manifest_path(folder, locator)) as manifest:
+            return {name: Entry(*entry) for name, entry in json.load(manifest).items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def write_manifest(folder, locator, entries):
+    path = get_manifest_path(folder, locator)
+
+    with open(path + '.tmp', 'w') as manifest:
+        json.dump({name: list(entry) for name, entry in entries.items()}, manifest, indent=2, sort_keys=True)
+
+    replace(path + '.tmp', path)
+
+
+def is_current(path, entry):
+    '''returns True if the file still has the size and modified time in its manifest entry
+    '''
+    if entry is None:
+        return False
+
+    try:
+        status = stat(path)
+    except OSError:
+        return False
+
+    return status.st_size == entry.size and status.st_mtime_ns == entry.mtime
+
+
+def describe(path, previous=None):
+    '''returns the Entry for the file. The hash is reused from `previous` when the file has not changed.
+    '''
+    if is_current(path, previous):
+        return previous
+
+    status = stat(path)
+
+    return Entry(status.st_size, status.st_mtime_ns, hash_file(path))
+
+
+def update_manifest(folder, locator, files):
+    '''brings the manifest in `folder` up to date with `files` and saves it
+
+    returns the dictionary of file name to Entry
+    '''
+    previous = read_manifest(folder, locator)
+    entries = {basename(path): describe(path, previous.get(basename(path))) for path in files}
+
+    write_manifest(folder, locator, entries)
+
+    return entries
+
+
+def get_current_hashes(folder, locator):
+    '''returns a dictionary of file name to hash for the files in `folder` that still match the manifest
+    '''
+    return {name: entry.hash for name, entry in read_manifest(folder, locator).items() if is_current(join(folder, name), entry)}
+
+
+def record(folder, locator, hashes):
+    '''saves the manifest for files in `folder` that are known to have the content in `hashes`, a dictionary of file name to hash.
+    The files are only stat'ed.
+    '''
+    entries = read_manifest(folder, locator)
+
+    for name, content_hash in hashes.items():
+        status = stat(join(folder, name))
+        entries[name] = Entry(status.st_size, status.st_mtime_ns, content_hash)
+
+    write_manifest(folder, locator, entries)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+rebuild.py
+
+A module that rebuilds locators in worker processes. It lives outside of the pallet module so the workers
+can import it without importing a pallet.
+'''
+
+import arcpy
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from forklift.core import hash_field
+from glob import iglob
+from locatorsupport.clone import Cloner
+from locatorsupport.clone import get_weakest
+from os import makedirs
+from os.path import basename
+from os.path import join
+from os.path import split
+from time import perf_counter
+
+REBUILDING = 'rebuilding'
+
+#: the suffixes of the locator that holds the rows changed since the last full rebuild and the composite
+#: locator that searches it before the full locator
+DELTA_SUFFIX = '_Delta'
+COMPOSITE_SUFFIX = '_Composite'
+
+#: style: the locator style
+#: primary: the primary table name in the reference workspace
+#: alternate: the alternate name table name in the reference workspace
+#: join_field: the field that joins the primary and alternate name tables
+#: field_map: the CreateAddressLocator field map
+#: options: the templates text that is added to the .loc
+Definition = namedtuple('Definition', ['style', 'primary', 'alternate', 'join_field', 'field_map', 'options'])
+
+#: the suffix of locator files that are staged next to the live files waiting to be swapped in
+STAGED = '.new'
+
+
+def get_rebuild_folder(path_to_locators, locator):
+    '''returns the folder that `locator` is rebuilt in. Each locator gets its own so they can be rebuilt at the same time.
+    '''
+    return join(path_to_locators, REBUILDING, locator)
+
+
+def get_locator_files(file_path, locator):
+    '''returns the .loc, .loc.xml and .lox files of `locator` in `file_path`. Staged files are skipped.
+    '''
+    location = join(file_path, locator)
+
+    #: iterator glob for .lox .loc .loc.xml
+    return [filename for filename in iglob(location + '.lo*') if not filename.endswith(STAGED)]
+
+
+def copy_locator(file_path, locator, to_folder):
+    '''copies the .loc, .loc.xml and .lox files of `locator` in `file_path` to `to_folder`. A reflink is used when the
+    filesystem supports it. Hard links are not used because the rebuild may write to the files in place.
+
+    returns the slowest clone strategy that was used for any of the files eg: copy when the .lox was reflinked and the
+    .loc.xml was copied
+    '''
+    cloner = Cloner()
+    strategies = []
+
+    for filename in get_locator_files(file_path, locator):
+        base_folder, locator_with_extension = split(filename)
+
+        makedirs(to_folder, exist_ok=True)
+
+        strategy, written = cloner.clone(filename, join(to_folder, locator_with_extension))
+        strategies.append(strategy)
+
+    return get_weakest(strategies)
+
+
+def rebuild(path_to_locators, locator):
+    '''copies the live locator to its rebuild folder and rebuilds it there. This runs in a worker process.
+
+    returns a tuple of the rebuild folder, the seconds it took and the slowest clone strategy used to copy the live locator
+    '''
+    start = perf_counter()
+    rebuild_path = get_rebuild_folder(path_to_locators, locator)
+
+    strategy = copy_locator(path_to_locators, locator, rebuild_path)
+    arcpy.geocoding.RebuildAddressLocator(join(rebuild_path, locator))
+
+    return rebuild_path, perf_counter() - start, strategy
+
+
+def create_locator(definition, workspace, out_address_locator):
+    '''creates a locator from the tables in `workspace`
+    '''
+    arcpy.geocoding.CreateAddressLocator(
+        in_address_locator_style=definition.style,
+        in_reference_data="{0}/{1} 'Primary Table';{0}/{2} 'Alternate Name Table'".format(workspace, definition.primary, definition.alternate),
+        in_field_map=definition.field_map,
+        out_address_locator=out_address_locator,
+        config_keyword='',
+        enable_suggestions='DISABLED')
+
+
+def extract_rows(source, workspace, hashes, join_ids, join_field):
+    '''copies the rows of `source` whose hash is in `hashes` or whose join field is in `join_ids` to a new table in `workspace`
+
+    returns the number of rows copied
+    '''
+    name = basename(source)
+    description = arcpy.Describe(source)
+    fields = [field.name for field in description.fields if field.type not in ['OID', 'Geometry']]
+
+    if description.dataType == 'FeatureClass':
+        arcpy.management.CreateFeatureclass(workspace, name, description.shapeType.upper(), source, spatial_reference=description.spatialReference)
+        fields.append('SHAPE@')
+    else:
+        arcpy.management.CreateTable(workspace, name, source)
+
+    hash_index = fields.index(hash_field)
+    join_index = fields.index(join_field)
+    copied = 0
+
+    with arcpy.da.SearchCursor(source, fields) as search_cursor, arcpy.da.InsertCursor(join(workspace, name), fields) as insert_cursor:
+        for row in search_cursor:
+            join_id = row[join_index]
+
+            if row[hash_index] in hashes or (join_id is not None and str(join_id) in join_ids):
+                insert_cursor.insertRow(row)
+                copied += 1
+
+    return copied
+
+
+def build_delta(path_to_locators, locator, definition, workspace, changes):
+    '''builds a locator of the rows that changed since the last full rebuild. This runs in a worker process.
+
+    Rows that share a join id with a changed row are included so a changed alternate name brings its primary row along.
+    Removed rows can't be taken out of the full locator so they only count towards the next full rebuild.
+
+    workspace: the workspace with the reference data of the full locator
+    changes: a dictionary of table name to changes.Changes. None builds an empty delta to swap in with a full rebuild so the
+        rows of the last delta stop overriding the full locator.
+
+    returns a tuple of the rebuild folder, the seconds it took and the number of rows in the delta
+    '''
+    start = perf_counter()
+    delta = locator + DELTA_SUFFIX
+    rebuild_path = get_rebuild_folder(path_to_locators, delta)
+    makedirs(rebuild_path, exist_ok=True)
+
+    arcpy.management.CreateFileGDB(rebuild_path, 'reference.gdb')
+    reference = join(rebuild_path, 'reference.gdb')
+
+    changes = changes or {}
+    join_ids = set()
+    for change in changes.values():
+        join_ids.update(change.join_ids)
+
+    rows = 0
+    for table in [definition.primary, definition.alternate]:
+        added = changes[table].added if table in changes else set()
+        rows += extract_rows(join(workspace, table), reference, added, join_ids, definition.join_field)
+
+    create_locator(definition, reference, join(rebuild_path, delta))
+
+    return rebuild_path, perf_counter() - start, rows
+
+
+def run_all(jobs, max_workers=None):
+    '''runs the jobs at the same time, one worker process each
+
+    jobs: a dictionary of name to a (function, args) tuple
+
+    yields (name, future) tuples as the jobs finish
+    '''
+    with ProcessPoolExecutor(max_workers=max_workers or max(len(jobs), 1)) as executor:
+        futures = {executor.submit(function, *args): name for name, (function, args) in jobs.items()}
+
+        for future in as_completed(futures):
+            yield futures[future], future
@@ -5,7 +5,13 @@ configuration = {
         'copy_destinations': ['c:\\temp\\copy_location'],
         'username': None,
         'password': None,
-        'host': None
+        'host': None,
+        'incremental': False,
+        'profile': 'baseline',
+        'geocode_machine': None,
+        'warm_up': False,
+        'warm_up_sample': None,
+        'geocode_url': None
     },
     'Staging': {
         'path_to_roadgrinder': None,
@@ -13,7 +19,13 @@ configuration = {
         'copy_destinations': [],
         'username': None,
         'password': None,
-        'host': None
+        'host': None,
+        'incremental': False,
+        'profile': 'baseline',
+        'geocode_machine': None,
+        'warm_up': False,
+        'warm_up_sample': None,
+        'geocode_url': None
     },
     'Production': {
         'path_to_roadgrinder': None,
@@ -21,6 +33,12 @@ configuration = {
         'copy_destinations': [],
         'username': None,
         'password': None,
-        'host': None
+        'host': None,
+        'incremental': False,
+        'profile': 'baseline',
+        'geocode_machine': None,
+        'warm_up': False,
+        'warm_up_sample': None,
+        'geocode_url': None
     }
 }
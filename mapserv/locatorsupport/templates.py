@@ -1,3 +1,23 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+templates.py
+
+The .loc properties for each locator style and the performance profiles that are rendered into them.
+
+The style templates hold the matching behaviour and the thread, memory and cache properties that the locators
+have always had. A profile can replace those with values sized from the cores and memory of the GeocodeServer
+machine and the size of the reference data:
+
+    baseline        the properties in the style template (the default)
+    batch           large caches and every core for bulk geocoding
+    interactive     a few threads and a modest memory limit for a service with many instances
+    low-memory      the smallest footprint for a small server
+'''
+
+import os
+from collections import namedtuple
+
 us_dual_range_addresses = '''
 BatchPresortCacheSize = 50000
 BatchPresortInputs = City
@@ -120,3 +140,145 @@ WriteStandardizedAddressField = false
 WriteUnitInfoFields = false
 WriteXYCoordFields = true
 '''
+
+MB = 1024 * 1024
+
+#: cores: the number of logical processors
+#: memory: the bytes of physical memory or None if it can't be found
+#: reference_bytes: the size of the reference data on disk
+Machine = namedtuple('Machine', ['cores', 'memory', 'reference_bytes'])
+
+
+def get_memory():
+    '''returns the bytes of physical memory or None
+    '''
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        pass
+
+    try:
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('sullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+    except Exception:
+        pass
+
+    return None
+
+
+def get_size(path):
+    '''returns the bytes of the files in a folder eg: a file geodatabase
+    '''
+    size = 0
+
+    for folder, folders, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+
+    return size
+
+
+def detect_machine(reference_data=None):
+    '''returns the Machine this is running on. reference_data is the path to the reference workspace.
+
+    Only use this when the locators are loaded on this machine eg: LocatorsBenchmark.py. The pallet reads the specs of
+    the GeocodeServer machines from its secrets with get_machine.
+    '''
+    return Machine(os.cpu_count() or 1, get_memory(), get_size(reference_data) if reference_data else 0)
+
+
+def get_machine(specs, reference_data=None):
+    '''returns the Machine described by the secrets
+
+    specs: a dictionary with the `cores` and `memory_mb` of the machine that loads the locators
+    reference_data: the path to the reference workspace
+    '''
+    return Machine(int(specs['cores']), int(specs['memory_mb']) * MB, get_size(reference_data) if reference_data else 0)
+
+
+def clamp(value, smallest, largest):
+    '''keeps value between smallest and largest. largest wins when they cross.
+    '''
+    return int(min(max(value, smallest), largest))
+
+
+def baseline(machine):
+    return {}
+
+
+def batch(machine):
+    memory = machine.memory or 4096 * MB
+
+    return {
+        'NumThreads': machine.cores,
+        'RuntimeMemoryLimit': clamp(machine.reference_bytes * 2, 1024 * MB, memory // 4),
+        'BatchPresortCacheSize': 200000,
+        'StorageSegmentSizeKB': 512
+    }
+
+
+def interactive(machine):
+    memory = machine.memory or 4096 * MB
+
+    return {
+        'NumThreads': min(2, machine.cores),
+        'RuntimeMemoryLimit': clamp(machine.reference_bytes, 512 * MB, memory // 8),
+        'BatchPresortCacheSize': 50000,
+        'StorageSegmentSizeKB': 128
+    }
+
+
+def low_memory(machine):
+    memory = machine.memory or 2048 * MB
+
+    return {
+        'NumThreads': 1,
+        'RuntimeMemoryLimit': clamp(machine.reference_bytes // 4, 128 * MB, memory // 16),
+        'BatchPresortCacheSize': 10000,
+        'StorageSegmentSizeKB': 64
+    }
+
+
+PROFILES = {'baseline': baseline, 'batch': batch, 'interactive': interactive, 'low-memory': low_memory}
+
+#: the profile that leaves the style templates as they are
+BASELINE = 'baseline'
+
+
+def render(style, profile=BASELINE, machine=None):
+    '''returns the .loc properties of the style template with the profile's performance properties in place of its own
+
+    style: us_dual_range_addresses or us_single_house_addresses
+    profile: a name in PROFILES
+    machine: a Machine. The machine this is running on when it's None.
+    '''
+    if profile == BASELINE:
+        return style
+
+    if machine is None:
+        machine = detect_machine()
+
+    properties = PROFILES[profile](machine)
+    lines = [line for line in style.splitlines(True) if line.split('=')[0].strip() not in properties]
+
+    return ''.join(lines) + ''.join('{} = {}\n'.format(key, value) for key, value in sorted(properties.items()))
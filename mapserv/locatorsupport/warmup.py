@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+warmup.py
+
+A module that warms up a locator after its service is started again so the first real requests don't pay for
+paging the .lox index in from disk.
+
+A batch of addresses is geocoded through a geocoding.Geocoder right after the restart for the cold latency. Then
+the locator files in each destination are read from start to end so the operating system keeps them in its page
+cache and the batch is geocoded again for the warm latency.
+'''
+
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from locatorsupport.geocoding import replay
+from locatorsupport.geocoding import summarize
+from locatorsupport.rebuild import get_locator_files
+from time import perf_counter
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+#: path: the file that was read
+#: bytes: the number of bytes read
+#: seconds: the seconds it took
+#: error: the exception or None if the file was read
+Read = namedtuple('Read', ['path', 'bytes', 'seconds', 'error'])
+
+
+def read_through(path, chunk_size=CHUNK_SIZE):
+    '''reads the file in order and throws the data away so it ends up in the page cache
+
+    returns a Read
+    '''
+    start = perf_counter()
+    read = 0
+
+    try:
+        with open(path, 'rb', buffering=0) as reader:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(reader.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            chunk = reader.read(chunk_size)
+            while chunk:
+                read += len(chunk)
+                chunk = reader.read(chunk_size)
+    except Exception as error:
+        return Read(path, read, perf_counter() - start, error)
+
+    return Read(path, read, perf_counter() - start, None)
+
+
+def cache_files(folders, locator, chunk_size=CHUNK_SIZE):
+    '''reads the `locator` files in each of the `folders`. The folders are read at the same time because they are
+    usually on different machines.
+
+    returns a list of Read
+    '''
+    if not folders:
+        return []
+
+    def read_folder(folder):
+        return [read_through(path, chunk_size) for path in get_locator_files(folder, locator)]
+
+    with ThreadPoolExecutor(max_workers=len(folders)) as executor:
+        return [read for reads in executor.map(read_folder, folders) for read in reads]
+
+
+def measure(geocoder, addresses, variant, workers=1, baseline=None):
+    '''geocodes the addresses once
+
+    variant: the name of the pass eg: cold or warm
+    baseline: the geocoding.Report that the match rate delta is compared to
+
+    returns a geocoding.Report
+    '''
+    results, seconds = replay(geocoder, addresses, workers)
+
+    return summarize(variant, results, seconds, baseline)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+catalog.py
+
+A module that lists the contents of a geodatabase in one pass and caches the result
+'''
+
+import arcpy
+import json
+from collections import namedtuple
+from os.path import basename
+from time import time
+
+HOUR = 60 * 60
+
+FIELDS = ['user', 'tables', 'feature_classes', 'rasters', 'feature_datasets', 'topologies']
+
+#: the arcpy.da.Walk data types that AnalyzeDatasets takes and the Inventory field that they are listed in. Anything
+#: else eg: relationship classes and geometric networks is left out.
+DATA_TYPES = [('Table', 'tables'), ('FeatureClass', 'feature_classes'), ('RasterDataset', 'rasters'), ('Topology', 'topologies')]
+
+
+class Inventory(namedtuple('Inventory', FIELDS)):
+    '''the contents of a workspace
+
+    user: the lower cased name of the connected user
+    tables, feature_classes, rasters: the qualified names of the datasets including those inside of feature datasets
+    feature_datasets: the feature dataset names
+    topologies: the topologies inside of feature datasets
+    '''
+
+    def datasets(self, include_topology=True):
+        '''returns the names of everything that can be analyzed
+        '''
+        datasets = self.tables + self.feature_classes + self.rasters
+
+        if include_topology:
+            datasets += self.topologies
+
+        return datasets
+
+    def owned_by(self, user):
+        '''returns a new Inventory with only the items owned by `user`
+        '''
+        owner = '.{}.'.format(user.lower())
+
+        def owned(names):
+            return [name for name in names if owner in name.lower()]
+
+        return Inventory(self.user, *[owned(getattr(self, field)) for field in FIELDS[1:]])
+
+    def to_json(self):
+        return json.dumps(self._asdict())
+
+    @classmethod
+    def from_json(cls, text):
+        values = json.loads(text)
+
+        #: inventories cached before a field was added or removed are still read
+        return cls(values['user'], *[values.get(field, []) for field in FIELDS[1:]])
+
+
+def walk(workspace):
+    '''returns an Inventory of the workspace with an arcpy.da.Walk for each data type that can be analyzed instead of
+    describing every child of the workspace
+    '''
+    inventory = Inventory(arcpy.Describe(workspace).connectionProperties.user.lower(), [], [], [], [], [])
+
+    for data_type, field in DATA_TYPES:
+        for folder, feature_datasets, names in arcpy.da.Walk(workspace, datatype=data_type):
+            if folder == workspace:
+                inventory.feature_datasets[:] = feature_datasets
+
+            getattr(inventory, field).extend(basename(name) for name in names)
+
+    return inventory
+
+
+def get_inventory(workspace, store=None, ttl_hours=72):
+    '''returns the Inventory for the workspace from the cache in the MaintenanceStore if it is younger than
+    `ttl_hours` otherwise the workspace is walked and the cache is updated
+
+    store: an open MaintenanceStore or None to skip the cache
+    '''
+    if store is None:
+        return walk(workspace)
+
+    cached = store.get_catalog(workspace)
+    if cached is not None:
+        cached_at, text = cached
+
+        if time() - cached_at < ttl_hours * HOUR:
+            return Inventory.from_json(text)
+
+    return refresh_inventory(workspace, store)
+
+
+def refresh_inventory(workspace, store):
+    '''walks the workspace and replaces its cached Inventory eg: after a cached dataset was dropped or renamed
+    '''
+    inventory = walk(workspace)
+    store.save_catalog(workspace, time(), inventory.to_json())
+
+    return inventory
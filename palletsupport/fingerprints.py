@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+fingerprints.py
+
+A module that decides which datasets have changed enough since they were last analyzed to need it again
+'''
+
+import arcpy
+from os.path import join
+from palletsupport.store import Fingerprint
+from time import time
+
+DAY = 24 * 60 * 60
+
+
+def count_rows(workspace, dataset):
+    '''returns the number of rows in the dataset or None for things that can't be counted like rasters
+    '''
+    try:
+        return int(arcpy.GetCount_management(join(workspace, dataset))[0])
+    except Exception:
+        return None
+
+
+def count_deltas(sql, dataset):
+    '''returns a tuple of the number of rows in the adds and deletes tables of a versioned dataset.
+    Datasets that are not versioned have no delta tables and return (0, 0)
+
+    sql: an arcpy.ArcSDESQLExecute for the workspace
+    dataset: the qualified dataset name eg: SGID10.BOUNDARIES.Counties
+    '''
+    parts = dataset.split('.')
+    if len(parts) < 2:
+        return 0, 0
+
+    owner, table = parts[-2], parts[-1]
+
+    try:
+        registration_id = sql.execute(
+            "SELECT registration_id FROM sde.SDE_table_registry WHERE owner = '{}' AND table_name = '{}'".format(owner, table))
+        if not registration_id:
+            return 0, 0
+
+        registration_id = int(registration_id)
+        adds = sql.execute('SELECT COUNT(*) FROM {}.a{}'.format(owner, registration_id))
+        deletes = sql.execute('SELECT COUNT(*) FROM {}.D{}'.format(owner, registration_id))
+
+        return int(adds), int(deletes)
+    except Exception:
+        #: the delta tables only exist for datasets that are registered as versioned
+        return 0, 0
+
+
+def take_fingerprints(workspace, datasets):
+    '''returns a dictionary of dataset name to the current Fingerprint of that dataset. analyzed is None
+    '''
+    try:
+        sql = arcpy.ArcSDESQLExecute(workspace)
+    except Exception:
+        sql = None
+
+    fingerprints = {}
+    for dataset in datasets:
+        if sql is None:
+            adds, deletes = 0, 0
+        else:
+            adds, deletes = count_deltas(sql, dataset)
+
+        fingerprints[dataset] = Fingerprint(count_rows(workspace, dataset), adds, deletes, None)
+
+    return fingerprints
+
+
+def has_drifted(previous, current, threshold, max_age_days, now=None):
+    '''returns true if the dataset needs to be analyzed
+
+    previous: the Fingerprint from when the dataset was last analyzed or None
+    current: the Fingerprint for the dataset now
+    threshold: the fraction of the rows that must change in the base or delta tables eg: 0.1
+    max_age_days: the number of days after which the dataset is analyzed whether it changed or not
+    '''
+    if previous is None or previous.analyzed is None or current.rows is None or previous.rows is None:
+        return True
+
+    if now is None:
+        now = time()
+
+    if now - previous.analyzed > max_age_days * DAY:
+        return True
+
+    allowed = threshold * max(previous.rows, 1)
+
+    if abs(current.rows - previous.rows) > allowed:
+        return True
+
+    return abs((current.adds + current.deletes) - (previous.adds + previous.deletes)) > allowed
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+maintenance.py
+
+A module that contains the shared compress and analyze engine for the database maintenance pallets.
+
+The pallets describe their database with an admin connection and a list of data owner connections.
+Each owner is analyzed in its own worker process with a cap on how many owners can be analyzed at
+the same time on any one database server.
+'''
+
+import arcpy
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from functools import partial
+from os.path import basename
+from os.path import dirname
+from os.path import join
+from os.path import splitext
+from palletsupport.catalog import get_inventory
+from palletsupport.catalog import refresh_inventory
+from palletsupport.fingerprints import has_drifted
+from palletsupport.fingerprints import take_fingerprints
+from palletsupport.metrics import Metrics
+from palletsupport.planner import format_plan
+from palletsupport.planner import make_plan
+from palletsupport.planner import total_seconds
+from palletsupport.schedule import NIGHTLY
+from palletsupport.schedule import Scheduler
+from palletsupport.store import MaintenanceStore
+from palletsupport.store import Timing
+from time import perf_counter
+from time import time
+
+Connection = namedtuple('Connection', ['path', 'user', 'database', 'server'])
+
+
+def parse_connection(path):
+    '''parses a connection file named like `user@database@host.sde` into its parts
+
+    the server is the first label of the host name eg: itdb104sp for itdb104sp.dts.utah.gov
+    '''
+    parts = splitext(basename(path))[0].split('@')
+
+    user = parts[0]
+    host = parts[-1]
+    server = host.split('.')[0].lower()
+
+    if len(parts) > 2:
+        database = parts[1]
+    else:
+        database = host.split('.')[0]
+
+    return Connection(path, user, database, server)
+
+
+def chunk(items, size):
+    '''yields lists of `size` items from the items
+    '''
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+def analyze(workspace, datasets):
+    '''analyzes the base, delta and archive tables of the datasets
+    '''
+    # Note: to use the 'SYSTEM' option the workspace user must be an administrator.
+    arcpy.AnalyzeDatasets_management(workspace, 'NO_SYSTEM', datasets, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
+
+
+def analyze_owner(workspace, owned_only=False, exclude_topology=False, store=None, threshold=0.1, max_age_days=30, catalog_ttl_hours=72,
+                  batch_size=25, batch_budget=120):
+    '''analyzes the datasets in the workspace. This runs in a worker process.
+
+    workspace: the connection file for the owner of the data
+    owned_only: skip datasets that are visible to but not owned by the connected user
+    exclude_topology: skip topology items
+    store: the path to the MaintenanceStore. When set only the datasets that have drifted since they were last analyzed are analyzed
+    threshold: the fraction of rows that need to change for a dataset to have drifted
+    max_age_days: the number of days after which a dataset is analyzed whether it drifted or not
+    catalog_ttl_hours: the number of hours the list of datasets is cached in the store
+    batch_size: the number of datasets sent to each AnalyzeDatasets call. Each finished batch is checkpointed in the store so a
+                failed run picks up where it stopped. The store keeps the seconds of the whole batch for each of its datasets.
+    batch_budget: the seconds a batch can take. The datasets of a batch that went over are analyzed one at a time the next time
+                  they are analyzed so the slow ones are timed on their own.
+
+    returns a tuple of the number of datasets analyzed, the number of datasets skipped, the seconds it took and
+    a list of (number of datasets, seconds) for each batch
+    '''
+    start = perf_counter()
+    maintenance_store = None
+    if store is not None:
+        maintenance_store = MaintenanceStore(store)
+
+    try:
+        inventory = get_inventory(workspace, maintenance_store, catalog_ttl_hours)
+
+        if owned_only:
+            inventory = inventory.owned_by(inventory.user)
+
+        datasets = inventory.datasets(include_topology=not exclude_topology)
+
+        if maintenance_store is None:
+            drifted = datasets
+        else:
+            previous = maintenance_store.get_fingerprints(workspace)
+            current = take_fingerprints(workspace, datasets)
+            now = time()
+            drifted = [dataset for dataset in datasets if has_drifted(previous.get(dataset), current[dataset], threshold, max_age_days, now)]
+
+        #: the datasets whose last batch went over budget are analyzed on their own
+        alone = set()
+        if maintenance_store is not None:
+            timings = maintenance_store.get_timings(workspace)
+            alone = set(dataset for dataset in drifted if dataset in timings and timings[dataset].seconds > batch_budget)
+
+        batched = [dataset for dataset in drifted if dataset not in alone]
+
+        batches = []
+        for batch in [[dataset] for dataset in drifted if dataset in alone] + list(chunk(batched, batch_size)):
+            batch_start = perf_counter()
+
+            try:
+                analyze(workspace, batch)
+            except arcpy.ExecuteError:
+                if maintenance_store is None:
+                    raise
+
+                #: a dataset in the cached inventory may have been dropped or renamed since it was cached
+                existing = set(refresh_inventory(workspace, maintenance_store).datasets(include_topology=not exclude_topology))
+                remaining = [dataset for dataset in batch if dataset in existing]
+
+                if len(remaining) == len(batch):
+                    raise
+
+                batch = remaining
+                if not batch:
+                    continue
+
+                batch_start = perf_counter()
+                analyze(workspace, batch)
+
+            seconds = perf_counter() - batch_start
+            batches.append((len(batch), seconds))
+
+            if maintenance_store is not None:
+                #: the fresh fingerprints are the checkpoint. a rerun sees these datasets as unchanged
+                finished = time()
+                maintenance_store.save_fingerprints(workspace, {dataset: current[dataset]._replace(analyzed=finished) for dataset in batch})
+                maintenance_store.save_timings(workspace, {dataset: Timing(seconds, len(batch)) for dataset in batch}, finished)
+    finally:
+        if maintenance_store is not None:
+            maintenance_store.close()
+
+    return len(drifted), len(datasets) - len(drifted), perf_counter() - start, batches
+
+
+def run_bounded(function, jobs, key, max_workers, max_per_key, executor_type=ProcessPoolExecutor):
+    '''calls `function(*job)` for each job on a pool of `max_workers` workers. At most `max_per_key`
+    jobs that share the same `key(job)` are running at any one time.
+
+    yields (job, future) tuples as the jobs finish
+    '''
+    if max_workers < 1 or max_per_key < 1:
+        #: no job could ever start
+        raise ValueError('max_workers and max_per_key must be at least 1, not {} and {}'.format(max_workers, max_per_key))
+
+    pending = list(jobs)
+    running = {}
+    active = {}
+
+    with executor_type(max_workers=max_workers) as executor:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= max_workers:
+                    break
+
+                job_key = key(job)
+                if active.get(job_key, 0) >= max_per_key:
+                    continue
+
+                pending.remove(job)
+                active[job_key] = active.get(job_key, 0) + 1
+                running[executor.submit(function, *job)] = job
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                job = running.pop(future)
+                active[key(job)] -= 1
+
+                yield job, future
+
+
+class Maintenance(object):
+    '''compresses and analyzes an enterprise geodatabase
+
+    admin: the connection file for the sde admin user
+    owners: a list of connection files, one for each user that owns data
+    analyze_system: analyze the system tables with the admin connection
+    owned_only: only analyze the datasets that are owned by the connected user
+    exclude_topology: skip topology items when analyzing
+    raise_compress_errors: fail the pallet if the compress fails
+    max_workers: the number of owners that can be analyzed at the same time
+    max_per_server: the number of owners on the same database server that can be analyzed at the same time
+    store: the path to the MaintenanceStore sqlite file. When set only the datasets that drifted are analyzed
+    threshold: the fraction of the rows in a dataset that need to change before it is analyzed again
+    max_age_days: the number of days after which a dataset is analyzed even if it has not drifted
+    catalog_ttl_hours: the number of hours that the list of each owner's datasets is cached in the store
+    batch_size: the number of datasets analyzed in each AnalyzeDatasets call
+    batch_budget: the seconds a batch can take before its datasets are analyzed one at a time
+    cadence: the schedule.Cadence for the database. The scheduler needs the store.
+    metrics_folder: where the step timings of each run are written. Defaults to a metrics folder next to the store.
+    '''
+
+    def __init__(self, admin, owners, analyze_system=True, owned_only=False, exclude_topology=False, raise_compress_errors=True,
+                 max_workers=4, max_per_server=2, store=None, threshold=0.1, max_age_days=30, catalog_ttl_hours=72, batch_size=25,
+                 batch_budget=120, cadence=NIGHTLY, metrics_folder=None):
+        self.admin = admin
+        self.owners = owners
+        self.analyze_system = analyze_system
+        self.owned_only = owned_only
+        self.exclude_topology = exclude_topology
+        self.raise_compress_errors = raise_compress_errors
+        self.max_workers = max_workers
+        self.max_per_server = max_per_server
+        self.store = store
+        self.threshold = threshold
+        self.max_age_days = max_age_days
+        self.catalog_ttl_hours = catalog_ttl_hours
+        self.batch_size = batch_size
+        self.batch_budget = batch_budget
+
+        if metrics_folder is None and store is not None:
+            metrics_folder = join(dirname(store), 'metrics')
+
+        self.metrics_folder = metrics_folder
+
+        connection = parse_connection(admin)
+        self.name = connection.database
+        self.scheduler = None
+
+        if store is not None:
+            self.scheduler = Scheduler(store)
+            self.scheduler.register(self.name, connection.server, cadence)
+
+    def is_ready_to_ship(self, pallet):
+        '''asks the scheduler if this database is one of the ones to maintain tonight
+        '''
+        if self.scheduler is None:
+            return True
+
+        ready, reason = self.scheduler.is_ready(self.name)
+        if not ready:
+            pallet.success = (True, reason)
+
+        return ready
+
+    def get_analyze_seconds(self):
+        '''returns a dictionary of owner connection file name to the seconds its last analyze took
+        '''
+        if self.store is None:
+            return {}
+
+        with MaintenanceStore(self.store) as store:
+            return store.get_analyze_seconds([basename(owner) for owner in self.owners])
+
+    def get_delta_rows(self):
+        '''returns the rows in the delta tables of the owners when their datasets were last fingerprinted or None
+        '''
+        if self.store is None:
+            return None
+
+        with MaintenanceStore(self.store) as store:
+            return store.get_delta_rows([basename(owner) for owner in self.owners])
+
+    def plan(self):
+        '''returns the planner.Plan for this database. The delta rows are reused from the fingerprints of the last run
+        instead of counting every delta table again.
+        '''
+        return make_plan(self.admin, sum(self.get_analyze_seconds().values()), self.get_delta_rows())
+
+    def run(self, log, dry_run=False):
+        '''compresses the database and analyzes the system tables and all of the owner's datasets
+
+        dry_run: log the plan without running anything
+        '''
+        plan = self.plan()
+
+        if dry_run:
+            log.info('maintenance plan:\n%s', format_plan([plan]))
+
+            return
+
+        metrics = Metrics(self.name, self.metrics_folder)
+
+        try:
+            if not plan.compress:
+                log.info('Compress skipped, the state tree is trivial: %s', plan.statistics)
+            else:
+                try:
+                    delta_rows = plan.statistics.delta_rows if plan.statistics else None
+
+                    with metrics.step('compress', rows=delta_rows):
+                        arcpy.Compress_management(self.admin)
+                    log.info('Compress Complete')
+                except Exception as ex:
+                    if self.raise_compress_errors:
+                        raise
+
+                    log.error('compress exception: %s', ex, exc_info=True)
+
+            if self.analyze_system:
+                with metrics.step('analyze system'):
+                    arcpy.AnalyzeDatasets_management(self.admin, 'SYSTEM')
+                log.info('Analyze System Tables Complete')
+
+            with metrics.step('analyze owners'):
+                self.analyze_owners(log, metrics)
+        finally:
+            metrics.write()
+
+        if self.scheduler is not None:
+            self.scheduler.finished(self.name, seconds=total_seconds(plan))
+
+    def analyze_owners(self, log, metrics=None):
+        '''analyzes the owner connections in parallel. All owners are attempted before any failure is raised.
+
+        metrics: the metrics.Metrics that each owner's analyze is recorded in
+        '''
+        #: start the owners that took the longest last time first so they don't make up the tail
+        seconds = self.get_analyze_seconds()
+        jobs = [(owner, ) for owner in sorted(self.owners, key=lambda owner: seconds.get(basename(owner), 0), reverse=True)]
+        analyze = partial(analyze_owner, owned_only=self.owned_only, exclude_topology=self.exclude_topology, store=self.store,
+                          threshold=self.threshold, max_age_days=self.max_age_days, catalog_ttl_hours=self.catalog_ttl_hours,
+                          batch_size=self.batch_size, batch_budget=self.batch_budget)
+        failures = []
+
+        def server(job):
+            return parse_connection(job[0]).server
+
+        for job, future in run_bounded(analyze, jobs, server, self.max_workers, self.max_per_server):
+            owner = basename(job[0])
+
+            try:
+                count, skipped, seconds, batches = future.result()
+            except Exception as ex:
+                log.error('analyze failed for %s: %s', owner, ex)
+                failures.append('{}: {}'.format(owner, ex))
+
+                continue
+
+            if metrics is not None:
+                metrics.record('analyze {}'.format(owner), seconds, rows=count)
+
+            for number, (size, batch_seconds) in enumerate(batches, start=1):
+                if size > 1 and batch_seconds > self.batch_budget:
+                    log.info('%s batch %i: %i datasets in %.1f seconds is over budget. They will be analyzed one at a time.', owner, number, size,
+                             batch_seconds)
+                else:
+                    log.debug('%s batch %i: %i datasets in %.1f seconds', owner, number, size, batch_seconds)
+
+            log.info('Analyze Complete for %s: %i datasets in %.1f seconds, %i unchanged datasets skipped', owner, count, seconds, skipped)
+
+        self.report_slowest(log)
+
+        if failures:
+            raise Exception('Analyze failed for {}'.format('; '.join(failures)))
+
+    def report_slowest(self, log, limit=10):
+        '''logs the datasets that took the longest to analyze the last time they were analyzed on their own
+        '''
+        if self.store is None:
+            return
+
+        with MaintenanceStore(self.store) as store:
+            slowest = store.get_slowest([basename(owner) for owner in self.owners], limit)
+
+        for connection, dataset, seconds in slowest:
+            log.info('slow analyze: %s %s %.1f seconds', connection, dataset, seconds)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+metrics.py
+
+A module that times the steps of a pallet and writes them somewhere they can be trended.
+
+Wrap each step in `with metrics.step('name') as step:` and set `step.rows` when the step knows how many rows
+it touched. `write` appends one JSON line per step to `<name>.jsonl` and replaces `<name>.prom`, a
+Prometheus textfile for the node exporter textfile collector, with the latest run.
+'''
+
+import json
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from os import makedirs
+from os import replace
+from os.path import join
+from time import perf_counter
+from time import process_time
+
+try:
+    import resource
+except ImportError:
+    #: windows
+    resource = None
+
+JSON_LINES = 'jsonl'
+PROMETHEUS = 'prom'
+
+#: the Prometheus metric name and help text for each measurement
+GAUGES = [
+    ('wall_seconds', 'warehouse_step_wall_seconds', 'The seconds the step took.'),
+    ('cpu_seconds', 'warehouse_step_cpu_seconds', 'The cpu seconds this process spent in the step.'),
+    ('peak_rss_bytes', 'warehouse_step_peak_rss_bytes', 'The peak resident memory of the process when the step finished.'),
+    ('rows', 'warehouse_step_rows', 'The number of rows the step touched.'),
+]
+
+
+def get_peak_rss():
+    '''returns the peak resident memory of this process in bytes or None if it can't be found
+    '''
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        #: linux reports kilobytes and mac reports bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+
+        return counters.PeakWorkingSetSize
+    except Exception:
+        return None
+
+
+class Step(object):
+    '''the measurements for one step. Set `rows` inside of the with block when the count is known.
+    '''
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.started = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_bytes = None
+
+    def to_dict(self):
+        return {
+            'step': self.name,
+            'started': self.started,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'rows': self.rows
+        }
+
+
+class Metrics(object):
+    '''collects the steps of one pallet run
+
+    name: the name of the pallet or database. It is the file name of the output.
+    folder: where the output is written. Nothing is written when this is None.
+    formats: a list of JSON_LINES and PROMETHEUS
+    '''
+
+    def __init__(self, name, folder=None, formats=(JSON_LINES, PROMETHEUS)):
+        self.name = name
+        self.folder = folder
+        self.formats = formats
+        self.run = datetime.now().isoformat()
+        self.steps = []
+        self.written = 0
+
+    @contextmanager
+    def step(self, name, rows=None):
+        '''times the body of the with block. The step is recorded even if the body raises.
+        '''
+        step = Step(name, rows)
+        step.started = datetime.now().isoformat()
+        wall = perf_counter()
+        cpu = process_time()
+
+        try:
+            yield step
+        finally:
+            step.wall_seconds = perf_counter() - wall
+            step.cpu_seconds = process_time() - cpu
+            step.peak_rss_bytes = get_peak_rss()
+
+            self.steps.append(step)
+
+    def record(self, name, wall_seconds, rows=None):
+        '''records a step that was timed somewhere else eg: in a worker process
+        '''
+        step = Step(name, rows)
+        step.started = datetime.now().isoformat()
+        step.wall_seconds = wall_seconds
+
+        self.steps.append(step)
+
+        return step
+
+    def get_seconds(self, name):
+        '''returns the wall seconds of the last step called `name`
+        '''
+        for step in reversed(self.steps):
+            if step.name == name:
+                return step.wall_seconds
+
+        return None
+
+    def write(self):
+        '''writes the steps of this run to the folder. It can be called more than once in a run.
+        '''
+        if self.folder is None or not self.steps:
+            return
+
+        makedirs(self.folder, exist_ok=True)
+
+        if JSON_LINES in self.formats:
+            with open(join(self.folder, '{}.jsonl'.format(self.name)), 'a') as output:
+                for step in self.steps[self.written:]:
+                    line = step.to_dict()
+                    line.update({'pallet': self.name, 'run': self.run})
+
+                    output.write(json.dumps(line, sort_keys=True) + '\n')
+
+        if PROMETHEUS in self.formats:
+            path = join(self.folder, '{}.prom'.format(self.name))
+
+            #: the textfile collector can read the file at any time so it is replaced in one move
+            with open(path + '.tmp', 'w') as output:
+                output.write(format_prometheus(self.name, self.steps))
+
+            replace(path + '.tmp', path)
+
+        self.written = len(self.steps)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(name, steps):
+    '''returns the steps as Prometheus text exposition. When a step name repeats the last one wins.
+    '''
+    latest = {}
+    for step in steps:
+        latest[step.name] = step
+
+    lines = []
+    for attribute, metric, description in GAUGES:
+        lines.append('# HELP {} {}'.format(metric, description))
+        lines.append('# TYPE {} gauge'.format(metric))
+
+        for step in latest.values():
+            value = getattr(step, attribute)
+            if value is None:
+                continue
+
+            lines.append('{}{{pallet="{}",step="{}"}} {}'.format(metric, escape(name), escape(step.name), value))
+
+    return '\n'.join(lines) + '\n'
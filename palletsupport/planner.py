@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+planner.py
+
+A module that estimates how long the compress and analyze of a database will take from cheap statistics
+gathered through the admin connection.
+
+Usage:
+    python -m palletsupport.planner <garage>    Prints the plan for every maintenance pallet without running it
+'''
+
+import arcpy
+from collections import namedtuple
+from os.path import basename
+
+#: rough seconds per unit of work. These were fit by eye to the forklift logs and only need to be good
+#: enough to put the databases in order
+SECONDS_PER_STATE = 0.05
+SECONDS_PER_DELTA_ROW = 0.0005
+COMPRESS_OVERHEAD = 10.0
+
+#: a state tree this small has nothing to compress
+TRIVIAL_STATES = 1
+
+#: states: the number of rows in the state tree
+#: depth: the longest lineage in the state tree
+#: versions: the number of versions including DEFAULT
+#: delta_rows: the total rows in all of the versioned adds and deletes tables
+Statistics = namedtuple('Statistics', ['states', 'depth', 'versions', 'delta_rows'])
+
+#: database: the name of the admin connection
+#: statistics: the Statistics or None if they could not be gathered
+#: compress: whether the compress should run
+#: compress_seconds: the estimated seconds for the compress
+#: analyze_seconds: the estimated seconds for the analyze of every owner
+Plan = namedtuple('Plan', ['database', 'statistics', 'compress', 'compress_seconds', 'analyze_seconds'])
+
+
+def scalar(result):
+    '''ArcSDESQLExecute returns a value for one row with one column and nested lists otherwise
+    '''
+    while isinstance(result, list):
+        if len(result) == 0:
+            return 0
+
+        result = result[0]
+
+    return int(result or 0)
+
+
+def gather_statistics(admin, delta_rows=None):
+    '''returns Statistics for the geodatabase. The admin connection must be able to read the sde tables
+
+    delta_rows: the rows in the delta tables if they are already known eg: from the fingerprints in the store. The adds and
+                deletes tables of every versioned table are counted when this is None.
+    '''
+    sql = arcpy.ArcSDESQLExecute(admin)
+
+    states = scalar(sql.execute('SELECT COUNT(*) FROM sde.SDE_states'))
+    versions = scalar(sql.execute('SELECT COUNT(*) FROM sde.SDE_versions'))
+    depth = scalar(
+        sql.execute('SELECT MAX(depth) FROM (SELECT COUNT(*) AS depth FROM sde.SDE_state_lineages GROUP BY lineage_name) AS lineages'))
+
+    if delta_rows is not None:
+        return Statistics(states, depth, versions, delta_rows)
+
+    registrations = sql.execute('SELECT registration_id, owner FROM sde.SDE_table_registry')
+    if not isinstance(registrations, list):
+        registrations = []
+
+    delta_rows = 0
+    for registration_id, owner in registrations:
+        for prefix in ['a', 'D']:
+            try:
+                delta_rows += scalar(sql.execute('SELECT COUNT(*) FROM {}.{}{}'.format(owner, prefix, int(registration_id))))
+            except Exception:
+                #: only versioned tables have delta tables
+                pass
+
+    return Statistics(states, depth, versions, delta_rows)
+
+
+def estimate_compress(statistics):
+    return COMPRESS_OVERHEAD + statistics.states * SECONDS_PER_STATE + statistics.delta_rows * SECONDS_PER_DELTA_ROW
+
+
+def is_trivial(statistics):
+    '''returns true if the state tree is already as compressed as it can get
+    '''
+    return statistics.states <= TRIVIAL_STATES and statistics.delta_rows == 0
+
+
+def make_plan(admin, analyze_seconds=0, delta_rows=None):
+    '''returns the Plan for the database behind the admin connection
+
+    analyze_seconds: the estimate for the analyze, usually from the timings of the last run
+    delta_rows: the rows in the delta tables, usually from the fingerprints of the last run. None counts them.
+    '''
+    try:
+        statistics = gather_statistics(admin, delta_rows)
+    except Exception:
+        #: without statistics always compress
+        return Plan(basename(admin), None, True, COMPRESS_OVERHEAD, analyze_seconds)
+
+    return Plan(basename(admin), statistics, not is_trivial(statistics), estimate_compress(statistics), analyze_seconds)
+
+
+def total_seconds(plan):
+    return plan.analyze_seconds + (plan.compress_seconds if plan.compress else 0)
+
+
+def order(plans):
+    '''returns the plans with the most expensive first so the long running databases don't spill past the maintenance window
+    '''
+    return sorted(plans, key=total_seconds, reverse=True)
+
+
+def format_plan(plans):
+    '''returns the ordered plans as a printable table
+    '''
+    lines = ['{:<55} {:>8} {:>6} {:>9} {:>12} {:>10} {:>10}'.format('database', 'states', 'depth', 'versions', 'delta rows', 'compress',
+                                                                       'analyze')]
+    for plan in order(plans):
+        statistics = plan.statistics or Statistics('?', '?', '?', '?')
+        compress = '{:.0f}s'.format(plan.compress_seconds) if plan.compress else 'skip'
+
+        lines.append('{:<55} {:>8} {:>6} {:>9} {:>12} {:>10} {:>10}'.format(plan.database, statistics.states, statistics.depth,
+                                                                            statistics.versions, statistics.delta_rows, compress,
+                                                                            '{:.0f}s'.format(plan.analyze_seconds)))
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import sys
+    from glob import glob
+    from importlib import import_module
+    from os.path import dirname
+    from os.path import join
+    from os.path import splitext
+
+    from forklift.models import Pallet
+
+    garage = sys.argv[1]
+    warehouse = dirname(dirname(__file__)) or '.'
+    plans = []
+
+    for pallet_file in sorted(glob(join(warehouse, 'database_maintenance', '*', '*[Pp]allet*.py'))):
+        sys.path.append(dirname(pallet_file))
+        module = import_module(splitext(basename(pallet_file))[0])
+
+        for name in dir(module):
+            pallet_type = getattr(module, name)
+            if not isinstance(pallet_type, type) or not issubclass(pallet_type, Pallet) or pallet_type is Pallet:
+                continue
+
+            pallet = pallet_type()
+            pallet.garage = garage
+            pallet.build('Production')
+
+            maintenance = getattr(pallet, 'maintenance', None)
+            if maintenance is not None:
+                plans.append(maintenance.plan())
+
+    print(format_plan(plans))
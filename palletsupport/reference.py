@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+reference.py
+
+A module that keeps a local mirror of reference data that the pallets read from network shares.
+
+A file geodatabase is mirrored folder and all. A shapefile is mirrored with its sidecar files. A remote file is
+only copied again when its size or modified time is different from the mirror, or its sampled checksum when
+`checksum` is on. If the share can't be reached, the last mirror is used as long as none of it was replaced in
+that attempt.
+'''
+
+import shutil
+from collections import namedtuple
+from hashlib import blake2b
+from os import listdir
+from os import makedirs
+from os import remove
+from os import replace
+from os import stat
+from os import walk
+from os.path import basename
+from os.path import dirname
+from os.path import exists
+from os.path import isdir
+from os.path import join
+from os.path import normcase
+from os.path import relpath
+from os.path import splitext
+
+#: file geodatabase lock files come and go with readers and are never copied
+LOCK = '.lock'
+
+#: the seconds that modified times can be apart and still match. Some file systems only keep two second times.
+MTIME_TOLERANCE = 2
+
+#: the bytes read from the start and end of a file for the sampled checksum
+SAMPLE_SIZE = 64 * 1024
+
+#: hits: the number of files that were already current
+#: misses: the number of files that were copied
+#: bytes: the number of bytes that were copied
+#: stale: the number of times the last mirror was used because the remote could not be read
+Stats = namedtuple('Stats', ['hits', 'misses', 'bytes', 'stale'])
+
+
+def get_digest(path, sample_size=SAMPLE_SIZE):
+    '''returns a blake2b digest of the size and the first and last `sample_size` bytes of the file
+    '''
+    size = stat(path).st_size
+    digest = blake2b(str(size).encode('utf-8'), digest_size=16)
+
+    with open(path, 'rb') as data:
+        digest.update(data.read(sample_size))
+
+        if size > sample_size:
+            data.seek(max(sample_size, size - sample_size))
+            digest.update(data.read(sample_size))
+
+    return digest.hexdigest()
+
+
+def split_workspace(path):
+    '''returns a tuple of the file or folder that is mirrored and the path inside of it eg: a feature class in a .gdb
+    '''
+    parts = []
+    source = path
+
+    while source and basename(source):
+        if splitext(source)[1].lower() == '.gdb':
+            return source, join(*reversed(parts)) if parts else ''
+
+        parts.append(basename(source))
+        source = dirname(source)
+
+    return path, ''
+
+
+def _raise(error):
+    raise error
+
+
+class ReferenceCache(object):
+    '''a local mirror of remote reference data
+
+    folder: the local folder that holds the mirrors
+    checksum: compare a sampled checksum of files whose size and modified time match
+    '''
+
+    def __init__(self, folder, checksum=False):
+        self.folder = folder
+        self.checksum = checksum
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self.stale = 0
+        self.errors = []
+
+    def get_stats(self):
+        return Stats(self.hits, self.misses, self.bytes, self.stale)
+
+    def get_local_path(self, source):
+        '''returns the mirror path of a remote file or folder. The folder it's in is named by a digest of the remote
+        folder so data with the same name from two shares doesn't collide.
+        '''
+        remote_folder = blake2b(normcase(dirname(source)).encode('utf-8'), digest_size=6).hexdigest()
+
+        return join(self.folder, remote_folder, basename(source))
+
+    def locate(self, remote):
+        '''returns the local path to use in place of `remote` without reading the remote or the mirror
+        '''
+        source, inside = split_workspace(remote)
+        local = self.get_local_path(source)
+
+        if inside:
+            return join(local, inside)
+
+        return local
+
+    def get(self, remote):
+        '''brings the mirror of `remote` up to date
+
+        returns the local path to use in place of `remote`
+        '''
+        source, inside = split_workspace(remote)
+        local = self.get_local_path(source)
+        misses = self.misses
+
+        try:
+            if isdir(source):
+                self.mirror_folder(source, local)
+            else:
+                self.mirror_file(source, local)
+        except OSError as error:
+            #: a partly replaced mirror is a mix of old and new data
+            if self.misses != misses or not exists(local):
+                raise
+
+            self.stale += 1
+            self.errors.append('{}: {}'.format(remote, error))
+
+        return self.locate(remote)
+
+    def mirror_folder(self, source, local):
+        names = set()
+
+        for folder, folders, files in walk(source, onerror=_raise):
+            for name in files:
+                if LOCK in name:
+                    continue
+
+                name = relpath(join(folder, name), source)
+                names.add(name)
+
+                self.update(join(source, name), join(local, name))
+
+        self.remove_others(local, names)
+
+    def mirror_file(self, source, local):
+        #: a shapefile is the .shp and every file that starts with its name eg: .dbf .shx .prj .shp.xml
+        stem = splitext(basename(source))[0]
+        names = set(name for name in listdir(dirname(source)) if name == stem or name.startswith(stem + '.'))
+
+        if basename(source) not in names:
+            raise FileNotFoundError('{} does not exist'.format(source))
+
+        for name in names:
+            self.update(join(dirname(source), name), join(dirname(local), name))
+
+        self.remove_others(dirname(local), names, stem)
+
+    def update(self, remote, local):
+        '''copies the remote file over the local file if they are different
+        '''
+        if self.is_current(remote, local):
+            self.hits += 1
+
+            return
+
+        makedirs(dirname(local), exist_ok=True)
+        try:
+            shutil.copy2(remote, local + '.partial')
+            replace(local + '.partial', local)
+        except OSError:
+            #: the mirror keeps the last whole copy
+            if exists(local + '.partial'):
+                remove(local + '.partial')
+
+            raise
+
+        self.misses += 1
+        self.bytes += stat(local).st_size
+
+    def is_current(self, remote, local):
+        remote_status = stat(remote)
+
+        try:
+            local_status = stat(local)
+        except OSError:
+            return False
+
+        if remote_status.st_size != local_status.st_size or abs(remote_status.st_mtime - local_status.st_mtime) > MTIME_TOLERANCE:
+            return False
+
+        if self.checksum:
+            return get_digest(remote) == get_digest(local)
+
+        return True
+
+    def remove_others(self, local, names, stem=None):
+        '''removes the mirrored files that are no longer on the remote. `stem` limits it to the files of one shapefile. Lock
+        files belong to the readers of the mirror and are left alone.
+        '''
+        if not isdir(local):
+            return
+
+        for folder, folders, files in walk(local):
+            for name in files:
+                if LOCK in name:
+                    continue
+
+                name = relpath(join(folder, name), local)
+
+                if stem is not None and not (name == stem or name.startswith(stem + '.')):
+                    continue
+
+                if name not in names:
+                    remove(join(local, name))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+schedule.py
+
+A module that decides which database jobs run tonight so the heavy ones are spread over the week.
+
+Each job registers its server and cadence when its pallet is built. The first job to ask whether it is
+ready picks tonight's jobs for every server and saves the choice in the store so every pallet in the
+run gets the same answer. Jobs that have waited the longest past their cadence are picked first and no
+server gets more than its budget of jobs on a night. When jobs are equally overdue the ones that were planned
+to take the longest get a server's slots first.
+
+A night is the calendar date of the run unless a pallet asks for a `rollover` hour. Jobs can start at any
+hour unless a pallet asks for a `window`.
+'''
+
+from collections import namedtuple
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from palletsupport.store import MaintenanceStore
+from time import time
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+#: days: the names of the days of the week that the job may run on
+#: every: the minimum number of days between runs
+Cadence = namedtuple('Cadence', ['days', 'every'])
+
+NIGHTLY = Cadence(WEEKDAYS, 1)
+
+#: the hours of the day that a pallet can opt in to only starting jobs in. It is allowed to wrap past midnight.
+MAINTENANCE_WINDOW = (18, 7)
+
+#: the number of jobs that may run on a server in one night
+SERVER_BUDGETS = {'itdb104sp': 4}
+DEFAULT_BUDGET = 3
+
+#: jobs that have not been registered in this many days are assumed to have been removed
+STALE_DAYS = 7
+
+
+def weekly(day):
+    '''returns a Cadence for a job that runs once a week on `day` eg: Friday
+    '''
+    return Cadence([day], 7)
+
+
+def in_window(now, window):
+    start, end = window
+
+    if start <= end:
+        return start <= now.hour < end
+
+    return now.hour >= start or now.hour < end
+
+
+def get_night(now, rollover=0):
+    '''returns the date of the night containing `now`
+
+    rollover: runs before this hour count toward the day before eg: 7 makes a Friday 02:00 run part of Thursday
+    '''
+    return (now - timedelta(hours=rollover)).date()
+
+
+def days_overdue(last_night, night, cadence):
+    '''returns how many days past its cadence the job is. Negative numbers are not due yet.
+    '''
+    if last_night is None:
+        return float('inf')
+
+    return (night - last_night).days - cadence.every
+
+
+def choose(jobs, last_nights, night, budgets, default_budget, costs=None):
+    '''returns the set of job names that should run on `night`
+
+    jobs: a dictionary of job name to (server, Cadence)
+    last_nights: a dictionary of job name to the date of the night it last finished
+    costs: a dictionary of job name to the seconds it was planned to take
+    '''
+    costs = costs or {}
+    weekday = WEEKDAYS[night.weekday()]
+    due = []
+
+    for name, (server, cadence) in jobs.items():
+        if weekday not in cadence.days:
+            continue
+
+        overdue = days_overdue(last_nights.get(name), night, cadence)
+        if overdue < 0:
+            continue
+
+        due.append((overdue, name, server))
+
+    #: most overdue first then the most expensive, the name keeps the order stable
+    due.sort(key=lambda job: (-job[0], -costs.get(job[1], 0), job[1]))
+
+    chosen = set()
+    used = {}
+    for overdue, name, server in due:
+        if used.get(server, 0) >= budgets.get(server, default_budget):
+            continue
+
+        used[server] = used.get(server, 0) + 1
+        chosen.add(name)
+
+    return chosen
+
+
+class Scheduler(object):
+    '''picks the jobs that run each night
+
+    store: the path to the MaintenanceStore sqlite file shared by all of the pallets
+    window: the (start, end) hours that jobs may start in eg: MAINTENANCE_WINDOW. None lets them start at any hour.
+    rollover: the hour before which a run counts toward the day before. 0 uses the calendar date of the run.
+    budgets: a dictionary of server name to the number of jobs it can take in a night
+    default_budget: the budget for servers that are not in `budgets`
+    '''
+
+    def __init__(self, store, window=None, rollover=0, budgets=SERVER_BUDGETS, default_budget=DEFAULT_BUDGET):
+        self.store = store
+        self.window = window
+        self.rollover = rollover
+        self.budgets = budgets
+        self.default_budget = default_budget
+
+    def register(self, name, server, cadence):
+        '''records the server and cadence of a job. Call this from the pallet's build
+        '''
+        with MaintenanceStore(self.store) as store:
+            store.save_job(name, server, cadence.days, cadence.every, time())
+
+    def tonight(self, now=None):
+        '''returns the set of job names that run tonight
+        '''
+        if now is None:
+            now = datetime.now()
+
+        night = get_night(now, self.rollover)
+
+        with MaintenanceStore(self.store) as store:
+            chosen = store.get_night(night.isoformat())
+
+            if chosen is None:
+                jobs = {name: (server, Cadence(days, every))
+                        for name, server, days, every in store.get_jobs(time() - STALE_DAYS * 24 * 60 * 60)}
+                last_nights = {name: date(*map(int, last_night.split('-'))) for name, last_night in store.get_last_nights().items()}
+
+                chosen = choose(jobs, last_nights, night, self.budgets, self.default_budget, store.get_job_seconds())
+                store.save_night(night.isoformat(), chosen)
+
+        return chosen
+
+    def is_ready(self, name, now=None):
+        '''returns a tuple of whether the job should run now and the reason if it shouldn't
+        '''
+        if now is None:
+            now = datetime.now()
+
+        if self.window is not None and not in_window(now, self.window):
+            return False, 'This pallet only runs between {}:00 and {}:00.'.format(*self.window)
+
+        if name not in self.tonight(now):
+            return False, '{} is not scheduled to run tonight.'.format(name)
+
+        return True, None
+
+    def finished(self, name, now=None, seconds=None):
+        '''records that the job finished tonight
+
+        seconds: the seconds the job was planned to take
+        '''
+        if now is None:
+            now = datetime.now()
+
+        with MaintenanceStore(self.store) as store:
+            store.save_last_night(name, get_night(now, self.rollover).isoformat(), seconds)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+store.py
+
+A module that contains the sqlite database that the maintenance pallets use to remember things between runs
+'''
+
+import sqlite3
+from collections import namedtuple
+from os.path import basename
+
+#: rows: the number of rows in the base table
+#: adds: the number of rows in the versioned adds (A) table
+#: deletes: the number of rows in the versioned deletes (D) table
+#: analyzed: the epoch seconds that the dataset was last analyzed
+Fingerprint = namedtuple('Fingerprint', ['rows', 'adds', 'deletes', 'analyzed'])
+
+#: seconds: the seconds the AnalyzeDatasets call that included the dataset took
+#: batch: the number of datasets in that call. Only a batch of 1 is the time of the dataset on its own.
+Timing = namedtuple('Timing', ['seconds', 'batch'])
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS fingerprints (
+    connection TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    rows INTEGER,
+    adds INTEGER,
+    deletes INTEGER,
+    analyzed REAL,
+    PRIMARY KEY (connection, dataset)
+);
+CREATE TABLE IF NOT EXISTS catalogs (
+    connection TEXT PRIMARY KEY,
+    cached REAL NOT NULL,
+    inventory TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    connection TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    analyzed REAL NOT NULL,
+    batch INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (connection, dataset)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    server TEXT NOT NULL,
+    days TEXT NOT NULL,
+    every INTEGER NOT NULL,
+    registered REAL NOT NULL,
+    last_night TEXT,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS nights (
+    night TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (night, name)
+);
+'''
+
+
+class MaintenanceStore(object):
+    '''a small sqlite database in the forklift working folder. It is safe to open from many worker
+    processes at once since sqlite serializes the writes.
+
+    connections are keyed by their file name so moving the garage does not lose the history
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.executescript(SCHEMA)
+
+        #: stores created before these columns were added
+        self.add_column('timings', 'batch', 'INTEGER NOT NULL DEFAULT 1')
+        self.add_column('jobs', 'seconds', 'REAL')
+
+    def add_column(self, table, column, definition):
+        '''adds a column to a table that was created by an older SCHEMA
+        '''
+        if column in [row[1] for row in self.db.execute('PRAGMA table_info({})'.format(table))]:
+            return
+
+        with self.db:
+            self.db.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(table, column, definition))
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_fingerprints(self, connection):
+        '''returns a dictionary of dataset name to Fingerprint for the connection
+        '''
+        rows = self.db.execute('SELECT dataset, rows, adds, deletes, analyzed FROM fingerprints WHERE connection = ?',
+                               (basename(connection), ))
+
+        return {row[0]: Fingerprint(*row[1:]) for row in rows}
+
+    def save_fingerprints(self, connection, fingerprints):
+        '''saves a dictionary of dataset name to Fingerprint for the connection
+        '''
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?)',
+                                [(basename(connection), dataset) + tuple(fingerprint) for dataset, fingerprint in fingerprints.items()])
+
+    def get_delta_rows(self, connections):
+        '''returns the total rows in the versioned adds and deletes tables of the connections the last time their datasets
+        were fingerprinted or None if they never were
+        '''
+        placeholders = ', '.join('?' * len(connections))
+
+        return self.db.execute('SELECT SUM(adds + deletes) FROM fingerprints WHERE connection IN ({})'.format(placeholders),
+                               list(connections)).fetchone()[0]
+
+    def get_catalog(self, connection):
+        '''returns a tuple of the epoch seconds the catalog was cached and the inventory json or None
+        '''
+        return self.db.execute('SELECT cached, inventory FROM catalogs WHERE connection = ?', (basename(connection), )).fetchone()
+
+    def save_catalog(self, connection, cached, inventory):
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO catalogs VALUES (?, ?, ?)', (basename(connection), cached, inventory))
+
+    def get_timings(self, connection):
+        '''returns a dictionary of dataset name to the Timing of its last analyze for the connection
+        '''
+        rows = self.db.execute('SELECT dataset, seconds, batch FROM timings WHERE connection = ?', (basename(connection), ))
+
+        return {row[0]: Timing(*row[1:]) for row in rows}
+
+    def save_timings(self, connection, timings, analyzed):
+        '''saves a dictionary of dataset name to the Timing of its analyze
+        '''
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO timings VALUES (?, ?, ?, ?, ?)',
+                                [(basename(connection), dataset, timing.seconds, analyzed, timing.batch) for dataset, timing in timings.items()])
+
+    def get_slowest(self, connections, limit):
+        '''returns a list of (connection, dataset, seconds) for the slowest datasets to analyze in the connections. Only the
+        datasets that were analyzed on their own are included since a batch can't say which of its datasets was slow.
+        '''
+        placeholders = ', '.join('?' * len(connections))
+
+        return self.db.execute(
+            'SELECT connection, dataset, seconds FROM timings WHERE connection IN ({}) AND batch = 1 ORDER BY seconds DESC LIMIT ?'.format(
+                placeholders), list(connections) + [limit]).fetchall()
+
+    def get_analyze_seconds(self, connections):
+        '''returns a dictionary of connection file name to the total seconds it took to analyze its datasets
+        '''
+        placeholders = ', '.join('?' * len(connections))
+
+        #: each dataset in a batch holds the seconds of the whole batch
+        return dict(self.db.execute(
+            'SELECT connection, SUM(seconds / batch) FROM timings WHERE connection IN ({}) GROUP BY connection'.format(placeholders),
+            list(connections)).fetchall())
+
+    def save_job(self, name, server, days, every, registered):
+        with self.db:
+            self.db.execute('INSERT OR IGNORE INTO jobs (name, server, days, every, registered) VALUES (?, ?, ?, ?, ?)',
+                            (name, server, ','.join(days), every, registered))
+            self.db.execute('UPDATE jobs SET server = ?, days = ?, every = ?, registered = ? WHERE name = ?',
+                            (server, ','.join(days), every, registered, name))
+
+    def get_jobs(self, registered_since):
+        '''returns a list of (name, server, days, every) for the jobs that were registered after `registered_since`
+        '''
+        rows = self.db.execute('SELECT name, server, days, every FROM jobs WHERE registered >= ?', (registered_since, ))
+
+        return [(name, server, days.split(','), every) for name, server, days, every in rows]
+
+    def get_last_nights(self):
+        '''returns a dictionary of job name to the iso date of the night it last finished
+        '''
+        return dict(self.db.execute('SELECT name, last_night FROM jobs WHERE last_night IS NOT NULL').fetchall())
+
+    def save_last_night(self, name, night, seconds=None):
+        with self.db:
+            self.db.execute('UPDATE jobs SET last_night = ?, seconds = COALESCE(?, seconds) WHERE name = ?', (night, seconds, name))
+
+    def get_job_seconds(self):
+        '''returns a dictionary of job name to the seconds it was estimated to take the last time it ran
+        '''
+        return dict(self.db.execute('SELECT name, seconds FROM jobs WHERE seconds IS NOT NULL').fetchall())
+
+    def get_night(self, night):
+        '''returns the set of job names chosen for the iso date `night` or None if they haven't been chosen yet
+        '''
+        rows = self.db.execute('SELECT name FROM nights WHERE night = ?', (night, )).fetchall()
+        if len(rows) == 0:
+            return None
+
+        return set(name for name, in rows if name is not None)
+
+    def save_night(self, night, names):
+        '''saves the jobs chosen for `night`. A NULL name marks a night where nothing was chosen
+        '''
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO nights VALUES (?, ?)', [(night, name) for name in list(names) or [None]])
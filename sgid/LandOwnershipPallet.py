@@ -4,17 +4,30 @@ Truncate and append sitla land ownership into SGID10
 '''
 
 import arcpy
+import sys
 from forklift.models import Pallet
-from time import strftime
+from os.path import abspath
+from os.path import dirname
 from os.path import join
 
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from palletsupport.schedule import Scheduler  # noqa: E402
+from palletsupport.schedule import weekly  # noqa: E402
+
+JOB = 'LandOwnership'
+
 
 class LandownershipPallet(Pallet):
+    def build(self, configuration=None):
+        #: this shares the sgid server with the SGID10 maintenance so it goes through the same scheduler
+        self.scheduler = Scheduler(join(self.staging_rack, 'maintenance.sqlite'))
+        self.scheduler.register(JOB, 'sgid', weekly('Tuesday'))
+
     def is_ready_to_ship(self):
-        run_day = 'Tuesday'
-        ready = strftime('%A') == run_day
+        ready, reason = self.scheduler.is_ready(JOB)
         if not ready:
-            self.success = (True, 'This pallet only runs on {}s.'.format(run_day))
+            self.success = (True, reason)
 
         return ready
 
@@ -27,6 +40,8 @@ class LandownershipPallet(Pallet):
         arcpy.TruncateTable_management(agrcLand10)
         arcpy.Append_management(sitlaLand, agrcLand10, 'TEST')
 
+        self.scheduler.finished(JOB)
+
 
 if __name__ == '__main__':
     import logging
@@ -38,4 +53,5 @@ if __name__ == '__main__':
         level=logging.INFO
     )
     pallet.log = logging
+    pallet.build('Dev')
     pallet.ship()
@@ -4,33 +4,45 @@ OGMPallet.py
 Update SGID data from the DOGM database.
 '''
 
-from os.path import basename, join
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os.path import abspath, basename, dirname, join
 
 import arcpy
 import sgid_secrets as secrets
 from forklift.models import Pallet
 
-#: field names
-CoordsSurf_E = 'CoordsSurf_E'
-CoordsSurf_N = 'CoordsSurf_N'
-CoordsBH_E = 'CoordsBH_E'
-CoordsBH_N = 'CoordsBH_N'
-API = 'API'
-ConstructNumber = 'ConstructNumber'
-UTMZone = 'UTMZone'
-Jurisdiction = 'Jurisdiction'
+sys.path.append(dirname(dirname(abspath(__file__))))
 
-UTM12 = arcpy.SpatialReference(26912)
-UTM11 = arcpy.SpatialReference(26911)
-
-jurisdiction_layer = 'jurisdiction_layer'
+from ogmsupport.extract import API  # noqa: E402
+from ogmsupport.extract import UTM12  # noqa: E402
+from ogmsupport.extract import ConstructNumber  # noqa: E402
+from ogmsupport.extract import CoordsBH_E  # noqa: E402
+from ogmsupport.extract import CoordsBH_N  # noqa: E402
+from ogmsupport.extract import CoordsSurf_E  # noqa: E402
+from ogmsupport.extract import CoordsSurf_N  # noqa: E402
+from ogmsupport.extract import extract_points  # noqa: E402
+from ogmsupport.jurisdiction import load_polygons  # noqa: E402
+from ogmsupport.paths import build_paths  # noqa: E402
+from ogmsupport.paths import get_pairs  # noqa: E402
+from ogmsupport.upsert import sync  # noqa: E402
+from palletsupport.metrics import Metrics  # noqa: E402
+from palletsupport.reference import ReferenceCache  # noqa: E402
 
 
 class OGMPallet(Pallet):
     def build(self, configuration):
         self.configuration = configuration
+        self.metrics = Metrics('OGMPallet', join(self.staging_rack, 'metrics'))
 
     def prepare_packaging(self):
+        try:
+            self.extract()
+        finally:
+            self.metrics.write()
+
+    def extract(self):
+        metrics = self.metrics
         sgid = join(self.garage, 'SGID10_Energy.sde')
         self.sgid = sgid
         dogm = join(self.garage, 'UTRBDMSNET.sde')
@@ -47,94 +59,78 @@ class OGMPallet(Pallet):
             #: must be in UTM
             indian_country = r'C:\MapData\deqreferencedata.gdb\Total_IC_and_ReservationTribalLand'
         else:
-            indian_country = (r'\\' + secrets.DEQSERVER +
-                              '\gis\AQGIS\GISSHARED\GISData\Total IC and Reservation_TribalLand\Total_IC_and_ReservationTribalLand.shp')
+            remote_indian_country = (r'\\' + secrets.DEQSERVER +
+                                     '\gis\AQGIS\GISSHARED\GISData\Total IC and Reservation_TribalLand\Total_IC_and_ReservationTribalLand.shp')
+
+            #: the share is only read when the shapefile changed
+            cache = ReferenceCache(join(self.staging_rack, 'reference'))
+            with metrics.step('cache indian country') as step:
+                indian_country = cache.get(remote_indian_country)
+                step.rows = cache.bytes
+
+            self.log.info('reference cache: %i hits, %i misses, %i bytes copied, %i stale', *cache.get_stats())
+            for error in cache.errors:
+                self.log.warning('using the last copy of %s', error)
 
         self.log.info('ensuring that temp data is created')
-        for create_fc in [surface_scratch, downhole_scratch, paths_scratch]:
-            if not arcpy.Exists(create_fc):
-                self.log.info('creating: %s', create_fc)
-                name = basename(create_fc)
-                template = join(sgid, 'SGID10.ENERGY.{}'.format(name))
-                arcpy.management.CreateFeatureclass(arcpy.env.scratchGDB, name, template=template)
-            else:
-                self.log.info('truncating: %s', create_fc)
-                arcpy.management.TruncateTable(create_fc)
-
-        downhole_points = {}
-        surface_points = {}
-
-        def extract_points(source, destination, x_field, y_field):
-            fields = [f.name for f in arcpy.Describe(source).fields]
-            x_index = fields.index(x_field)
-            y_index = fields.index(y_field)
-            zone_index = fields.index(UTMZone)
-            api_index = fields.index(API)
-            try:
-                construct_index = fields.index(ConstructNumber)
-            except ValueError:
-                #: this field isn't present in the surface points
-                construct_index = None
-            query = '{} IS NOT NULL AND {} IS NOT NULL'.format(x_field, y_field)
-            with arcpy.da.SearchCursor(source, fields, query) as search_cursor, \
-                    arcpy.da.InsertCursor(destination, fields + ['SHAPE@XY']) as insert_cursor:
-                for row in search_cursor:
-                    x = row[x_index]
-                    y = row[y_index]
-                    if x is not None and y is not None:
-                        if row[zone_index] == 11:
-                            zone_11_point = arcpy.PointGeometry(arcpy.Point(x, y), UTM11)
-                            projected_point = zone_11_point.projectAs(UTM12)
-                            point = (projected_point.x, projected_point.y)
-                        else:
-                            point = (x, y)
-
-                        if construct_index is None:
-                            surface_points[row[api_index]] = point
-                        else:
-                            construct = row[construct_index]
-                            downhole_points.setdefault(row[api_index], {}).setdefault(construct, []).append(point)
-                    else:
-                        point = None
-
-                    insert_cursor.insertRow(row + (point,))
-
-        self.log.info('extracting surface points to scratch')
-        extract_points(surface_dogm, surface_scratch, CoordsSurf_E, CoordsSurf_N)
-
-        self.log.info('extracting down hole points to scratch')
-        extract_points(downhole_dogm, downhole_scratch, CoordsBH_E, CoordsBH_N)
+        with metrics.step('prepare scratch'):
+            for create_fc in [surface_scratch, downhole_scratch, paths_scratch]:
+                if not arcpy.Exists(create_fc):
+                    self.log.info('creating: %s', create_fc)
+                    name = basename(create_fc)
+                    template = join(sgid, 'SGID10.ENERGY.{}'.format(name))
+                    arcpy.management.CreateFeatureclass(arcpy.env.scratchGDB, name, template=template)
+                else:
+                    self.log.info('truncating: %s', create_fc)
+                    arcpy.management.TruncateTable(create_fc)
+
+        self.log.info('loading indian country')
+        with metrics.step('load jurisdictions') as step:
+            jurisdictions = load_polygons(indian_country, UTM12)
+            step.rows = jurisdictions.size
+
+        #: the views are read at the same time in their own processes with their own connections. The paths need both of them.
+        self.log.info('extracting surface and down hole points to scratch')
+        with metrics.step('extract points') as step, ProcessPoolExecutor(max_workers=2) as executor:
+            surface = executor.submit(extract_points, surface_dogm, surface_scratch, CoordsSurf_E, CoordsSurf_N, jurisdictions)
+            downhole = executor.submit(extract_points, downhole_dogm, downhole_scratch, CoordsBH_E, CoordsBH_N)
+
+            extracts = [('surface points', surface.result()), ('down hole points', downhole.result())]
+            step.rows = sum(extract.rows for name, extract in extracts)
+
+        for name, extract in extracts:
+            metrics.record('read {}'.format(name), extract.read_seconds, extract.rows)
+            metrics.record('write {}'.format(name), extract.seconds - extract.read_seconds, extract.rows)
+            metrics.record('extract {}'.format(name), extract.seconds, extract.rows)
+
+            self.log.info('%s: read %i rows in %.2f seconds and wrote them in %.2f seconds', name, extract.rows, extract.read_seconds,
+                          extract.seconds - extract.read_seconds)
+
+            if extract.batch_projection:
+                self.log.info('%s: the batch transform is within %.4f meters of projectAs', name, extract.projection_error)
+            elif extract.batch_projection is not None:
+                self.log.warning('%s: the batch transform is %.3f meters from projectAs so projectAs was used', name, extract.projection_error)
+
+        surface_points = extracts[0][1].points
+        downhole_points = extracts[1][1].points
 
         self.log.info('building paths in scratch')
-        with arcpy.da.InsertCursor(paths_scratch, [API, ConstructNumber, 'SHAPE@']) as paths_cursor:
-            for api in downhole_points:
-                for construct in downhole_points[api]:
-                    try:
-                        surface_point = surface_points[api]
-                    except KeyError:
-                        #: skip if there is not surface point
-                        continue
-
-                    points = [surface_point] + downhole_points[api][construct]
-
-                    #: remove duplicates while preserving order so that lines go from surface to downholes
-                    unique_points = []
-                    [unique_points.append(point) for point in points if point not in unique_points]
-
-                    if len(unique_points) > 1:
-                        line = arcpy.Polyline(arcpy.Array([arcpy.Point(*coords) for coords in points]), UTM12)
-                        paths_cursor.insertRow((api, construct, line))
-
-        self.log.info('updating Jurisdiction field in surface points')
-        arcpy.management.MakeFeatureLayer(surface_scratch, jurisdiction_layer)
-        arcpy.management.CalculateField(jurisdiction_layer, Jurisdiction, '"state"', 'PYTHON')
-        arcpy.management.SelectLayerByLocation(jurisdiction_layer, 'INTERSECT', indian_country)
-        arcpy.management.CalculateField(jurisdiction_layer, Jurisdiction, '"indian"', 'PYTHON')
+        with metrics.step('build paths') as step, arcpy.da.InsertCursor(paths_scratch, [API, ConstructNumber, 'SHAPE@']) as paths_cursor:
+            step.rows = 0
+            for api, construct, coordinates in build_paths(surface_points, downhole_points.groups()):
+                line = arcpy.Polyline(arcpy.Array([arcpy.Point(x, y) for x, y in get_pairs(coordinates)]), UTM12)
+                paths_cursor.insertRow((api, construct, line))
+                step.rows += 1
 
         self.log.info('updating SGID from scratch data')
-        for source, destination in [(surface_scratch, surface_sgid), (downhole_scratch, downhole_sgid), (paths_scratch, paths_sgid)]:
-            arcpy.management.DeleteRows(destination)
-            arcpy.management.Append(source, destination)
+        for source, destination, keys in [(surface_scratch, surface_sgid, [API]), (downhole_scratch, downhole_sgid, [API, ConstructNumber]),
+                                          (paths_scratch, paths_sgid, [API, ConstructNumber])]:
+            with metrics.step('update {}'.format(basename(destination))) as step:
+                result = sync(source, destination, keys, sgid)
+                step.rows = result.inserted + result.updated + result.deleted
+
+            self.log.info('%s: %i inserted, %i updated, %i deleted, %i unchanged', basename(destination), result.inserted, result.updated,
+                          result.deleted, result.unchanged)
 
 
 if __name__ == '__main__':
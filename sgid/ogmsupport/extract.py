@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+extract.py
+
+A module that copies the wells of a DOGM view to a scratch feature class in a worker process. It lives outside of
+the pallet module so the workers can import it without importing a pallet.
+
+Each view is read in its own process with its own connection and cursors. The zone 12 points are returned to the
+parent in a Points so the paths can be built once both views are done.
+'''
+
+import arcpy
+from collections import namedtuple
+from ogmsupport.points import Points
+from ogmsupport.projection import get_largest_error
+from ogmsupport.projection import utm11_to_utm12
+from time import perf_counter
+
+#: field names
+CoordsSurf_E = 'CoordsSurf_E'
+CoordsSurf_N = 'CoordsSurf_N'
+CoordsBH_E = 'CoordsBH_E'
+CoordsBH_N = 'CoordsBH_N'
+API = 'API'
+ConstructNumber = 'ConstructNumber'
+UTMZone = 'UTMZone'
+Jurisdiction = 'Jurisdiction'
+
+UTM12 = arcpy.SpatialReference(26912)
+UTM11 = arcpy.SpatialReference(26911)
+
+#: the Jurisdiction values
+STATE = 'state'
+INDIAN = 'indian'
+
+#: the number of rows that are read before their coordinates are transformed and they are inserted
+BATCH_SIZE = 10000
+
+#: the number of zone 11 points that are checked against projectAs and the most meters they can be off
+PROJECTION_SAMPLE = 25
+PROJECTION_TOLERANCE = 0.01
+
+#: rows: the number of rows copied
+#: read_seconds: the seconds spent waiting on the view
+#: seconds: the seconds the whole extract took
+#: points: the Points of the rows keyed by api or (api, construct)
+#: projection_error: the most meters the batch transform was off from projectAs or None if there were no zone 11 rows
+#: batch_projection: whether the batch transform was used
+Extract = namedtuple('Extract', ['rows', 'read_seconds', 'seconds', 'points', 'projection_error', 'batch_projection'])
+
+
+def project_as(x, y):
+    '''returns the zone 12 (x, y) of a zone 11 point with the arcgis geometry engine
+    '''
+    projected_point = arcpy.PointGeometry(arcpy.Point(x, y), UTM11).projectAs(UTM12)
+
+    return (projected_point.x, projected_point.y)
+
+
+class Projector(object):
+    '''transforms zone 11 coordinates to zone 12
+
+    The batch transform is checked against projectAs on a sample of the first coordinates. projectAs is used for every
+    point if they don't agree.
+    '''
+
+    def __init__(self):
+        self.batch = None
+        self.error = None
+
+    def project(self, xs, ys):
+        '''returns a tuple of the zone 12 eastings and northings of zone 11 coordinates
+        '''
+        if self.batch is None:
+            sample = list(range(0, len(xs), max(1, len(xs) // PROJECTION_SAMPLE)))[:PROJECTION_SAMPLE]
+            expected = [project_as(xs[index], ys[index]) for index in sample]
+
+            self.error = get_largest_error([xs[index] for index in sample], [ys[index] for index in sample], expected)
+            self.batch = self.error <= PROJECTION_TOLERANCE
+
+        if self.batch:
+            return utm11_to_utm12(xs, ys)
+
+        points = [project_as(x, y) for x, y in zip(xs, ys)]
+
+        return [point[0] for point in points], [point[1] for point in points]
+
+
+def get_points(rows, x_index, y_index, zone_index, projector):
+    '''returns the zone 12 point of each row or None when it doesn't have coordinates
+    '''
+    points = [None if row[x_index] is None or row[y_index] is None else (row[x_index], row[y_index]) for row in rows]
+    zone_11 = [index for index, row in enumerate(rows) if points[index] is not None and row[zone_index] == 11]
+
+    if zone_11:
+        eastings, northings = projector.project([points[index][0] for index in zone_11], [points[index][1] for index in zone_11])
+
+        for index, easting, northing in zip(zone_11, eastings, northings):
+            points[index] = (float(easting), float(northing))
+
+    return points
+
+
+def extract_points(source, destination, x_field, y_field, jurisdictions=None):
+    '''copies the rows with coordinates to the destination with their zone 12 point. The Jurisdiction of each row is set
+    from the PolygonIndex of indian country when there is one. This runs in a worker process.
+
+    returns an Extract
+    '''
+    started = perf_counter()
+    projector = Projector()
+    points = Points()
+
+    fields = [f.name for f in arcpy.Describe(source).fields]
+    x_index = fields.index(x_field)
+    y_index = fields.index(y_field)
+    zone_index = fields.index(UTMZone)
+    api_index = fields.index(API)
+    try:
+        construct_index = fields.index(ConstructNumber)
+    except ValueError:
+        #: this field isn't present in the surface points
+        construct_index = None
+    insert_fields = fields + ['SHAPE@XY']
+    jurisdiction_index = None
+    if jurisdictions is not None:
+        if Jurisdiction in insert_fields:
+            jurisdiction_index = insert_fields.index(Jurisdiction)
+        else:
+            insert_fields.append(Jurisdiction)
+            jurisdiction_index = len(insert_fields) - 1
+
+    query = '{} IS NOT NULL AND {} IS NOT NULL'.format(x_field, y_field)
+    count = 0
+    read_seconds = 0
+    with arcpy.da.InsertCursor(destination, insert_fields) as insert_cursor:
+
+        def load(rows):
+            for row, point in zip(rows, get_points(rows, x_index, y_index, zone_index, projector)):
+                if point is not None:
+                    if construct_index is None:
+                        points.add(row[api_index], *point)
+                    else:
+                        points.add((row[api_index], row[construct_index]), *point)
+
+                values = list(row) + [point]
+                if jurisdiction_index is not None:
+                    jurisdiction = INDIAN if point is not None and jurisdictions.intersects(*point) else STATE
+
+                    if jurisdiction_index == len(values):
+                        values.append(jurisdiction)
+                    else:
+                        values[jurisdiction_index] = jurisdiction
+
+                insert_cursor.insertRow(values)
+
+            return len(rows)
+
+        read_started = perf_counter()
+        with arcpy.da.SearchCursor(source, fields, query) as search_cursor:
+            rows = []
+            for row in search_cursor:
+                rows.append(row)
+
+                if len(rows) == BATCH_SIZE:
+                    read_seconds += perf_counter() - read_started
+                    count += load(rows)
+                    rows = []
+                    read_started = perf_counter()
+
+            read_seconds += perf_counter() - read_started
+            count += load(rows)
+
+    return Extract(count, read_seconds, perf_counter() - started, points, projector.error, projector.batch)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+jurisdiction.py
+
+A module that finds the polygon a point falls in without a geoprocessing tool.
+
+The polygons are read once into a sort-tile-recursive (STR) packed tree of bounding boxes. A lookup walks down
+the boxes that hold the point and only runs the even-odd ring test on the polygons at the bottom of them.
+'''
+
+import math
+from collections import namedtuple
+
+import arcpy
+
+#: the most children a node of the tree has
+NODE_CAPACITY = 10
+
+#: the meters a point can be off of an edge and still be on the boundary
+BOUNDARY_TOLERANCE = 1e-6
+
+#: xmin, ymin, xmax, ymax: the bounding box
+#: children: the child Nodes or the polygons at the bottom of the tree
+Node = namedtuple('Node', ['xmin', 'ymin', 'xmax', 'ymax', 'children'])
+
+#: rings: a list of the rings of the polygon. Each ring is a list of (x, y).
+Polygon = namedtuple('Polygon', ['xmin', 'ymin', 'xmax', 'ymax', 'rings'])
+
+
+def get_rings(shape):
+    '''returns the rings of an arcpy polygon as lists of (x, y). Interior rings follow a None in their part.
+    '''
+    rings = []
+
+    for part in shape:
+        ring = []
+
+        for point in part:
+            if point is None:
+                if ring:
+                    rings.append(ring)
+
+                ring = []
+            else:
+                ring.append((point.X, point.Y))
+
+        if ring:
+            rings.append(ring)
+
+    return rings
+
+
+def make_polygon(rings):
+    xs = [x for ring in rings for x, y in ring]
+    ys = [y for ring in rings for x, y in ring]
+
+    return Polygon(min(xs), min(ys), max(xs), max(ys), rings)
+
+
+def on_segment(x, y, xi, yi, xj, yj, tolerance=BOUNDARY_TOLERANCE):
+    '''returns True if the point is within `tolerance` of the segment
+    '''
+    if not (min(xi, xj) - tolerance <= x <= max(xi, xj) + tolerance and min(yi, yj) - tolerance <= y <= max(yi, yj) + tolerance):
+        return False
+
+    length = math.hypot(xj - xi, yj - yi)
+    if length == 0:
+        return math.hypot(x - xi, y - yi) <= tolerance
+
+    return abs((xj - xi) * (y - yi) - (yj - yi) * (x - xi)) <= tolerance * length
+
+
+def contains(polygon, x, y):
+    '''returns True if the point is inside the polygon by the even-odd rule across all of its rings so holes are outside.
+    A point on the boundary of any ring is inside like the INTERSECT of SelectLayerByLocation.
+    '''
+    inside = False
+
+    for ring in polygon.rings:
+        j = len(ring) - 1
+
+        for i in range(len(ring)):
+            xi, yi = ring[i]
+            xj, yj = ring[j]
+
+            if on_segment(x, y, xi, yi, xj, yj):
+                return True
+
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+
+            j = i
+
+    return inside
+
+
+def _pack(items, capacity):
+    '''returns the Nodes of one level of the tree over items that have a bounding box
+    '''
+    slices = int(math.ceil(math.sqrt(math.ceil(len(items) / capacity))))
+    per_slice = slices * capacity
+    nodes = []
+
+    items = sorted(items, key=lambda item: item.xmin + item.xmax)
+    for start in range(0, len(items), per_slice):
+        vertical = sorted(items[start:start + per_slice], key=lambda item: item.ymin + item.ymax)
+
+        for node_start in range(0, len(vertical), capacity):
+            children = vertical[node_start:node_start + capacity]
+            nodes.append(
+                Node(min(child.xmin for child in children), min(child.ymin for child in children), max(child.xmax for child in children),
+                     max(child.ymax for child in children), children))
+
+    return nodes
+
+
+class PolygonIndex(object):
+    '''a bounding box tree of polygons
+
+    polygons: a list of Polygon
+    '''
+
+    def __init__(self, polygons, capacity=NODE_CAPACITY):
+        self.size = len(polygons)
+        self.root = None
+
+        level = _pack(polygons, capacity) if polygons else []
+        while len(level) > 1:
+            level = _pack(level, capacity)
+
+        if level:
+            self.root = level[0]
+
+    def find(self, x, y):
+        '''returns the first Polygon that contains the point or None
+        '''
+        if self.root is None:
+            return None
+
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+
+            if not (node.xmin <= x <= node.xmax and node.ymin <= y <= node.ymax):
+                continue
+
+            if isinstance(node, Polygon):
+                if contains(node, x, y):
+                    return node
+
+                continue
+
+            nodes.extend(node.children)
+
+        return None
+
+    def intersects(self, x, y):
+        return self.find(x, y) is not None
+
+
+def load_polygons(feature_class, spatial_reference=None):
+    '''returns a PolygonIndex of the polygons in the feature class projected to the spatial reference
+    '''
+    polygons = []
+
+    with arcpy.da.SearchCursor(feature_class, ['SHAPE@'], spatial_reference=spatial_reference) as cursor:
+        for shape, in cursor:
+            if shape is None:
+                continue
+
+            rings = get_rings(shape)
+            if rings:
+                polygons.append(make_polygon(rings))
+
+    return PolygonIndex(polygons)
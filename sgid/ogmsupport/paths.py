@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+paths.py
+
+A module that turns the surface point and down hole stations of each well construct into the coordinates of its path.
+
+Repeated stations are dropped in one pass by keying each point on its coordinates snapped to a grid of
+`tolerance` meters. The first of each key is kept so the path still runs from the surface down the hole. The
+coordinates are kept in a flat array of doubles, x then y, instead of a list of tuples.
+'''
+
+from array import array
+
+#: points closer than this many meters are the same station
+TOLERANCE = 0.001
+
+
+def get_key(x, y, tolerance=TOLERANCE):
+    '''returns the grid cell of a point
+    '''
+    return (round(x / tolerance), round(y / tolerance))
+
+
+def dedupe(points, tolerance=TOLERANCE):
+    '''returns an array of the x and y of the first of each distinct point in `points`, an iterable of (x, y), in order
+    '''
+    seen = set()
+    coordinates = array('d')
+
+    for x, y in points:
+        key = get_key(x, y, tolerance)
+
+        if key in seen:
+            continue
+
+        seen.add(key)
+        coordinates.append(x)
+        coordinates.append(y)
+
+    return coordinates
+
+
+def build_path(surface_point, downhole_points, tolerance=TOLERANCE):
+    '''returns the coordinate array of the path from the surface point through the down hole points or None when there
+    are not at least two distinct points
+    '''
+    coordinates = dedupe([surface_point] + list(downhole_points), tolerance)
+
+    if len(coordinates) < 4:
+        return None
+
+    return coordinates
+
+
+def build_paths(surface_points, stations, tolerance=TOLERANCE):
+    '''yields (api, construct, coordinates) for each construct that has a surface point and a path
+
+    surface_points: anything with a get(api) that returns (x, y) eg: a dictionary or a Points
+    stations: an iterable of ((api, construct), a list of (x, y)) eg: Points.groups()
+    '''
+    for (api, construct), points in stations:
+        surface_point = surface_points.get(api)
+
+        if surface_point is None:
+            #: skip if there is not surface point
+            continue
+
+        coordinates = build_path(surface_point, points, tolerance)
+
+        if coordinates is not None:
+            yield api, construct, coordinates
+
+
+def get_pairs(coordinates):
+    '''returns an iterator of (x, y) from a coordinate array
+    '''
+    return zip(coordinates[0::2], coordinates[1::2])
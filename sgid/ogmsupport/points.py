@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+points.py
+
+A module that holds the points of many wells in flat typed arrays instead of dictionaries of lists of tuples.
+
+Each distinct key, eg: an api or an (api, construct), gets an integer id the first time it's seen. Every point
+appends its x and y to arrays of doubles and its id to an array of ints, about 20 bytes a point. The points of a
+key are gathered with a stable counting sort on the ids so they come back in the order they were read without
+asking the database to sort a view that has no station order to sort on. When the points of each key were read
+together, as the views usually return them, they are sliced out without sorting.
+'''
+
+from array import array
+
+
+class Points(object):
+    '''points grouped by a key
+    '''
+
+    def __init__(self):
+        #: key to id
+        self.ids = {}
+        #: id to key
+        self.keys = []
+        #: id to the index of its first and last point
+        self.firsts = array('i')
+        self.lasts = array('i')
+        self.xs = array('d')
+        self.ys = array('d')
+        #: the id of each point
+        self.key_ids = array('i')
+        #: whether the points of each key were added one after the other
+        self.contiguous = True
+
+    def __len__(self):
+        return len(self.xs)
+
+    def add(self, key, x, y):
+        key_id = self.ids.get(key)
+
+        if key_id is None:
+            key_id = len(self.keys)
+            self.ids[key] = key_id
+            self.keys.append(key)
+            self.firsts.append(len(self.xs))
+            self.lasts.append(0)
+        elif self.contiguous and key_id != self.key_ids[-1]:
+            self.contiguous = False
+
+        self.xs.append(x)
+        self.ys.append(y)
+        self.lasts[key_id] = len(self.key_ids)
+        self.key_ids.append(key_id)
+
+    def get(self, key, default=None):
+        '''returns the last (x, y) that was added for the key like assigning to a dictionary would
+        '''
+        key_id = self.ids.get(key)
+
+        if key_id is None:
+            return default
+
+        index = self.lasts[key_id]
+
+        return (self.xs[index], self.ys[index])
+
+    def groups(self):
+        '''yields (key, points) for each key in the order they were first added. points is a list of (x, y) in the order
+        they were added.
+        '''
+        xs = self.xs
+        ys = self.ys
+
+        if self.contiguous:
+            ends = self.firsts[1:] + array('i', [len(xs)])
+
+            for key, start, end in zip(self.keys, self.firsts, ends):
+                yield key, list(zip(xs[start:end], ys[start:end]))
+
+            return
+
+        #: the index in `order` where the points of each id start
+        starts = array('i', bytes(4 * (len(self.keys) + 1)))
+        for key_id in self.key_ids:
+            starts[key_id + 1] += 1
+
+        for key_id in range(len(self.keys)):
+            starts[key_id + 1] += starts[key_id]
+
+        order = array('i', bytes(4 * len(self.key_ids)))
+        position = array('i', starts)
+        for index, key_id in enumerate(self.key_ids):
+            order[position[key_id]] = index
+            position[key_id] += 1
+
+        del position
+
+        for key_id, key in enumerate(self.keys):
+            yield key, [(xs[index], ys[index]) for index in order[starts[key_id]:starts[key_id + 1]]]
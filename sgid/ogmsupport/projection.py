@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+projection.py
+
+A module that moves NAD83 UTM zone 11 coordinates into NAD83 UTM zone 12 a whole array at a time.
+
+Both zones are transverse mercator projections of the GRS 1980 ellipsoid so no datum shift is needed. The
+coordinates are taken back to the conformal sphere with the Krüger series, turned 6 degrees east and projected
+again (Karney, Transverse Mercator with an accuracy of a few nanometers, 2011). The sixth order series is good to
+well under a millimeter this close to the central meridians.
+
+numpy is used when it is installed. Otherwise each point is transformed with the math module.
+'''
+
+import math
+from types import SimpleNamespace
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: GRS 1980
+A = 6378137.0
+F = 1 / 298.257222101
+N = F / (2 - F)
+
+K0 = 0.9996
+FALSE_EASTING = 500000.0
+
+#: the difference between the zone 11 (-117) and zone 12 (-111) central meridians
+ZONE_SHIFT = math.radians(-117.0 - -111.0)
+
+#: the rectifying radius
+RADIUS = A / (1 + N) * (1 + N**2 / 4 + N**4 / 64 + N**6 / 256)
+
+#: the forward series
+ALPHA = [
+    N / 2 - 2 * N**2 / 3 + 5 * N**3 / 16 + 41 * N**4 / 180 - 127 * N**5 / 288 + 7891 * N**6 / 37800,
+    13 * N**2 / 48 - 3 * N**3 / 5 + 557 * N**4 / 1440 + 281 * N**5 / 630 - 1983433 * N**6 / 1935360,
+    61 * N**3 / 240 - 103 * N**4 / 140 + 15061 * N**5 / 26880 + 167603 * N**6 / 181440,
+    49561 * N**4 / 161280 - 179 * N**5 / 168 + 6601661 * N**6 / 7257600,
+    34729 * N**5 / 80640 - 3418889 * N**6 / 1995840,
+    212378941 * N**6 / 319334400,
+]
+
+#: the inverse series
+BETA = [
+    N / 2 - 2 * N**2 / 3 + 37 * N**3 / 96 - N**4 / 360 - 81 * N**5 / 512 + 96199 * N**6 / 604800,
+    N**2 / 48 + N**3 / 15 - 437 * N**4 / 1440 + 46 * N**5 / 105 - 1118711 * N**6 / 3870720,
+    17 * N**3 / 480 - 37 * N**4 / 840 - 209 * N**5 / 4480 + 5569 * N**6 / 90720,
+    4397 * N**4 / 161280 - 11 * N**5 / 504 - 830251 * N**6 / 7257600,
+    4583 * N**5 / 161280 - 108847 * N**6 / 3991680,
+    20648693 * N**6 / 638668800,
+]
+
+
+def _transform(x, y, lib):
+    '''the transform written against the functions in `lib` so it works on numpy arrays and on floats
+    '''
+    xi = y / (K0 * RADIUS)
+    eta = (x - FALSE_EASTING) / (K0 * RADIUS)
+
+    #: zone 11 plane to the conformal sphere
+    xi_prime = xi
+    eta_prime = eta
+    for j, beta in enumerate(BETA, 1):
+        xi_prime = xi_prime - beta * lib.sin(2 * j * xi) * lib.cosh(2 * j * eta)
+        eta_prime = eta_prime - beta * lib.cos(2 * j * xi) * lib.sinh(2 * j * eta)
+
+    #: the tangent of the conformal latitude and the longitude from the zone 12 central meridian
+    tau_prime = lib.sin(xi_prime) / lib.sqrt(lib.sinh(eta_prime)**2 + lib.cos(xi_prime)**2)
+    longitude = lib.atan2(lib.sinh(eta_prime), lib.cos(xi_prime)) + ZONE_SHIFT
+
+    #: the conformal sphere to the zone 12 plane
+    xi_prime = lib.atan2(tau_prime, lib.cos(longitude))
+    eta_prime = lib.asinh(lib.sin(longitude) / lib.sqrt(tau_prime**2 + lib.cos(longitude)**2))
+
+    xi = xi_prime
+    eta = eta_prime
+    for j, alpha in enumerate(ALPHA, 1):
+        xi = xi + alpha * lib.sin(2 * j * xi_prime) * lib.cosh(2 * j * eta_prime)
+        eta = eta + alpha * lib.cos(2 * j * xi_prime) * lib.sinh(2 * j * eta_prime)
+
+    return FALSE_EASTING + K0 * RADIUS * eta, K0 * RADIUS * xi
+
+
+#: the numpy functions under the math module names
+VECTORIZED = None
+if numpy is not None:
+    VECTORIZED = SimpleNamespace(sin=numpy.sin, cos=numpy.cos, sinh=numpy.sinh, cosh=numpy.cosh, sqrt=numpy.sqrt, atan2=numpy.arctan2,
+                                 asinh=numpy.arcsinh)
+
+
+def utm11_to_utm12(xs, ys):
+    '''returns a tuple of the zone 12 eastings and northings of the zone 11 `xs` eastings and `ys` northings
+
+    The results are numpy arrays when numpy is installed and lists otherwise.
+    '''
+    if numpy is not None:
+        return _transform(numpy.asarray(xs, dtype=numpy.float64), numpy.asarray(ys, dtype=numpy.float64), VECTORIZED)
+
+    points = [_transform(float(x), float(y), math) for x, y in zip(xs, ys)]
+
+    return [point[0] for point in points], [point[1] for point in points]
+
+
+def get_largest_error(xs, ys, expected):
+    '''returns the largest distance between the transformed `xs` and `ys` and the `expected` list of (x, y)
+    '''
+    if not expected:
+        return 0
+
+    eastings, northings = utm11_to_utm12(xs, ys)
+
+    return max(math.hypot(easting - x, northing - y) for easting, northing, (x, y) in zip(eastings, northings, expected))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+upsert.py
+
+A module that makes a destination table match a source table by only inserting, updating and deleting the rows
+that are different.
+
+Each row is hashed on the fields the tables share and its geometry. The rows are grouped by their key fields and
+the hashes in each group are compared as a multiset so keys that repeat, like the stations of a down hole, still
+line up. A changed row shows up as a source hash and a destination hash in the same group. Those are paired up
+into updates and the rest are inserts or deletes.
+'''
+
+import re
+from collections import Counter
+from collections import namedtuple
+from hashlib import blake2b
+
+import arcpy
+
+#: field types that are not copied or compared
+SKIPPED_TYPES = set(['OID', 'Geometry', 'GlobalID', 'Blob', 'Raster'])
+
+#: the meters the geometry is rounded to before it is hashed so storage precision doesn't look like a change
+DECIMALS = 3
+
+NUMBER = re.compile(r'-?\d+\.\d+')
+
+#: inserted, updated, deleted: the number of destination rows that were changed
+#: unchanged: the number of rows that were already the same
+Sync = namedtuple('Sync', ['inserted', 'updated', 'deleted', 'unchanged'])
+
+
+def get_fields(source, destination):
+    '''returns the names of the editable destination fields that are also in the source
+    '''
+    source_fields = set(field.name.lower() for field in arcpy.Describe(source).fields)
+
+    return [
+        field.name for field in arcpy.Describe(destination).fields
+        if field.type not in SKIPPED_TYPES and getattr(field, 'editable', True) and field.name.lower() in source_fields
+    ]
+
+
+def get_shape_token(table):
+    '''returns the cursor token that reads the geometry of `table` for hashing
+    '''
+    if arcpy.Describe(table).shapeType == 'Point':
+        return 'SHAPE@XY'
+
+    return 'SHAPE@WKT'
+
+
+def normalize_shape(shape):
+    if shape is None:
+        return None
+
+    if isinstance(shape, tuple):
+        return tuple(round(value, DECIMALS) for value in shape)
+
+    return NUMBER.sub(lambda number: '{:.{}f}'.format(float(number.group()), DECIMALS), shape)
+
+
+def hash_row(values):
+    return blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def read_hashes(table, fields, keys, shape_token):
+    '''returns a dictionary of key values to a list of (hash, object id) for every row in `table`
+    '''
+    key_indexes = [fields.index(key) for key in keys]
+    groups = {}
+
+    with arcpy.da.SearchCursor(table, ['OID@', shape_token] + fields) as cursor:
+        for row in cursor:
+            values = row[2:]
+            key = tuple(values[index] for index in key_indexes)
+
+            groups.setdefault(key, []).append((hash_row((normalize_shape(row[1]), ) + tuple(values)), row[0]))
+
+    return groups
+
+
+def plan(source_groups, destination_groups):
+    '''returns a tuple of a dictionary of destination object id to the source object id that replaces it, a list of the
+    source object ids to insert, a list of the destination object ids to delete and the number of unchanged rows
+    '''
+    updates = {}
+    inserts = []
+    deletes = []
+    unchanged = 0
+
+    for key in set(source_groups) | set(destination_groups):
+        source_rows = source_groups.get(key, [])
+        destination_rows = destination_groups.get(key, [])
+
+        #: most groups are a single row that hasn't changed
+        if sorted(row_hash for row_hash, oid in source_rows) == sorted(row_hash for row_hash, oid in destination_rows):
+            unchanged += len(source_rows)
+
+            continue
+
+        matched = Counter(row_hash for row_hash, oid in source_rows) & Counter(row_hash for row_hash, oid in destination_rows)
+        unchanged += sum(matched.values())
+
+        added = _unmatched(source_rows, matched)
+        removed = _unmatched(destination_rows, matched)
+
+        updates.update(zip(removed, added))
+        inserts.extend(added[len(removed):])
+        deletes.extend(removed[len(added):])
+
+    return updates, inserts, deletes, unchanged
+
+
+def _unmatched(rows, matched):
+    '''returns the object ids of the rows whose hashes are not used up by `matched`
+    '''
+    remaining = Counter(matched)
+    oids = []
+
+    for row_hash, oid in rows:
+        if remaining[row_hash]:
+            remaining[row_hash] -= 1
+        else:
+            oids.append(oid)
+
+    return oids
+
+
+def sync(source, destination, keys, workspace):
+    '''makes `destination` match `source`
+
+    keys: the fields that identify a row eg: ['API', 'ConstructNumber']
+    workspace: the workspace of the destination that the edits are made in
+
+    returns a Sync
+    '''
+    fields = get_fields(source, destination)
+    shape_token = get_shape_token(destination)
+
+    updates, inserts, deletes, unchanged = plan(read_hashes(source, fields, keys, shape_token),
+                                                read_hashes(destination, fields, keys, shape_token))
+
+    if not (updates or inserts or deletes):
+        return Sync(0, 0, 0, unchanged)
+
+    needed = set(updates.values()) | set(inserts)
+    rows = {}
+
+    with arcpy.da.SearchCursor(source, ['OID@', 'SHAPE@'] + fields) as cursor:
+        for row in cursor:
+            if row[0] in needed:
+                rows[row[0]] = list(row[1:])
+
+    deletes = set(deletes)
+
+    with arcpy.da.Editor(workspace):
+        if updates or deletes:
+            with arcpy.da.UpdateCursor(destination, ['OID@', 'SHAPE@'] + fields) as cursor:
+                for row in cursor:
+                    if row[0] in deletes:
+                        cursor.deleteRow()
+                    elif row[0] in updates:
+                        cursor.updateRow([row[0]] + rows[updates[row[0]]])
+
+        with arcpy.da.InsertCursor(destination, ['SHAPE@'] + fields) as cursor:
+            for oid in inserts:
+                cursor.insertRow(rows[oid])
+
+    return Sync(len(inserts), len(updates), len(deletes), unchanged)
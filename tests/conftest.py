@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+conftest.py
+
+Puts the warehouse, the mapserv and sgid pallet folders and the fake arcpy and forklift in `benchmarks/fakes` on the path the same
+way forklift and the benchmarks do so the support modules can be tested on a machine without ArcGIS.
+'''
+
+import sys
+from os.path import abspath
+from os.path import dirname
+from os.path import join
+
+WAREHOUSE = dirname(dirname(abspath(__file__)))
+
+sys.path.insert(0, join(WAREHOUSE, 'benchmarks', 'fakes'))
+sys.path.append(WAREHOUSE)
+sys.path.append(join(WAREHOUSE, 'mapserv'))
+sys.path.append(join(WAREHOUSE, 'sgid'))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_catalog.py
+
+Tests for palletsupport/catalog.py and the stale inventory handling in palletsupport/maintenance.py against the fake arcpy
+'''
+
+import arcpy
+import pytest
+from palletsupport.catalog import Inventory
+from palletsupport.catalog import get_inventory
+from palletsupport.catalog import walk
+from palletsupport.maintenance import analyze_owner
+from palletsupport.store import MaintenanceStore
+
+WORKSPACE = 'c:\\garage\\owner@db@server.sde'
+
+
+@pytest.fixture(autouse=True)
+def fake_workspace():
+    arcpy.reset()
+    arcpy.SCALE = 0
+
+    children = [('DB.OWNER.Roads', 'FeatureClass'), ('DB.OWNER.Lookup', 'Table'), ('DB.OWNER.Elevation', 'RasterDataset'),
+                ('DB.OWNER.Roads_Lookup', 'RelationshipClass'),
+                ('DB.OWNER.Network', 'FeatureDataset', [('DB.OWNER.Lines', 'FeatureClass'), ('DB.OWNER.Network_Topology', 'Topology'),
+                                                        ('DB.OWNER.Network_Net', 'GeometricNetwork')])]
+    workspace = arcpy.add_workspace(WORKSPACE, user='owner', children=children)
+
+    for name in ['DB.OWNER.Roads', 'DB.OWNER.Lookup', 'DB.OWNER.Lines']:
+        arcpy.add_table('{}\\{}'.format(WORKSPACE, name), ['NAME'])
+
+    return workspace
+
+
+def test_walk_only_lists_what_can_be_analyzed():
+    inventory = walk(WORKSPACE)
+
+    assert inventory.user == 'owner'
+    assert inventory.tables == ['DB.OWNER.Lookup']
+    assert sorted(inventory.feature_classes) == ['DB.OWNER.Lines', 'DB.OWNER.Roads']
+    assert inventory.rasters == ['DB.OWNER.Elevation']
+    assert inventory.feature_datasets == ['DB.OWNER.Network']
+    assert inventory.topologies == ['DB.OWNER.Network_Topology']
+    assert 'DB.OWNER.Roads_Lookup' not in inventory.datasets()
+    assert 'DB.OWNER.Network_Net' not in inventory.datasets()
+    assert 'DB.OWNER.Network_Topology' not in inventory.datasets(include_topology=False)
+
+
+def test_from_json_reads_inventories_cached_with_other():
+    text = '{"user": "owner", "tables": ["a"], "feature_classes": [], "rasters": [], "feature_datasets": [], "topologies": [], "other": ["b"]}'
+
+    assert Inventory.from_json(text).datasets() == ['a']
+
+
+def test_get_inventory_uses_the_cache(tmpdir, fake_workspace):
+    with MaintenanceStore(str(tmpdir.join('maintenance.sqlite'))) as store:
+        first = get_inventory(WORKSPACE, store)
+        fake_workspace.children = fake_workspace.children[1:]
+
+        assert get_inventory(WORKSPACE, store) == first
+        assert get_inventory(WORKSPACE, store, ttl_hours=0) != first
+
+
+def test_analyze_owner_refreshes_a_stale_inventory(tmpdir, fake_workspace):
+    store = str(tmpdir.join('maintenance.sqlite'))
+    analyze_owner(WORKSPACE, store=store, max_age_days=0)
+
+    #: the dataset is dropped while the inventory is cached
+    fake_workspace.children = [child for child in fake_workspace.children if child[0] != 'DB.OWNER.Roads']
+
+    analyzed, skipped, seconds, batches = analyze_owner(WORKSPACE, store=store, max_age_days=0)
+
+    assert sum(count for count, batch_seconds in batches) == analyzed - 1
+
+    with MaintenanceStore(store) as maintenance_store:
+        assert 'DB.OWNER.Roads' not in get_inventory(WORKSPACE, maintenance_store).datasets()
+
+
+def test_analyze_owner_raises_when_nothing_was_dropped(tmpdir, monkeypatch):
+    def fail(*args):
+        raise arcpy.ExecuteError('the database is down')
+
+    monkeypatch.setattr(arcpy, 'AnalyzeDatasets_management', fail)
+
+    with pytest.raises(arcpy.ExecuteError):
+        analyze_owner(WORKSPACE, store=str(tmpdir.join('maintenance.sqlite')))
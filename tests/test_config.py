@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_config.py
+
+Tests for mapserv/locatorsupport/config.py against files in a temp directory
+'''
+
+import pytest
+from locatorsupport.config import get_properties
+from locatorsupport.config import patch
+from locatorsupport.config import patch_loc
+from locatorsupport.config import patch_loc_xml
+from os import stat
+from os import utime
+
+LOC = '\r\n'.join([
+    '[Address Locator]',
+    'MinimumMatchScore = 85',
+    'BatchPresortInputs = ZONE',
+    'BatchPresortInputs = CITY',
+    '# a comment = not a property',
+    'NumThreads = 0',
+    '',
+])
+
+LOC_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<locator version='10.2'>
+  <!-- written by <arcgis> -->
+  <ref_data>
+    <data_source name="primary">
+      <workspace_properties>
+        <path>C:\\old\\locators.gdb</path>
+        <workspace_factory>FileGDB</workspace_factory>
+        <empty/>
+      </workspace_properties>
+      <feature_class>AddressPoints &amp; Roads</feature_class>
+    </data_source>
+    <data_source name="alternate">
+      <workspace_properties>
+        <path>C:\\old\\locators.gdb</path>
+      </workspace_properties>
+    </data_source>
+  </ref_data>
+  <path>C:\\not\\a\\workspace</path>
+</locator>
+'''
+
+WORKSPACE = 'D:\\new\\locators & more.gdb'
+
+
+@pytest.fixture
+def locator(tmpdir):
+    path = str(tmpdir.join('AddressPoints'))
+
+    with open(path + '.loc', 'w', newline='') as loc:
+        loc.write(LOC)
+
+    with open(path + '.loc.xml', 'w', encoding='utf-8', newline='') as loc_xml:
+        loc_xml.write(LOC_XML)
+
+    #: an old modified time so a rewrite would show
+    for extension in ['.loc', '.loc.xml']:
+        utime(path + extension, (1000000000, 1000000000))
+
+    return path
+
+
+def read(path):
+    with open(path, encoding='utf-8', newline='') as data:
+        return data.read()
+
+
+def test_patching_twice_is_a_no_op_the_second_time(locator):
+    template = 'MinimumMatchScore = 60\nNumThreads = 8\n'
+
+    assert patch_loc(locator, template) == {'MinimumMatchScore': ['60'], 'NumThreads': ['8']}
+    modified = stat(locator + '.loc').st_mtime_ns
+    patched = read(locator + '.loc')
+
+    assert patch_loc(locator, template) == {}
+    assert stat(locator + '.loc').st_mtime_ns == modified
+    assert read(locator + '.loc') == patched
+
+
+def test_an_unchanged_loc_is_not_written(locator):
+    assert patch_loc(locator, 'MinimumMatchScore = 85\n') == {}
+    assert stat(locator + '.loc').st_mtime_ns == 1000000000 * 10**9
+
+
+def test_a_repeated_key_collapses_where_it_first_appears():
+    patched, changes = patch(LOC, 'BatchPresortInputs = ZIP\n')
+
+    assert changes == {'BatchPresortInputs': ['ZIP']}
+    assert patched.split('\r\n')[2:4] == ['BatchPresortInputs = ZIP', '# a comment = not a property']
+    assert get_properties(patched)['BatchPresortInputs'] == ['ZIP']
+
+
+def test_new_keys_are_appended_and_the_line_endings_are_kept():
+    patched, changes = patch(LOC, 'NumThreads = 0\nRuntimeMemoryLimit = 1023410176\nStorageSegmentSizeKB = 128\n')
+
+    assert list(changes) == ['RuntimeMemoryLimit', 'StorageSegmentSizeKB']
+    assert patched == LOC + 'RuntimeMemoryLimit = 1023410176\r\nStorageSegmentSizeKB = 128\r\n'
+    assert '\n' not in patched.replace('\r\n', '')
+
+
+def test_a_loc_without_a_trailing_newline_gets_one_before_new_keys():
+    patched, changes = patch('NumThreads = 0', 'NumThreads = 0\nStorageSegmentSizeKB = 128\n')
+
+    assert patched == 'NumThreads = 0\nStorageSegmentSizeKB = 128\n'
+
+
+def test_only_the_workspace_paths_change_in_the_xml(locator):
+    assert patch_loc_xml(locator, WORKSPACE)
+
+    expected = LOC_XML.replace('<path>C:\\old\\locators.gdb</path>', '<path>D:\\new\\locators &amp; more.gdb</path>')
+
+    assert expected.count('locators &amp; more.gdb') == 2
+    assert read(locator + '.loc.xml') == expected
+
+
+def test_the_xml_is_not_written_when_the_paths_are_already_the_workspace(locator):
+    patch_loc_xml(locator, WORKSPACE)
+    utime(locator + '.loc.xml', (1000000000, 1000000000))
+
+    assert not patch_loc_xml(locator, WORKSPACE)
+    assert stat(locator + '.loc.xml').st_mtime_ns == 1000000000 * 10**9
+
+
+def test_the_xml_line_endings_are_kept(locator):
+    with open(locator + '.loc.xml', 'w', encoding='utf-8', newline='') as loc_xml:
+        loc_xml.write(LOC_XML.replace('\n', '\r\n'))
+
+    assert patch_loc_xml(locator, WORKSPACE)
+    assert read(locator + '.loc.xml').count('\r\n') == LOC_XML.count('\n')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_copier.py
+
+Tests for mapserv/locatorsupport/copier.py against local destination folders
+'''
+
+import builtins
+import pytest
+from locatorsupport import copier
+from locatorsupport.copier import fan_out
+from os import listdir
+from os import makedirs
+from os.path import dirname
+from os.path import exists
+from os.path import join
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def source(tmpdir):
+    path = str(tmpdir.join('AddressPoints.lox'))
+
+    with open(path, 'wb') as data:
+        data.write(DATA)
+
+    return path
+
+
+@pytest.fixture
+def destinations(tmpdir):
+    folders = [str(tmpdir.mkdir('server{}'.format(number))) for number in range(3)]
+
+    return [join(folder, 'AddressPoints.lox') for folder in folders]
+
+
+def read(path):
+    with open(path, 'rb') as data:
+        return data.read()
+
+
+class FailingWriter(object):
+    '''a file that fails on the second write
+    '''
+
+    def __init__(self, file):
+        self.file = file
+        self.writes = 0
+
+    def write(self, chunk):
+        self.writes += 1
+        if self.writes > 1:
+            raise IOError('the share went away')
+
+        return self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+def test_every_destination_gets_the_source(source, destinations):
+    transfers = fan_out(source, destinations, buffer_size=1000, retry_delay=0)
+
+    assert [transfer.destination for transfer in transfers] == destinations
+    for transfer in transfers:
+        assert transfer.bytes == len(DATA)
+        assert transfer.attempts == 1
+        assert transfer.error is None
+        assert read(transfer.destination) == DATA
+
+
+def test_a_destination_that_cant_be_written_fails_on_its_own(tmpdir, source, destinations):
+    missing = str(tmpdir.join('offline', 'AddressPoints.lox'))
+
+    transfers = fan_out(source, destinations + [missing], buffer_size=1000, retries=2, retry_delay=0)
+
+    for transfer in transfers[:-1]:
+        assert transfer.error is None
+        assert read(transfer.destination) == DATA
+
+    assert transfers[-1].attempts == 3
+    assert transfers[-1].bytes == 0
+    assert isinstance(transfers[-1].error, OSError)
+    assert not exists(missing)
+
+
+def test_a_failed_destination_is_retried(tmpdir, source, destinations, monkeypatch):
+    folder = str(tmpdir.join('offline'))
+    flaky = join(folder, 'AddressPoints.lox')
+
+    #: the share comes back before the retry
+    monkeypatch.setattr(copier, 'sleep', lambda seconds: makedirs(folder))
+
+    transfers = fan_out(source, destinations + [flaky], buffer_size=1000, retries=2, retry_delay=0)
+
+    assert transfers[-1].attempts == 2
+    assert transfers[-1].error is None
+    assert transfers[-1].bytes == len(DATA)
+    assert read(flaky) == DATA
+
+
+def test_a_destination_that_fails_part_way_is_removed_and_the_others_finish(source, destinations, monkeypatch):
+    def fake_open(path, mode='r', *args, **kwargs):
+        file = builtins.open(path, mode, *args, **kwargs)
+
+        if path == destinations[1] and 'w' in mode:
+            return FailingWriter(file)
+
+        return file
+
+    monkeypatch.setattr(copier, 'open', fake_open, raising=False)
+
+    transfers = fan_out(source, destinations, buffer_size=1000, retries=0, retry_delay=0)
+
+    assert transfers[1].attempts == 1
+    assert transfers[1].bytes == 1000
+    assert isinstance(transfers[1].error, IOError)
+    assert not exists(destinations[1])
+
+    for transfer in [transfers[0], transfers[2]]:
+        assert transfer.error is None
+        assert read(transfer.destination) == DATA
+
+
+def test_a_source_that_fails_part_way_aborts_every_destination(source, destinations, monkeypatch):
+    class FailingReader(object):
+        def __init__(self, file):
+            self.file = file
+            self.reads = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.file.close()
+
+        def read(self, size):
+            self.reads += 1
+            if self.reads > 2:
+                raise IOError('the source went away')
+
+            return self.file.read(size)
+
+    def fake_open(path, mode='r', *args, **kwargs):
+        file = builtins.open(path, mode, *args, **kwargs)
+
+        if path == source:
+            return FailingReader(file)
+
+        return file
+
+    monkeypatch.setattr(copier, 'open', fake_open, raising=False)
+
+    with pytest.raises(IOError):
+        fan_out(source, destinations, buffer_size=1000, retry_delay=0)
+
+    for destination in destinations:
+        assert listdir(dirname(destination)) == []
+
+
+def test_no_destinations_copies_nothing(source):
+    assert fan_out(source, []) == []
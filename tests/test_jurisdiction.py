@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_jurisdiction.py
+
+Tests for sgid/ogmsupport/jurisdiction.py
+'''
+
+import arcpy
+from ogmsupport.jurisdiction import PolygonIndex
+from ogmsupport.jurisdiction import contains
+from ogmsupport.jurisdiction import get_rings
+from ogmsupport.jurisdiction import make_polygon
+
+
+def square(x, y, size):
+    return [(x, y), (x, y + size), (x + size, y + size), (x + size, y), (x, y)]
+
+
+def test_a_hole_is_outside():
+    polygon = make_polygon([square(0, 0, 10), square(4, 4, 2)])
+
+    assert contains(polygon, 1, 1)
+    assert not contains(polygon, 5, 5)
+    assert not contains(polygon, 11, 5)
+
+
+def test_every_part_of_a_multipart_polygon_is_inside():
+    polygon = make_polygon([square(0, 0, 1), square(5, 5, 1)])
+
+    assert contains(polygon, 0.5, 0.5)
+    assert contains(polygon, 5.5, 5.5)
+    assert not contains(polygon, 3, 3)
+
+
+def test_points_on_the_boundary_are_inside_like_intersect():
+    polygon = make_polygon([square(0, 0, 10), square(4, 4, 2)])
+
+    #: left, right, bottom and top edges and a vertex
+    for x, y in [(0, 5), (10, 5), (5, 0), (5, 10), (10, 10), (4, 5), (6, 5)]:
+        assert contains(polygon, x, y), (x, y)
+
+    assert not contains(polygon, 10.001, 5)
+
+
+def test_get_rings_splits_interior_rings_on_none():
+    outer = [arcpy.Point(x, y) for x, y in square(0, 0, 10)]
+    inner = [arcpy.Point(x, y) for x, y in square(4, 4, 2)]
+
+    assert get_rings([outer + [None] + inner]) == [square(0, 0, 10), square(4, 4, 2)]
+
+
+def test_find_walks_a_tree_with_many_levels():
+    polygons = [make_polygon([square(x * 10, y * 10, 5)]) for x in range(20) for y in range(20)]
+    index = PolygonIndex(polygons, capacity=3)
+
+    #: 400 polygons in nodes of 3 is at least 6 levels
+    depth = 0
+    node = index.root
+    while not hasattr(node, 'rings'):
+        node = node.children[0]
+        depth += 1
+
+    assert depth >= 6
+    assert index.find(123, 183) is polygons[12 * 20 + 18]
+    assert index.find(125, 185) is polygons[12 * 20 + 18]
+    assert index.find(127, 183) is None
+    assert index.intersects(0, 0)
+    assert not index.intersects(-1, 0)
+    assert PolygonIndex([]).find(0, 0) is None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_maintenance.py
+
+Tests for the batch timings of palletsupport/maintenance.py against the fake arcpy
+'''
+
+import arcpy
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from os.path import basename
+from palletsupport.maintenance import analyze_owner
+from palletsupport.maintenance import run_bounded
+from palletsupport.store import MaintenanceStore
+from palletsupport.store import Timing
+from time import time
+
+WORKSPACE = 'c:\\garage\\owner@db@server.sde'
+DATASETS = ['DB.OWNER.Roads', 'DB.OWNER.Lookup', 'DB.OWNER.Parcels', 'DB.OWNER.Lines']
+
+
+@pytest.fixture(autouse=True)
+def fake_workspace():
+    arcpy.reset()
+    arcpy.SCALE = 0
+
+    workspace = arcpy.add_workspace(WORKSPACE, user='owner', children=[(name, 'Table') for name in DATASETS])
+
+    for name in DATASETS:
+        arcpy.add_table('{}\\{}'.format(WORKSPACE, name), ['NAME'], data_type='Table')
+
+    return workspace
+
+
+@pytest.fixture
+def store(tmpdir):
+    return str(tmpdir.join('maintenance.sqlite'))
+
+
+def test_analyze_owner_saves_the_batch_seconds_and_size(store):
+    analyzed, skipped, seconds, batches = analyze_owner(WORKSPACE, store=store, batch_size=3)
+
+    assert [size for size, batch_seconds in batches] == [3, 1]
+
+    with MaintenanceStore(store) as maintenance_store:
+        timings = maintenance_store.get_timings(WORKSPACE)
+
+    assert sorted(timing.batch for timing in timings.values()) == [1, 3, 3, 3]
+    assert timings[DATASETS[0]].seconds == batches[0][1]
+
+
+def test_analyze_owner_analyzes_the_datasets_of_an_over_budget_batch_alone(store):
+    with MaintenanceStore(store) as maintenance_store:
+        maintenance_store.save_timings(WORKSPACE, {DATASETS[0]: Timing(300, 2), DATASETS[1]: Timing(300, 2)}, time())
+
+    analyzed, skipped, seconds, batches = analyze_owner(WORKSPACE, store=store, max_age_days=0, batch_size=25, batch_budget=120)
+
+    assert [size for size, batch_seconds in batches] == [1, 1, 2]
+
+    with MaintenanceStore(store) as maintenance_store:
+        timings = maintenance_store.get_timings(WORKSPACE)
+
+    assert timings[DATASETS[0]].batch == 1
+    assert timings[DATASETS[1]].batch == 1
+
+
+def test_only_datasets_analyzed_alone_are_reported_as_slowest(store):
+    with MaintenanceStore(store) as maintenance_store:
+        maintenance_store.save_timings(WORKSPACE, {DATASETS[0]: Timing(30, 1), DATASETS[1]: Timing(90, 3), DATASETS[2]: Timing(90, 3),
+                                                   DATASETS[3]: Timing(90, 3)}, time())
+
+        assert maintenance_store.get_slowest([basename(WORKSPACE)], 10) == [(basename(WORKSPACE), DATASETS[0], 30)]
+        assert maintenance_store.get_analyze_seconds([basename(WORKSPACE)]) == {basename(WORKSPACE): 120}
+
+
+def test_run_bounded_keeps_each_key_under_its_limit():
+    running = []
+    most = {}
+
+    def job(server, number):
+        running.append(server)
+        most[server] = max(most.get(server, 0), running.count(server))
+        running.remove(server)
+
+        return number
+
+    jobs = [('a', number) for number in range(5)] + [('b', number) for number in range(5)]
+    finished = [future.result() for job, future in run_bounded(job, jobs, lambda job: job[0], 4, 1, ThreadPoolExecutor)]
+
+    assert sorted(finished) == sorted(number for server, number in jobs)
+    assert most == {'a': 1, 'b': 1}
+
+
+@pytest.mark.parametrize('max_workers, max_per_key', [(0, 1), (1, 0), (4, -1)])
+def test_run_bounded_raises_when_no_job_could_start(max_workers, max_per_key):
+    with pytest.raises(ValueError):
+        list(run_bounded(len, [('a', )], lambda job: job[0], max_workers, max_per_key, ThreadPoolExecutor))
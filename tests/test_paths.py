@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_paths.py
+
+Tests for sgid/ogmsupport/paths.py
+'''
+
+from ogmsupport.paths import TOLERANCE
+from ogmsupport.paths import build_path
+from ogmsupport.paths import build_paths
+from ogmsupport.paths import dedupe
+from ogmsupport.paths import get_pairs
+from ogmsupport.points import Points
+
+
+def test_dedupe_keeps_the_first_of_a_repeated_station_in_order():
+    points = [(0.0, 0.0), (1.0, 1.0), (0.0, 0.0), (2.0, 2.0), (1.0, 1.0)]
+
+    assert list(get_pairs(dedupe(points))) == [(0.0, 0.0), (1.0, 1.0), (2.0, 2.0)]
+
+
+def test_points_within_the_tolerance_merge():
+    points = [(100.0, 200.0), (100.0 + TOLERANCE * 0.4, 200.0 - TOLERANCE * 0.4), (100.0 + TOLERANCE * 10, 200.0)]
+
+    assert list(get_pairs(dedupe(points))) == [(100.0, 200.0), (100.0 + TOLERANCE * 10, 200.0)]
+
+
+def test_build_path_needs_two_distinct_points():
+    assert build_path((1.0, 1.0), []) is None
+    assert build_path((1.0, 1.0), [(1.0, 1.0), (1.0, 1.0)]) is None
+    assert list(get_pairs(build_path((1.0, 1.0), [(1.0, 1.0), (2.0, 2.0)]))) == [(1.0, 1.0), (2.0, 2.0)]
+
+
+def test_build_paths_skips_constructs_without_a_surface_point():
+    surface_points = {'4301': (0.0, 0.0)}
+    stations = [(('4301', 1), [(1.0, 1.0)]), (('4302', 1), [(1.0, 1.0), (2.0, 2.0)])]
+
+    paths = list(build_paths(surface_points, stations))
+
+    assert [(api, construct) for api, construct, coordinates in paths] == [('4301', 1)]
+
+
+def test_the_path_is_built_from_the_deduped_points():
+    #: the baseline checked the deduped points but built the line from the raw points with the repeats in it
+    surface_points = Points()
+    surface_points.add('4301', 0.0, 0.0)
+
+    downholes = Points()
+    for x, y in [(0.0, 0.0), (1.0, 1.0), (1.0, 1.0), (2.0, 2.0), (1.0, 1.0)]:
+        downholes.add(('4301', 1), x, y)
+
+    [(api, construct, coordinates)] = build_paths(surface_points, downholes.groups())
+
+    assert list(get_pairs(coordinates)) == [(0.0, 0.0), (1.0, 1.0), (2.0, 2.0)]
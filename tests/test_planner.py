@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_planner.py
+
+Tests for palletsupport/planner.py against the fake arcpy
+'''
+
+import arcpy
+import pytest
+from palletsupport.planner import gather_statistics
+from palletsupport.planner import make_plan
+
+ADMIN = 'c:\\garage\\sde@db@server.sde'
+
+
+@pytest.fixture(autouse=True)
+def fake_workspace():
+    arcpy.reset()
+    arcpy.SCALE = 0
+
+    return arcpy.add_workspace(ADMIN, states=40, versions=3)
+
+
+def test_gather_statistics_reuses_known_delta_rows():
+    statistics = gather_statistics(ADMIN, delta_rows=250)
+
+    assert statistics.states == 40
+    assert statistics.versions == 3
+    assert statistics.delta_rows == 250
+    #: the table registry is not read
+    assert arcpy.CALLS['SQL'] == 3
+
+
+def test_make_plan_skips_the_compress_of_a_trivial_state_tree(fake_workspace):
+    fake_workspace.states = 1
+
+    assert not make_plan(ADMIN, delta_rows=0).compress
+    assert make_plan(ADMIN, delta_rows=10).compress
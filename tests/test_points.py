@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_points.py
+
+Tests for sgid/ogmsupport/points.py
+'''
+
+from ogmsupport.points import Points
+
+
+def test_get_returns_the_last_point_of_a_key_like_a_dictionary():
+    points = Points()
+    points.add('4301', 1.0, 2.0)
+    points.add('4302', 5.0, 6.0)
+    points.add('4301', 3.0, 4.0)
+
+    assert points.get('4301') == (3.0, 4.0)
+    assert points.get('4302') == (5.0, 6.0)
+    assert points.get('4303') is None
+    assert points.get('4303', (0, 0)) == (0, 0)
+
+
+def test_groups_keep_the_order_the_points_were_added():
+    points = Points()
+    points.add('a', 1.0, 1.0)
+    points.add('a', 2.0, 2.0)
+    points.add('b', 3.0, 3.0)
+
+    assert points.contiguous
+    assert list(points.groups()) == [('a', [(1.0, 1.0), (2.0, 2.0)]), ('b', [(3.0, 3.0)])]
+
+    points.add('a', 4.0, 4.0)
+
+    assert not points.contiguous
+    assert list(points.groups()) == [('a', [(1.0, 1.0), (2.0, 2.0), (4.0, 4.0)]), ('b', [(3.0, 3.0)])]
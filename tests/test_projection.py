@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_projection.py
+
+Tests for sgid/ogmsupport/projection.py with and without numpy
+'''
+
+import math
+import pytest
+from ogmsupport import projection
+
+#: (zone 11 x, y, zone 12 x, y) of geographic points projected into each zone with the forward Krüger series. The zone 12
+#: values agree with the Snyder series in the fake arcpy to under a millimeter in Utah.
+PAIRS = [
+    #: 37N 114W is half way between the central meridians
+    (766962.1202, 4099080.6933, 233037.8798, 4099080.6933),
+    #: 38.5N 113.8W
+    (779066.1412, 4266147.5113, 255823.8751, 4265009.2245),
+    #: 40.25N 114.05W
+    (750908.9053, 4459680.8946, 240584.3914, 4459968.9498),
+    #: 41.99N 113.5W
+    (789926.2400, 4654594.0430, 292916.5247, 4651689.4065),
+    #: 39N 116.5W
+    (543295.9923, 4316895.4725, 23592.2858, 4331191.2116),
+]
+
+#: meters
+TOLERANCE = 0.001
+
+
+@pytest.fixture(params=['numpy', 'math'])
+def library(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(projection, 'numpy', None)
+
+    return request.param
+
+
+def test_utm11_to_utm12_matches_the_known_pairs(library):
+    eastings, northings = projection.utm11_to_utm12([pair[0] for pair in PAIRS], [pair[1] for pair in PAIRS])
+
+    assert len(eastings) == len(PAIRS)
+    for easting, northing, pair in zip(eastings, northings, PAIRS):
+        assert math.hypot(easting - pair[2], northing - pair[3]) < TOLERANCE, pair
+
+
+def test_get_largest_error(library):
+    expected = [(pair[2] + 0.003, pair[3]) for pair in PAIRS]
+
+    assert abs(projection.get_largest_error([pair[0] for pair in PAIRS], [pair[1] for pair in PAIRS], expected) - 0.003) < TOLERANCE
+    assert projection.get_largest_error([], [], []) == 0
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_rebuild.py
+
+Tests for copying a live locator in mapserv/locatorsupport/rebuild.py
+'''
+
+from locatorsupport import rebuild
+from locatorsupport.clone import COPY
+from locatorsupport.clone import HARDLINK
+from locatorsupport.clone import REFLINK
+from locatorsupport.clone import Cloner
+from locatorsupport.clone import get_weakest
+from os import listdir
+
+
+def test_get_weakest():
+    assert get_weakest([REFLINK, REFLINK]) == REFLINK
+    assert get_weakest([REFLINK, HARDLINK]) == HARDLINK
+    assert get_weakest([REFLINK, COPY, HARDLINK]) == COPY
+    assert get_weakest([]) == COPY
+
+
+def test_copy_locator_returns_the_slowest_strategy_of_any_file(tmpdir, monkeypatch):
+    live = tmpdir.mkdir('locators')
+    for extension in ['.lox', '.loc', '.loc.xml', '.loc.new']:
+        live.join('Roads' + extension).write('data')
+
+    def clone(self, source, destination):
+        #: only the .lox could be reflinked
+        strategy = REFLINK if source.endswith('.lox') else COPY
+
+        with open(source) as reader, open(destination, 'w') as writer:
+            writer.write(reader.read())
+
+        return strategy, 0
+
+    monkeypatch.setattr(Cloner, 'clone', clone)
+
+    to_folder = str(tmpdir.join('rebuilding', 'Roads'))
+
+    assert rebuild.copy_locator(str(live), 'Roads', to_folder) == COPY
+    assert sorted(listdir(to_folder)) == ['Roads.loc', 'Roads.loc.xml', 'Roads.lox']
+
+
+def test_copy_locator_reports_a_reflink_when_every_file_was_reflinked(tmpdir, monkeypatch):
+    live = tmpdir.mkdir('locators')
+    for extension in ['.lox', '.loc', '.loc.xml']:
+        live.join('Roads' + extension).write('data')
+
+    monkeypatch.setattr(Cloner, 'clone', lambda self, source, destination: (REFLINK, 0))
+
+    assert rebuild.copy_locator(str(live), 'Roads', str(tmpdir.join('rebuilding'))) == REFLINK
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_reference.py
+
+Tests for palletsupport/reference.py against a temp directory
+'''
+
+import pytest
+import shutil
+from os import listdir
+from os import remove
+from os import utime
+from os.path import exists
+from os.path import join
+from palletsupport.reference import ReferenceCache
+
+
+@pytest.fixture
+def remote(tmpdir):
+    gdb = tmpdir.mkdir('share').mkdir('UDSH.gdb')
+    gdb.join('a00000001.gdbtable').write('sites')
+    gdb.join('a00000002.gdbtable').write('lines')
+    gdb.join('a00000001.gdbtable.lock').write('')
+
+    return str(gdb)
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return ReferenceCache(str(tmpdir.join('reference')))
+
+
+def test_a_miss_copies_the_files_without_the_locks(remote, cache):
+    local = cache.get(join(remote, 'Sites'))
+
+    assert local == join(cache.locate(remote), 'Sites')
+    assert cache.get_stats() == (0, 2, 10, 0)
+    assert sorted(listdir(cache.locate(remote))) == ['a00000001.gdbtable', 'a00000002.gdbtable']
+
+
+def test_a_hit_copies_nothing(remote, cache):
+    cache.get(remote)
+    cache.get(remote)
+
+    assert cache.get_stats() == (2, 2, 10, 0)
+
+
+def test_a_changed_file_is_copied_again_and_a_removed_file_is_removed(remote, cache):
+    cache.get(remote)
+
+    with open(join(remote, 'a00000002.gdbtable'), 'w') as table:
+        table.write('more lines')
+    utime(join(remote, 'a00000002.gdbtable'), (0, 0))
+    remove(join(remote, 'a00000001.gdbtable'))
+
+    cache.get(remote)
+
+    assert cache.get_stats() == (0, 3, 20, 0)
+    assert listdir(cache.locate(remote)) == ['a00000002.gdbtable']
+
+
+def test_the_last_mirror_is_used_when_the_remote_is_gone(remote, cache):
+    local = cache.get(remote)
+    shutil.rmtree(remote)
+
+    assert cache.get(remote) == local
+    assert cache.get_stats().stale == 1
+    assert len(cache.errors) == 1
+    assert exists(join(local, 'a00000001.gdbtable'))
+
+
+def test_a_missing_remote_without_a_mirror_raises(remote, cache):
+    shutil.rmtree(remote)
+
+    with pytest.raises(OSError):
+        cache.get(remote)
+
+
+def test_a_failed_copy_leaves_no_partial_file_and_keeps_the_last_copy(remote, cache, monkeypatch):
+    local = cache.get(remote)
+
+    with open(join(remote, 'a00000001.gdbtable'), 'w') as table:
+        table.write('new sites')
+
+    def fail(source, destination):
+        with open(destination, 'w') as partial:
+            partial.write('new')
+
+        raise OSError('the share went away')
+
+    monkeypatch.setattr(shutil, 'copy2', fail)
+
+    assert cache.get(remote) == local
+    assert cache.get_stats().stale == 1
+    assert sorted(listdir(local)) == ['a00000001.gdbtable', 'a00000002.gdbtable']
+    with open(join(local, 'a00000001.gdbtable')) as table:
+        assert table.read() == 'sites'
+
+
+def test_a_left_over_partial_file_is_removed(remote, cache):
+    local = cache.get(remote)
+
+    with open(join(local, 'a00000001.gdbtable.partial'), 'w') as partial:
+        partial.write('sit')
+
+    cache.get(remote)
+
+    assert '.partial' not in ''.join(listdir(local))
+
+
+def test_the_lock_files_of_a_reader_of_the_mirror_are_kept(remote, cache):
+    local = cache.get(remote)
+
+    with open(join(local, 'a00000001.gdbtable.sr.1234.5678.lock'), 'w') as lock:
+        lock.write('')
+
+    cache.get(remote)
+
+    assert exists(join(local, 'a00000001.gdbtable.sr.1234.5678.lock'))
+    assert cache.get_stats() == (2, 2, 10, 0)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_schedule.py
+
+Tests for palletsupport/schedule.py
+'''
+
+from datetime import date
+from datetime import datetime
+
+from palletsupport.schedule import NIGHTLY
+from palletsupport.schedule import Scheduler
+from palletsupport.schedule import choose
+from palletsupport.schedule import get_night
+from palletsupport.schedule import in_window
+from palletsupport.schedule import weekly
+from palletsupport.store import MaintenanceStore
+
+#: a friday
+FRIDAY = date(2026, 10, 16)
+
+
+def test_get_night_is_the_calendar_date_by_default():
+    assert get_night(datetime(2026, 10, 16, 2)) == FRIDAY
+    assert get_night(datetime(2026, 10, 16, 23)) == FRIDAY
+
+
+def test_get_night_rolls_over_before_the_hour():
+    assert get_night(datetime(2026, 10, 16, 2), rollover=7) == date(2026, 10, 15)
+    assert get_night(datetime(2026, 10, 16, 7), rollover=7) == FRIDAY
+
+
+def test_in_window_wraps_past_midnight():
+    assert in_window(datetime(2026, 10, 16, 2), (18, 7))
+    assert in_window(datetime(2026, 10, 16, 18), (18, 7))
+    assert not in_window(datetime(2026, 10, 16, 12), (18, 7))
+    assert in_window(datetime(2026, 10, 16, 12), (9, 17))
+
+
+def test_choose_only_picks_jobs_on_their_day():
+    jobs = {'SGID10': ('sgid', weekly('Friday')), 'LandOwnership': ('sgid', weekly('Tuesday'))}
+
+    assert choose(jobs, {}, FRIDAY, {}, 3) == set(['SGID10'])
+    assert choose(jobs, {}, date(2026, 10, 13), {}, 3) == set(['LandOwnership'])
+
+
+def test_choose_skips_jobs_that_are_not_due():
+    jobs = {'SGID10': ('sgid', weekly('Friday')), 'UDNR': ('itdb104sp', NIGHTLY)}
+    last_nights = {'SGID10': date(2026, 10, 12), 'UDNR': FRIDAY}
+
+    assert choose(jobs, last_nights, FRIDAY, {}, 3) == set()
+
+
+def test_choose_keeps_servers_in_budget_with_the_most_overdue_first():
+    jobs = {name: ('itdb104sp', NIGHTLY) for name in ['a', 'b', 'c']}
+    last_nights = {'a': date(2026, 10, 15), 'b': date(2026, 10, 10), 'c': date(2026, 10, 12)}
+
+    assert choose(jobs, last_nights, FRIDAY, {'itdb104sp': 2}, 3) == set(['b', 'c'])
+    assert choose(jobs, {}, FRIDAY, {}, 1) == set(['a'])
+
+
+def test_choose_gives_the_most_expensive_of_the_equally_overdue_jobs_the_slots_first():
+    jobs = {name: ('itdb104sp', NIGHTLY) for name in ['a', 'b', 'c']}
+
+    assert choose(jobs, {}, FRIDAY, {}, 2, {'b': 600, 'c': 3600}) == set(['b', 'c'])
+
+
+def test_scheduler_remembers_the_planned_seconds(tmpdir):
+    store = str(tmpdir.join('maintenance.sqlite'))
+    scheduler = Scheduler(store)
+    scheduler.register('UDNR', 'itdb104sp', NIGHTLY)
+    scheduler.finished('UDNR', datetime(2026, 10, 15, 2), seconds=1200)
+
+    with MaintenanceStore(store) as maintenance_store:
+        assert maintenance_store.get_job_seconds() == {'UDNR': 1200}
+
+
+def test_scheduler_runs_friday_jobs_early_friday_morning(tmpdir):
+    scheduler = Scheduler(str(tmpdir.join('maintenance.sqlite')))
+    scheduler.register('SGID10', 'sgid', weekly('Friday'))
+
+    assert scheduler.is_ready('SGID10', datetime(2026, 10, 16, 2)) == (True, None)
+    assert not scheduler.is_ready('SGID10', datetime(2026, 10, 15, 23))[0]
+
+
+def test_scheduler_only_checks_the_window_when_asked(tmpdir):
+    store = str(tmpdir.join('maintenance.sqlite'))
+    Scheduler(store).register('UDNR', 'itdb104sp', NIGHTLY)
+
+    assert Scheduler(store).is_ready('UDNR', datetime(2026, 10, 16, 12))[0]
+    assert not Scheduler(store, window=(18, 7)).is_ready('UDNR', datetime(2026, 10, 16, 12))[0]
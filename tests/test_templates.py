@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_templates.py
+
+Tests for mapserv/locatorsupport/templates.py
+'''
+
+import locatorsupport.templates as template
+from locatorsupport.config import get_properties
+
+SERVER = template.Machine(8, 32 * 1024 * template.MB, 300 * template.MB)
+
+
+def test_baseline_keeps_the_style_properties():
+    for style in [template.us_dual_range_addresses, template.us_single_house_addresses]:
+        assert template.render(style) == style
+
+    assert get_properties(template.render(template.us_dual_range_addresses))['NumThreads'] == ['0']
+    assert get_properties(template.render(template.us_dual_range_addresses))['RuntimeMemoryLimit'] == ['1023410176']
+    assert get_properties(template.render(template.us_single_house_addresses))['RuntimeMemoryLimit'] == ['511705088']
+
+
+def test_profiles_replace_the_style_properties_once():
+    rendered = template.render(template.us_dual_range_addresses, 'batch', SERVER)
+
+    assert rendered.count('NumThreads') == 1
+    assert rendered.count('RuntimeMemoryLimit') == 1
+    assert get_properties(rendered)['NumThreads'] == ['8']
+    assert get_properties(rendered)['MinimumMatchScore'] == ['60']
+
+
+def test_get_machine_reads_the_secrets():
+    machine = template.get_machine({'cores': 8, 'memory_mb': 32768})
+
+    assert machine == template.Machine(8, 32768 * template.MB, 0)
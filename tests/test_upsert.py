@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# * coding: utf8 *
+'''
+test_upsert.py
+
+Tests for the row matching in sgid/ogmsupport/upsert.py
+'''
+
+from ogmsupport.upsert import plan
+
+
+def test_unchanged_rows_are_left_alone():
+    source = {('4301', ): [('a', 1)], ('4302', ): [('b', 2)]}
+    destination = {('4301', ): [('a', 11)], ('4302', ): [('b', 12)]}
+
+    assert plan(source, destination) == ({}, [], [], 2)
+
+
+def test_a_changed_row_updates_the_destination_row_with_the_same_key():
+    source = {('4301', ): [('a', 1)], ('4302', ): [('c', 2)]}
+    destination = {('4301', ): [('a', 11)], ('4302', ): [('b', 12)]}
+
+    assert plan(source, destination) == ({12: 2}, [], [], 1)
+
+
+def test_new_rows_are_inserted_and_removed_rows_are_deleted():
+    source = {('4301', ): [('a', 1)], ('4303', ): [('c', 3)]}
+    destination = {('4301', ): [('a', 11)], ('4302', ): [('b', 12)]}
+
+    assert plan(source, destination) == ({}, [3], [12], 1)
+
+
+def test_duplicate_keys_are_matched_as_a_multiset():
+    #: the stations of a down hole share the well's key
+    source = {('4301', 1): [('s1', 1), ('s2', 2), ('s2', 3), ('s4', 4)]}
+    destination = {('4301', 1): [('s2', 11), ('s1', 12), ('s3', 13)]}
+
+    updates, inserts, deletes, unchanged = plan(source, destination)
+
+    assert unchanged == 2
+    assert updates == {13: 3}
+    assert inserts == [4]
+    assert deletes == []
+
+
+def test_duplicate_keys_with_fewer_source_rows_delete_the_extras():
+    source = {('4301', 1): [('s1', 1)]}
+    destination = {('4301', 1): [('s1', 11), ('s1', 12), ('s2', 13)]}
+
+    assert plan(source, destination) == ({}, [], [12, 13], 1)
+
+
+def test_reordered_duplicates_are_unchanged():
+    source = {('4301', 1): [('s1', 1), ('s2', 2), ('s1', 3)]}
+    destination = {('4301', 1): [('s1', 11), ('s1', 12), ('s2', 13)]}
+
+    assert plan(source, destination) == ({}, [], [], 3)